@@ -0,0 +1,37 @@
+// app/api/players/changes/route.ts
+import { NextRequest, NextResponse } from 'next/server';
+
+const USCF_SERVICE_URL = process.env.USCF_SERVICE_URL;
+
+// GET /api/players/changes?since=... returns the players changed since a snapshot
+// was taken; a 410 with resync: true means download /api/players/snapshot again
+export async function GET(request: NextRequest) {
+  if (!USCF_SERVICE_URL) {
+    console.error('USCF_SERVICE_URL is not defined in environment variables.');
+    return NextResponse.json({ error: 'Service is not configured' }, { status: 500 });
+  }
+
+  const since = request.nextUrl.searchParams.get('since');
+  if (!since) {
+    return NextResponse.json({ error: 'since is required' }, { status: 400 });
+  }
+
+  try {
+    const response = await fetch(
+      `${USCF_SERVICE_URL}/players/changes?since=${encodeURIComponent(since)}`,
+      { cache: 'no-store' }
+    );
+    const data = await response.json().catch(() => ({}));
+    return NextResponse.json(data, {
+      status: response.status,
+      headers: { 'Cache-Control': 'no-cache' },
+    });
+
+  } catch (error) {
+    console.error('Player changes error:', error);
+    return NextResponse.json(
+      { error: 'Service unavailable' },
+      { status: 503 }
+    );
+  }
+}
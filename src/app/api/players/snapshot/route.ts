@@ -0,0 +1,55 @@
+// app/api/players/snapshot/route.ts
+import { NextRequest, NextResponse } from 'next/server';
+
+const USCF_SERVICE_URL = process.env.USCF_SERVICE_URL;
+
+// Service response headers passed through to the client
+const PASSED_HEADERS = [
+  'content-type', 'content-length', 'etag', 'last-modified', 'cache-control', 'x-players-synced-at',
+];
+
+// GET /api/players/snapshot streams the service's SQLite player export for sql.js;
+// pass X-Players-Synced-At to /api/players/changes?since= to keep it current
+export async function GET(request: NextRequest) {
+  if (!USCF_SERVICE_URL) {
+    console.error('USCF_SERVICE_URL is not defined in environment variables.');
+    return NextResponse.json({ error: 'Service is not configured' }, { status: 500 });
+  }
+
+  try {
+    const ifNoneMatch = request.headers.get('if-none-match');
+    const response = await fetch(`${USCF_SERVICE_URL}/players/snapshot.db`, {
+      headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {},
+      cache: 'no-store',
+    });
+
+    const headers = new Headers();
+    for (const name of PASSED_HEADERS) {
+      const value = response.headers.get(name);
+      if (value) {
+        headers.set(name, value);
+      }
+    }
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      return NextResponse.json(
+        { error: errorData.error || 'Player export unavailable' },
+        { status: response.status, headers }
+      );
+    }
+
+    return new NextResponse(response.body, { status: response.status, headers });
+
+  } catch (error) {
+    console.error('Player export error:', error);
+    return NextResponse.json(
+      { error: 'Service unavailable' },
+      { status: 503 }
+    );
+  }
+}
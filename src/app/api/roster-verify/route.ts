@@ -0,0 +1,44 @@
+// app/api/roster-verify/route.ts
+import { NextRequest, NextResponse } from 'next/server';
+
+const USCF_SERVICE_URL = process.env.USCF_SERVICE_URL;
+
+export async function POST(request: NextRequest) {
+  if (!USCF_SERVICE_URL) {
+    console.error('USCF_SERVICE_URL is not defined in environment variables.');
+    return NextResponse.json({ error: 'Service is not configured' }, { status: 500 });
+  }
+
+  try {
+    // JSON rosters and CSV uploads are both checked by the service, so pass the body through as-is
+    const contentType = request.headers.get('content-type') || 'application/json';
+    const body = await request.text();
+
+    if (!body.trim()) {
+      return NextResponse.json({ error: 'A roster is required' }, { status: 400 });
+    }
+
+    const response = await fetch(`${USCF_SERVICE_URL}/roster-verify${request.nextUrl.search}`, {
+      method: 'POST',
+      headers: { 'Content-Type': contentType },
+      body,
+    });
+
+    const result = await response.json().catch(() => ({}));
+    if (!response.ok) {
+      return NextResponse.json(
+        { error: result.error || 'Roster verification failed' },
+        { status: response.status }
+      );
+    }
+
+    return NextResponse.json(result);
+
+  } catch (error) {
+    console.error('Roster verification error:', error);
+    return NextResponse.json(
+      { error: 'Service unavailable' },
+      { status: 503 }
+    );
+  }
+}
@@ -0,0 +1,45 @@
+// app/api/uscf-lookup-batch/route.ts
+import { NextRequest, NextResponse } from 'next/server';
+
+const USCF_SERVICE_URL = process.env.USCF_SERVICE_URL;
+
+export async function POST(request: NextRequest) {
+  if (!USCF_SERVICE_URL) {
+    console.error('USCF_SERVICE_URL is not defined in environment variables.');
+    return NextResponse.json({ error: 'Service is not configured' }, { status: 500 });
+  }
+
+  try {
+    const body = await request.json();
+
+    if (!Array.isArray(body.uscfIds) || body.uscfIds.length === 0) {
+      return NextResponse.json({ error: 'At least one USCF ID is required' }, { status: 400 });
+    }
+
+    const response = await fetch(`${USCF_SERVICE_URL}/uscf-lookup-batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ uscf_ids: body.uscfIds }),
+    });
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}));
+      return NextResponse.json(
+        { error: errorData.error || 'Batch lookup failed' },
+        { status: response.status }
+      );
+    }
+
+    // Pass the NDJSON stream straight through so the client sees each player as it resolves
+    return new Response(response.body, {
+      headers: { 'Content-Type': 'application/x-ndjson' },
+    });
+
+  } catch (error) {
+    console.error('USCF batch lookup error:', error);
+    return NextResponse.json(
+      { error: 'Service unavailable' },
+      { status: 503 }
+    );
+  }
+}
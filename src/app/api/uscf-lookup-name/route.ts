@@ -22,9 +22,13 @@ export async function POST(request: NextRequest) {
       );
     }
 
+    // Clients that accept NDJSON or server-sent events get each player as soon as it is parsed
+    const accept = request.headers.get('accept') || '';
+    const streamType = ['application/x-ndjson', 'text/event-stream'].find((type) => accept.includes(type));
+
     const response = await fetch(`${USCF_SERVICE_URL}/uscf-lookup-name`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', Accept: streamType || 'application/json' },
       body: JSON.stringify({ 
         first_name: firstName, 
         last_name: lastName 
@@ -34,7 +38,18 @@ export async function POST(request: NextRequest) {
     if (!response.ok) {
       // It's better to return the error from the service if possible
       const errorData = await response.json().catch(() => ({ error: 'An unknown error occurred' }));
-      return NextResponse.json({ error: errorData.error }, { status: response.status });
+      // 429/503 from a saturated or unavailable service say when to try again
+      const retryAfter = response.headers.get('Retry-After');
+      return NextResponse.json(
+        { error: errorData.error },
+        { status: response.status, headers: retryAfter ? { 'Retry-After': retryAfter } : undefined }
+      );
+    }
+
+    if (streamType && response.body) {
+      return new Response(response.body, {
+        headers: { 'Content-Type': streamType, 'Cache-Control': 'no-cache' },
+      });
     }
 
     const players = await response.json();
@@ -3,41 +3,70 @@ import { NextRequest, NextResponse } from 'next/server';
 
 const USCF_SERVICE_URL = process.env.USCF_SERVICE_URL;
 
-export async function POST(request: NextRequest) {
+// Service response headers passed through to the client
+const PASSED_HEADERS = ['content-type', 'etag', 'cache-control', 'retry-after'];
+
+// Forward a lookup to the service and pass its response through untouched, so the
+// pre-encoded body, ETag and Cache-Control reach the browser and 304s stay 304s
+async function proxyLookup(uscfId: string | null, ifNoneMatch: string | null) {
   if (!USCF_SERVICE_URL) {
     console.error('USCF_SERVICE_URL is not defined in environment variables.');
     return NextResponse.json({ error: 'Service is not configured' }, { status: 500 });
   }
 
+  if (!uscfId) {
+    return NextResponse.json({ error: 'USCF ID is required' }, { status: 400 });
+  }
+
   try {
-    const body = await request.json();
-    
-    if (!body.uscfId) {
-      return NextResponse.json({ error: 'USCF ID is required' }, { status: 400 });
+    const response = await fetch(
+      `${USCF_SERVICE_URL}/uscf-lookup?uscf_id=${encodeURIComponent(uscfId)}`,
+      {
+        headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {},
+        cache: 'no-store',
+      }
+    );
+
+    const headers = new Headers();
+    for (const name of PASSED_HEADERS) {
+      const value = response.headers.get(name);
+      if (value) {
+        headers.set(name, value);
+      }
     }
 
-    const response = await fetch(`${USCF_SERVICE_URL}/uscf-lookup`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ uscf_id: body.uscfId }),
-    });
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
 
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({}));
       return NextResponse.json(
-        { error: errorData.error || 'Player not found' }, 
-        { status: response.status }
+        { error: errorData.error || 'Player not found' },
+        { status: response.status, headers }
       );
     }
 
-    const player = await response.json();
-    return NextResponse.json(player);
+    return new NextResponse(response.body, { status: response.status, headers });
 
   } catch (error) {
     console.error('USCF lookup error:', error);
     return NextResponse.json(
-      { error: 'Service unavailable' }, 
+      { error: 'Service unavailable' },
       { status: 503 }
     );
   }
 }
+
+// GET /api/uscf-lookup?uscfId=... can be cached and revalidated by the browser
+export async function GET(request: NextRequest) {
+  return proxyLookup(
+    request.nextUrl.searchParams.get('uscfId'),
+    request.headers.get('if-none-match')
+  );
+}
+
+export async function POST(request: NextRequest) {
+  const body = await request.json().catch(() => ({}));
+  return proxyLookup(body.uscfId ? String(body.uscfId) : null, request.headers.get('if-none-match'));
+}
@@ -0,0 +1,163 @@
+"""
+Offline benchmarks for USCFLookup and the USCF service
+
+Everything runs against stub_server.py, which replays recorded uschess.org
+pages, so results are reproducible on a machine with no network access.
+Rate limiting is disabled, the local player store is left empty and the
+response cache is off so every lookup exercises the upstream fetch and parse
+path unless a scenario says otherwise.
+
+    python bench_uscf.py                          # all scenarios
+    python bench_uscf.py --only parse             # scenarios whose name contains "parse"
+    python bench_uscf.py --save baseline.json     # record results
+    python bench_uscf.py --baseline baseline.json # fail if p50 regresses by more than 25%
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from stub_server import start_stub_server, single_id_page, surname_page, zero_results_page, CLOUDFLARE_PAGE
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_scenario(name: str, fn, iterations: int, concurrency: int) -> dict:
+    """
+    Call fn(i) for i in range(iterations) across `concurrency` threads
+
+    Returns:
+        Throughput and latency percentiles for the scenario
+    """
+    latencies = []
+
+    def timed(i):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(iterations)))
+    else:
+        for i in range(iterations):
+            timed(i)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'name': name,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'throughput_per_s': iterations / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+    }
+
+def build_scenarios(base_url: str):
+    """Return (name, fn, default iterations, uses concurrency) for every scenario"""
+    os.environ.update({
+        'USCF_BASE_URL': base_url,
+        'USCF_RATE_LIMIT_SECONDS': '0',
+        'USCF_PLAYER_DATA': '',
+        'USCF_CACHE_TTL': '0',
+        'USCF_CACHE_NEGATIVE_TTL': '0',
+        'USCF_RESPONSE_CACHE_MAX_MB': '0',
+    })
+    os.environ.pop('USCF_CACHE_PATH', None)
+
+    from uscf_lookup import USCFLookup, PlayerCache, ResponseCache
+    import uscf_service
+
+    lookup = USCFLookup(rate_limit_seconds=0, cache=PlayerCache(ttl_seconds=0, negative_ttl_seconds=0),
+                        base_url=base_url, response_cache=ResponseCache(max_bytes=0))
+    cached_lookup = USCFLookup(rate_limit_seconds=0, base_url=base_url)
+    cached_lookup.lookup_by_id('12345678')
+    # Player cache off, response cache on: repeat searches skip the transfer but still parse
+    page_cached_lookup = USCFLookup(rate_limit_seconds=0, cache=PlayerCache(ttl_seconds=0, negative_ttl_seconds=0),
+                                    base_url=base_url)
+
+    id_page = single_id_page('12345678')
+    big_page = surname_page('SMITH')
+    empty_page = zero_results_page('99999999')
+
+    client = uscf_service.app.test_client()
+    ids = itertools.count(30000000)
+
+    return [
+        ('parse_id', lambda i: lookup._parse_player_data(id_page, '12345678'), 2000, False),
+        ('parse_zero_results', lambda i: lookup._parse_player_data(empty_page, '99999999'), 2000, False),
+        ('parse_cloudflare_block', lambda i: lookup._parse_player_data(CLOUDFLARE_PAGE, '12345678'), 2000, False),
+        ('parse_surname_500', lambda i: lookup._parse_multiple_players(big_page, 'SMITH'), 50, False),
+        ('parse_surname_500_bs4', lambda i: list(lookup._iter_rows_bs4(big_page)), 10, False),
+        ('lookup_by_id', lambda i: lookup.lookup_by_id(str(30000000 + i)), 300, True),
+        ('lookup_by_id_cached', lambda i: cached_lookup.lookup_by_id('12345678'), 5000, True),
+        ('lookup_by_name_surname_500', lambda i: lookup.lookup_by_name(None, 'SMITH'), 50, True),
+        ('lookup_by_name_page_cached', lambda i: page_cached_lookup.lookup_by_name(None, 'SMITH'), 50, True),
+        ('endpoint_uscf_lookup', lambda i: client.post('/uscf-lookup', json={'uscf_id': str(next(ids))}), 300, True),
+        ('endpoint_uscf_lookup_name', lambda i: client.post('/uscf-lookup-name', json={'last_name': 'SMITH'}), 50, True),
+        ('endpoint_uscf_lookup_batch_60', lambda i: client.post(
+            '/uscf-lookup-batch', json={'uscf_ids': [str(next(ids)) for _ in range(60)]}).get_data(), 10, True),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline USCF lookup benchmarks')
+    parser.add_argument('--only', help='Only run scenarios whose name contains this text')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads for lookup and endpoint scenarios')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every scenario\'s iteration count')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Artificial upstream latency per response')
+    parser.add_argument('--save', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='Allowed p50 slowdown against the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    server, base_url = start_stub_server(latency=args.latency_ms / 1000)
+
+    results = []
+    try:
+        for name, fn, iterations, concurrent in build_scenarios(base_url):
+            if args.only and args.only not in name:
+                continue
+            fn(0)  # warm up imports, connections and caches
+            result = run_scenario(name, fn, max(1, int(iterations * args.scale)),
+                                  args.concurrency if concurrent else 1)
+            results.append(result)
+            print(f"{name:32} {result['throughput_per_s']:>10.1f}/s  "
+                  f"p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms  "
+                  f"(n={result['iterations']}, c={result['concurrency']})")
+    finally:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result['name']: result for result in json.load(f)}
+        regressions = [
+            (result['name'], baseline[result['name']]['p50_ms'], result['p50_ms'])
+            for result in results
+            if result['name'] in baseline
+            and result['p50_ms'] > baseline[result['name']]['p50_ms'] * (1 + args.max_regression)
+        ]
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
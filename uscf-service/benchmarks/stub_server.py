@@ -0,0 +1,127 @@
+"""
+Local stand-in for uschess.org's player-search.php
+
+Replays the recorded pages in fixtures/ so USCFLookup and the service can be
+benchmarked with no network access. The page served depends on the search term:
+
+    digits starting with 9     -> "Players found: 0"
+    digits                     -> single player with that ID
+    contains BLOCKED           -> Cloudflare block page
+    contains NOBODY            -> "Players found: 0"
+    anything else              -> surname search with SURNAME_ROWS players
+
+Responses carry an ETag and answer a matching If-None-Match with 304.
+
+Run standalone with: python stub_server.py --port 8099
+"""
+import argparse
+import hashlib
+import html
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SURNAME_ROWS = 500
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+RESULTS_PAGE = _fixture('search_results.html')
+PLAYER_ROW = _fixture('player_row.html').strip()
+ZERO_RESULTS_PAGE = _fixture('zero_results.html')
+CLOUDFLARE_PAGE = _fixture('cloudflare_block.html')
+
+def results_page(search_term: str, rows) -> str:
+    """Render a results page for (uscf_id, name) rows"""
+    rendered = '\n'.join(
+        PLAYER_ROW.format(uscf_id=uscf_id, rating=400 + i % 1600, games=10 + i % 90,
+                          quick_rating='Unrated' if i % 3 else f'{380 + i % 1500}/12', name=name)
+        for i, (uscf_id, name) in enumerate(rows)
+    )
+    return RESULTS_PAGE.format(search_term=html.escape(search_term), count=len(rows), rows=rendered)
+
+def single_id_page(uscf_id: str) -> str:
+    return results_page(uscf_id, [(uscf_id, 'MORENO, RYAN DAVID')])
+
+def surname_page(search_term: str, count: int = SURNAME_ROWS) -> str:
+    surname = search_term.split(',')[0].split()[0].upper() if search_term.strip() else 'SMITH'
+    return results_page(search_term, [
+        (str(30000000 + i), f'{surname}, PLAYER{i} MIDDLE') for i in range(count)
+    ])
+
+def zero_results_page(search_term: str) -> str:
+    return ZERO_RESULTS_PAGE.format(search_term=html.escape(search_term))
+
+def page_for(search_term: str) -> str:
+    term = search_term.strip()
+    if term.isdigit():
+        return zero_results_page(term) if term.startswith('9') else single_id_page(term)
+    if 'BLOCKED' in term.upper():
+        return CLOUDFLARE_PAGE
+    if 'NOBODY' in term.upper():
+        return zero_results_page(term)
+    return surname_page(term)
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 128
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real site, so the client's pooled connections are exercised
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this Nagle adds ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        search_term = parse_qs(urlparse(self.path).query).get('name', [''])[0]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = page_for(search_term).encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(port: int = 0, latency: float = 0.0):
+    """
+    Start the stub server on a background thread
+
+    Returns:
+        (server, base_url) - call server.shutdown() when done
+    """
+    server = StubServer(('127.0.0.1', port), StubHandler)
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/datapage/player-search.php'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded uschess.org player-search pages')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Artificial delay per response')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency_ms / 1000)
+    print(f'Serving fixtures at {base_url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
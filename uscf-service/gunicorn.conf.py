@@ -0,0 +1,66 @@
+"""
+Gunicorn settings for running the USCF lookup service with several workers
+
+Every worker shares one upstream rate limit and one player cache through
+SQLite files, so adding workers scales request handling across cores
+without multiplying traffic to uschess.org.
+
+A CSV or SQLite USCF_PLAYER_DATA is compiled once, before the workers start,
+into a snapshot in USCF_SHARED_DIR (see player_snapshot.py) and every worker
+maps that instead of loading its own copy; it is recompiled at the next start
+once the dataset changes. A USCF_PLAYER_DATA that is already a snapshot is used as it is.
+
+Run with: gunicorn -c gunicorn.conf.py
+
+    USCF_WORKERS          worker processes (default: CPU count)
+    USCF_THREADS          threads per worker in WSGI mode (default: 8)
+    USCF_BACKLOG          pending connections the listening socket holds (default: 2048)
+    USCF_WORKER_TIMEOUT   seconds a silent worker is given before it is restarted (default: 60)
+    USCF_GRACEFUL_TIMEOUT seconds workers get to finish requests on shutdown (default: 30)
+    USCF_KEEPALIVE        seconds idle keep-alive connections stay open (default: 5)
+    USCF_SHARED_DIR       directory for the shared SQLite files (default: /tmp/uscf-service)
+    USCF_SERVICE_MODE     "asgi" runs uscf_asgi:app on uvicorn workers instead of the Flask app
+"""
+import multiprocessing
+import os
+
+shared_dir = os.environ.get('USCF_SHARED_DIR', '/tmp/uscf-service')
+os.makedirs(shared_dir, exist_ok=True)
+
+# Set before the app is imported in each worker, so every worker opens the same files
+os.environ.setdefault('USCF_SHARED_THROTTLE_PATH', os.path.join(shared_dir, 'throttle.db'))
+os.environ.setdefault('USCF_CACHE_PATH', os.path.join(shared_dir, 'cache.db'))
+
+if os.environ.get('USCF_SERVICE_MODE') == 'asgi':
+    wsgi_app = 'uscf_asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'uscf_service:app'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('USCF_THREADS', 8))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('USCF_WORKERS', multiprocessing.cpu_count()))
+backlog = int(os.environ.get('USCF_BACKLOG', 2048))
+# Long enough for a name search that queues behind the rate limit and then fetches
+timeout = int(os.environ.get('USCF_WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('USCF_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('USCF_KEEPALIVE', 5))
+
+accesslog = '-'
+
+def on_starting(server):
+    """Compile the player dataset into a snapshot the workers will map, before any of them start"""
+    from player_snapshot import compile_snapshot
+    from player_store import DEFAULT_PLAYER_DATA
+    
+    source = os.environ.get('USCF_PLAYER_DATA', DEFAULT_PLAYER_DATA)
+    try:
+        snapshot = compile_snapshot(source, shared_dir)
+    except Exception as e:
+        server.log.error(f"Could not compile {source} into a snapshot; each worker will load it: {e}")
+        return
+    if snapshot is not None:
+        # Workers are forked from this process, so they all inherit the snapshot's path
+        os.environ['USCF_PLAYER_DATA'] = snapshot
+        server.log.info(f"Workers will map the player snapshot {snapshot}")
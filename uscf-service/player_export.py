@@ -0,0 +1,135 @@
+"""
+Compact SQLite export of the player dataset for querying in the browser
+
+The export is a small, fully indexed SQLite database that sql.js can open
+straight from a fetched ArrayBuffer, so the frontend can answer most player
+searches itself instead of calling /uscf-lookup-name:
+
+    players         uscfId INTEGER PRIMARY KEY, lastName, firstName, middleName,
+                    state, uscfExpiration (YYYY-MM-DD), regularRating, quickRating
+    name_tokens     (token, field, uscfId), field 0 = last name, 1 = first name;
+                    tokens as produced by player_store.normalize_name_tokens:
+                    upper-case ASCII, accents folded, one row per name part
+    meta            key/value: format, syncedAt, players
+    
+A prefix search for last name "Smi" and first name "J":
+
+    SELECT p.* FROM players p
+    WHERE p.uscfId IN (SELECT uscfId FROM name_tokens WHERE field = 0 AND token >= 'SMI' AND token < 'SMJ')
+      AND p.uscfId IN (SELECT uscfId FROM name_tokens WHERE field = 1 AND token >= 'J' AND token < 'K')
+      
+meta.syncedAt is the time.time() the export was taken; pass it to
+/players/changes?since= to fetch only the players changed since.
+
+    python player_export.py master-players.csv ../public/master_player_database.db
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Iterable, Optional
+import logging
+
+from uscf_lookup import USCFPlayer
+from player_store import PlayerStore, normalize_name_tokens, split_name
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+SCHEMA = (
+    "CREATE TABLE players ("
+    "uscfId INTEGER PRIMARY KEY, lastName TEXT NOT NULL, firstName TEXT, middleName TEXT, state TEXT, "
+    "uscfExpiration TEXT, regularRating INTEGER, quickRating INTEGER)",
+    "CREATE TABLE name_tokens ("
+    "token TEXT NOT NULL, field INTEGER NOT NULL, uscfId INTEGER NOT NULL, "
+    "PRIMARY KEY (token, field, uscfId)) WITHOUT ROWID",
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID",
+)
+
+LAST_NAME_FIELD = 0
+FIRST_NAME_FIELD = 1
+
+def export_players(players: Iterable[USCFPlayer], path: str, synced_at: Optional[float] = None) -> int:
+    """
+    Write players to a compact SQLite export
+    
+    Rows are inserted in key order and the file is vacuumed, so every page is
+    full; the file is written next to path and renamed into place, so a
+    download in progress is never cut short by a rebuild.
+    
+    Args:
+        players: Players to export; IDs with a leading zero are skipped, as
+                 they can't be stored as integer keys
+        path: File to write
+        synced_at: time.time() the players were read at (default: now)
+        
+    Returns:
+        Number of players written
+    """
+    synced_at = time.time() if synced_at is None else synced_at
+    by_id = {}
+    for player in players:
+        if player.uscf_id.isdigit() and not player.uscf_id.startswith('0'):
+            by_id[int(player.uscf_id)] = player
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.players-', suffix='.db')
+    os.close(fd)
+    try:
+        db = sqlite3.connect(temp_path)
+        try:
+            db.execute("PRAGMA page_size = 4096")
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            for statement in SCHEMA:
+                db.execute(statement)
+            
+            tokens = []
+            rows = []
+            for uscf_id in sorted(by_id):
+                player = by_id[uscf_id]
+                last, first, middle = split_name(player.name)
+                rows.append((uscf_id, last, first or None, middle or None, player.state,
+                             player.expiration_date, player.rating_regular, player.rating_quick))
+                for field, value in ((LAST_NAME_FIELD, last), (FIRST_NAME_FIELD, first)):
+                    tokens.extend((token, field, uscf_id) for token in set(normalize_name_tokens(value)))
+            db.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            del rows
+            tokens.sort()
+            db.executemany("INSERT INTO name_tokens VALUES (?, ?, ?)", tokens)
+            del tokens
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('format', str(FORMAT_VERSION)),
+                ('syncedAt', repr(synced_at)),
+                ('players', str(len(by_id))),
+            ])
+            db.commit()
+            db.execute("VACUUM")
+        finally:
+            db.close()
+        # mkstemp creates the file private to this user; workers may run as another
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(by_id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the player dataset as a compact SQLite file for sql.js')
+    parser.add_argument('source', help='master-players.csv, a SQLite players database or a .snap snapshot')
+    parser.add_argument('output', help='SQLite file to write, e.g. ../public/master_player_database.db')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    store = PlayerStore.from_path(args.source)
+    if not len(store):
+        sys.exit(f"No players loaded from {args.source}")
+    written = export_players(store.players(), args.output)
+    print(f"Wrote {written} players to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == '__main__':
+    main()
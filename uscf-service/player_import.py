@@ -0,0 +1,246 @@
+"""
+Bulk import of USCF player files into a local player database
+
+Reads master-players.csv, USCF rating supplements and member exports and
+applies them to a SQLite player database - the players table that
+PlayerStore.load_sqlite reads - so ratings are refreshed in bulk instead of
+scraped one player at a time.
+
+Files are streamed row by row, and compared against the database one batch
+at a time, so memory stays bounded however large the file. Only new and
+changed players are written, one transaction per batch.
+
+Any comma, tab or pipe delimited file with a header row works, and .zip
+archives are read from their first data file. Column names are matched
+loosely (uscfId, "Mem ID", "USCF ID" ...); see COLUMN_ALIASES.
+
+    python player_import.py players.db master-players.csv
+    python player_import.py players.db RS2501.zip --snapshot players.snap
+    
+Point USCF_PLAYER_DATA at players.db (or the snapshot) to serve the result.
+"""
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+from uscf_lookup import USCFPlayer
+from player_store import PLAYER_COLUMNS, player_from_row, player_to_row
+
+logger = logging.getLogger(__name__)
+
+# Accepted spellings of each column, compared lower-case with punctuation removed
+COLUMN_ALIASES = {
+    'uscfId': ('uscfid', 'memid', 'memberid', 'id', 'uscf'),
+    'lastName': ('lastname', 'last', 'surname'),
+    'firstName': ('firstname', 'first'),
+    'middleName': ('middlename', 'middle'),
+    'name': ('name', 'memname', 'membername', 'fullname', 'playername'),
+    'state': ('state', 'st', 'memstate'),
+    'uscfExpiration': ('uscfexpiration', 'expiration', 'expdate', 'exp', 'memexpdate', 'memexp'),
+    'regularRating': ('regularrating', 'regular', 'reg', 'rating', 'regrating', 'regrtg', 'rrating'),
+    'quickRating': ('quickrating', 'quick', 'qck', 'qckrating', 'quickrtg', 'qckrtg', 'qrating'),
+}
+_ALIAS_COLUMNS = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+_HEADER_KEY_RE = re.compile(r'[^a-z]')
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS players ("
+    "uscfId TEXT PRIMARY KEY, lastName TEXT NOT NULL, firstName TEXT, middleName TEXT, state TEXT, "
+    "uscfExpiration TEXT, regularRating INTEGER, quickRating INTEGER, importedAt REAL)"
+)
+
+def _decode(line: bytes) -> str:
+    # Exports are usually UTF-8 but some come through as cp1252 (e.g. "ACUÑA"); decide per line
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode('cp1252', errors='replace')
+
+@contextmanager
+def _open_lines(path: str) -> Iterator[Iterator[str]]:
+    """Yield the decoded lines of a text file, or of the first data file in a .zip archive"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith(('.csv', '.txt', '.tsv'))]
+            if not members:
+                raise ValueError(f"{path} contains no .csv, .tsv or .txt file")
+            with archive.open(members[0]) as f:
+                yield (_decode(line) for line in f)
+    else:
+        with open(path, 'rb') as f:
+            yield (_decode(line) for line in f)
+
+def read_players(path: str, stats: Optional[Dict[str, int]] = None) -> Iterator[USCFPlayer]:
+    """
+    Stream the players in a player file
+    
+    Args:
+        path: Delimited text file with a header row, or a .zip archive holding one
+        stats: Optional dict whose "rows" and "invalid" counts are incremented as rows are read
+        
+    Raises:
+        ValueError: If the file has no recognizable USCF ID column
+    """
+    stats = stats if stats is not None else {}
+    with _open_lines(path) as lines:
+        header_line = next(lines, '').lstrip('\ufeff')
+        delimiter = max(('\t', '|', ','), key=header_line.count)
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        columns = [_ALIAS_COLUMNS.get(_HEADER_KEY_RE.sub('', key.lower())) for key in header]
+        if 'uscfId' not in columns:
+            raise ValueError(f"{path} has no USCF ID column (header: {header_line.strip()[:200]!r})")
+        
+        for values in csv.reader(lines, delimiter=delimiter):
+            if not values:
+                continue
+            stats['rows'] = stats.get('rows', 0) + 1
+            row = {column: value for column, value in zip(columns, values) if column and value}
+            player = player_from_row(row)
+            if player is None:
+                stats['invalid'] = stats.get('invalid', 0) + 1
+                continue
+            yield player
+
+def _merge(existing: Optional[USCFPlayer], incoming: USCFPlayer) -> USCFPlayer:
+    """Incoming values win, but a file without a column (e.g. no quick ratings) doesn't erase it"""
+    if existing is None:
+        return incoming
+    return incoming._replace(**{
+        field: getattr(existing, field)
+        for field in ('rating_regular', 'rating_quick', 'state', 'expiration_date')
+        if getattr(incoming, field) is None
+    })
+
+class PlayerImporter:
+    """
+    Applies player files to a SQLite player database as incremental diffs
+    
+    Usage:
+        importer = PlayerImporter('players.db')
+        stats = importer.import_file('RS2501.zip')
+    """
+    
+    # Players compared and written per transaction
+    BATCH_SIZE = 5000
+    # IDs per SELECT when diffing a batch; well under SQLite's bound-parameter limit
+    QUERY_CHUNK = 500
+    
+    def __init__(self, db_path: str, batch_size: Optional[int] = None):
+        self.db_path = db_path
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self._db = sqlite3.connect(db_path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+    
+    def close(self):
+        self._db.close()
+    
+    def _existing(self, uscf_ids: List[str]) -> Dict[str, USCFPlayer]:
+        existing = {}
+        for start in range(0, len(uscf_ids), self.QUERY_CHUNK):
+            chunk = uscf_ids[start:start + self.QUERY_CHUNK]
+            cursor = self._db.execute(
+                f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players WHERE uscfId IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for values in cursor:
+                player = player_from_row(dict(zip(PLAYER_COLUMNS, values)))
+                if player is not None:
+                    existing[player.uscf_id] = player
+        return existing
+    
+    def _apply_batch(self, batch: Dict[str, USCFPlayer], stats: Dict[str, int]):
+        existing = self._existing(list(batch))
+        changed = []
+        for uscf_id, incoming in batch.items():
+            player = _merge(existing.get(uscf_id), incoming)
+            if player == existing.get(uscf_id):
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if uscf_id in existing else 'inserted'] += 1
+            changed.append(player)
+        
+        if changed:
+            now = time.time()
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO players ({', '.join(PLAYER_COLUMNS)}, importedAt) "
+                    f"VALUES ({', '.join('?' * (len(PLAYER_COLUMNS) + 1))})",
+                    ([*player_to_row(player).values(), now] for player in changed)
+                )
+    
+    def import_players(self, players: Iterable[USCFPlayer]) -> Dict[str, float]:
+        """
+        Apply a stream of players, writing only new and changed ones
+        
+        Returns:
+            Counts of inserted, updated and unchanged players, and elapsed seconds
+        """
+        started = time.perf_counter()
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        batch: Dict[str, USCFPlayer] = {}
+        for player in players:
+            # A later row for the same ID in one file replaces the earlier one
+            batch[player.uscf_id] = _merge(batch.get(player.uscf_id), player)
+            if len(batch) >= self.batch_size:
+                self._apply_batch(batch, stats)
+                batch = {}
+        if batch:
+            self._apply_batch(batch, stats)
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return stats
+    
+    def import_file(self, path: str) -> Dict[str, float]:
+        """
+        Apply a player file, see read_players
+        
+        Returns:
+            import_players counts plus the rows read and rows skipped as invalid
+        """
+        read_stats = {'rows': 0, 'invalid': 0}
+        stats = self.import_players(read_players(path, read_stats))
+        stats.update(read_stats)
+        logger.info(f"Imported {path}: {stats}")
+        return stats
+    
+    def players(self) -> Iterator[USCFPlayer]:
+        """Stream every player in the database"""
+        for values in self._db.execute(f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players"):
+            player = player_from_row(dict(zip(PLAYER_COLUMNS, values)))
+            if player is not None:
+                yield player
+
+def main():
+    parser = argparse.ArgumentParser(description='Import USCF player files into a local player database')
+    parser.add_argument('database', help='SQLite player database to create or update, e.g. players.db')
+    parser.add_argument('files', nargs='+', help='master-players.csv, rating supplements or member exports (.zip ok)')
+    parser.add_argument('--batch-size', type=int, default=PlayerImporter.BATCH_SIZE,
+                        help='Players compared and written per transaction')
+    parser.add_argument('--snapshot', help='Also compile the database into this snapshot file')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    importer = PlayerImporter(args.database, args.batch_size)
+    try:
+        for path in args.files:
+            stats = importer.import_file(path)
+            print(f"{os.path.basename(path)}: {stats['inserted']} new, {stats['updated']} updated, "
+                  f"{stats['unchanged']} unchanged, {stats['invalid']} invalid rows in {stats['seconds']}s")
+        if args.snapshot:
+            from player_snapshot import write_snapshot
+            written = write_snapshot(importer.players(), args.snapshot)
+            print(f"Wrote {written} players to {args.snapshot}")
+    finally:
+        importer.close()
+
+if __name__ == '__main__':
+    main()
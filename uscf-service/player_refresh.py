@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Iterable, Optional
+import logging
+
+from uscf_lookup import USCFLookup, USCFPlayer, PRIORITY_BACKGROUND
+
+try:
+    import fcntl
+except ImportError:  # Windows; every process refreshes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Queue priorities, lowest first
+PRIORITY_EVENT = 0      # registered for an upcoming event
+PRIORITY_EXPIRING = 1   # membership expires (or expired) within expiring_days
+PRIORITY_SEEN = 2       # looked up through the service but never refreshed
+PRIORITY_ROUTINE = 3    # everyone else
+
+class RefreshJob:
+    """
+    Background job that keeps the local player store current
+    
+    Walks every player in the store plus IDs seen through the service and
+    re-fetches each one from uschess.org at a steady pace, so peak-time
+    lookups are answered locally and upstream load is spread across the day.
+    Players registered for upcoming events and players whose membership is
+    about to expire are refreshed first.
+    
+    The queue and every refreshed record are written to SQLite as the job
+    goes, so a restarted service reloads the refreshed records and the job
+    resumes where it left off. When several worker processes share the file,
+    one of them refreshes and the others pick up its results from SQLite.
+    """
+    
+    def __init__(self, lookup: USCFLookup, db_path: str, interval: float = 10.0,
+                 max_age_seconds: float = 86400, expiring_days: int = 30,
+                 retry_seconds: float = 3600):
+        """
+        Initialize the refresh job
+        
+        Args:
+            lookup: Lookup whose store, cache and request scheduler are refreshed
+            db_path: SQLite file holding the refresh queue and refreshed players
+            interval: Minimum seconds between refresh requests
+            max_age_seconds: How long a refreshed player stays current before it is due again
+            expiring_days: Memberships expiring within this many days (either side of today) get priority
+            retry_seconds: How long to wait before retrying a player whose refresh failed
+        """
+        self.lookup = lookup
+        self.interval = interval
+        self.max_age = max_age_seconds
+        self.expiring_days = expiring_days
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # IDs already in the queue, so tracking a lookup doesn't write to SQLite every time
+        self._known = set()
+        self._lock_path = f"{db_path}.lock"
+        self._lock_file = None
+        # Newest refreshed_at already applied to the store
+        self._synced_at = 0.0
+        
+        self.refreshed = 0
+        self.not_found = 0
+        self.failed = 0
+        
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS refresh_queue ("
+            "uscf_id TEXT PRIMARY KEY, priority INTEGER NOT NULL, "
+            "refreshed_at REAL NOT NULL DEFAULT 0, attempted_at REAL NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS refresh_queue_due ON refresh_queue (priority, refreshed_at);"
+            "CREATE TABLE IF NOT EXISTS refreshed_players ("
+            "uscf_id TEXT PRIMARY KEY, name TEXT NOT NULL, rating_regular INTEGER, rating_quick INTEGER, "
+            "state TEXT, expiration_date TEXT, refreshed_at REAL NOT NULL);"
+        )
+        self._db.commit()
+        self._known.update(row[0] for row in self._db.execute("SELECT uscf_id FROM refresh_queue"))
+    
+    def _base_priority(self, player: Optional[USCFPlayer], today: Optional[date] = None) -> int:
+        if player is None or not player.expiration_date:
+            return PRIORITY_ROUTINE
+        today = today or date.today()
+        window = timedelta(days=self.expiring_days)
+        if (today - window).isoformat() <= player.expiration_date <= (today + window).isoformat():
+            return PRIORITY_EXPIRING
+        return PRIORITY_ROUTINE
+    
+    def load_into_store(self) -> int:
+        """
+        Apply records refreshed since the last call (by any process) to the lookup's store
+        
+        Returns:
+            Number of players loaded
+        """
+        if self.lookup.store is None:
+            return 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT uscf_id, name, rating_regular, rating_quick, state, expiration_date, refreshed_at "
+                "FROM refreshed_players WHERE refreshed_at > ? ORDER BY refreshed_at",
+                (self._synced_at,)
+            ).fetchall()
+        for row in rows:
+            self.lookup.store.add(USCFPlayer(*row[:6]))
+        if rows:
+            self._synced_at = rows[-1][6]
+        return len(rows)
+    
+    def seed(self) -> int:
+        """
+        Queue every player in the store, re-prioritizing those already queued
+        
+        Returns:
+            Number of players queued
+        """
+        if self.lookup.store is None:
+            return 0
+        today = date.today()
+        rows = [(player.uscf_id, self._base_priority(player, today)) for player in self.lookup.store.players()]
+        with self._lock:
+            # Keep a pending event priority; otherwise take the priority for the current expiration
+            self._db.executemany(
+                "INSERT INTO refresh_queue (uscf_id, priority) VALUES (?, ?) "
+                "ON CONFLICT (uscf_id) DO UPDATE SET priority = MIN(priority, excluded.priority) "
+                f"WHERE priority > {PRIORITY_EVENT}",
+                rows
+            )
+            self._db.commit()
+            self._known.update(uscf_id for uscf_id, _ in rows)
+        return len(rows)
+    
+    def track(self, uscf_id: str):
+        """Queue an ID seen through the service so it is kept current from now on"""
+        if uscf_id in self._known:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO refresh_queue (uscf_id, priority) VALUES (?, ?)", (uscf_id, PRIORITY_SEEN)
+            )
+            self._db.commit()
+            self._known.add(uscf_id)
+    
+    def prioritize(self, uscf_ids: Iterable[str]) -> int:
+        """
+        Refresh these players ahead of everyone else, e.g. the roster of an upcoming event
+        
+        Players refreshed within the last max_age_seconds are left alone.
+        
+        Returns:
+            Number of players queued
+        """
+        ids = [uscf_id for uscf_id in (self.lookup._normalize_id(i) for i in uscf_ids) if uscf_id]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO refresh_queue (uscf_id, priority) VALUES (?, ?) "
+                "ON CONFLICT (uscf_id) DO UPDATE SET priority = excluded.priority, attempted_at = 0",
+                [(uscf_id, PRIORITY_EVENT) for uscf_id in ids]
+            )
+            self._db.commit()
+            self._known.update(ids)
+        return len(ids)
+    
+    def _next_due(self) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT uscf_id FROM refresh_queue WHERE refreshed_at < ? AND attempted_at < ? "
+                "ORDER BY priority, refreshed_at LIMIT 1",
+                (now - self.max_age, now - self.retry_seconds)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def _record(self, uscf_id: str, fetched: bool, player: Optional[USCFPlayer]):
+        now = time.time()
+        with self._lock:
+            if not fetched:
+                self._db.execute("UPDATE refresh_queue SET attempted_at = ? WHERE uscf_id = ?", (now, uscf_id))
+            else:
+                self._db.execute(
+                    "UPDATE refresh_queue SET priority = ?, refreshed_at = ?, attempted_at = ? WHERE uscf_id = ?",
+                    (self._base_priority(player), now, now, uscf_id)
+                )
+                if player is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO refreshed_players VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (*player, now)
+                    )
+            self._db.commit()
+    
+    def _interactive_waiting(self) -> bool:
+        queued = self.lookup.scheduler.stats()['queued']
+        return any(count for priority, count in queued.items() if priority != PRIORITY_BACKGROUND)
+    
+    def run_once(self) -> Optional[str]:
+        """
+        Refresh the most urgent due player
+        
+        Returns:
+            The refreshed USCF ID, or None if nothing was due
+        """
+        uscf_id = self._next_due()
+        if uscf_id is None:
+            return None
+        
+        fetched, player = self.lookup.refresh_by_id(uscf_id, timeout=self.interval)
+        self._record(uscf_id, fetched, player)
+        if not fetched:
+            self.failed += 1
+        elif player is None:
+            self.not_found += 1
+        else:
+            self.refreshed += 1
+        return uscf_id
+    
+    def _is_leader(self) -> bool:
+        """Whether this process holds the refresh lock; only one process sharing the database refreshes"""
+        if self._lock_file is not None or fcntl is None:
+            return True
+        lock_file = open(self._lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        logger.info(f"Process {os.getpid()} is running the background refresh")
+        self._lock_file = lock_file
+        return True
+    
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                if not self._is_leader():
+                    self.load_into_store()
+                # Leave the rate budget to interactive lookups while any are waiting
+                elif not self._interactive_waiting():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Refresh failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    def start(self):
+        """Start refreshing on a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='uscf-refresh', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            queued, due = self._db.execute(
+                "SELECT COUNT(*), SUM(refreshed_at < ?) FROM refresh_queue", (now - self.max_age,)
+            ).fetchone()
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'leader': self._lock_file is not None,
+            'queued': queued,
+            'due': due or 0,
+            'refreshed': self.refreshed,
+            'not_found': self.not_found,
+            'failed': self.failed
+        }
@@ -0,0 +1,374 @@
+"""
+Compiled, memory-mapped snapshot of the player dataset
+
+A snapshot holds the same players as master-players.csv in a columnar binary
+file that is mapped into memory rather than parsed, so the service starts in
+milliseconds whatever the size of the dataset and every worker process shares
+the same pages through the OS page cache.
+
+Layout (little-endian, every section 4-byte aligned):
+
+    header          magic, version and section sizes
+    ids             u32 per player, sorted ascending (the ID index)
+    rating_regular  u16 per player, 0xFFFF = unrated
+    rating_quick    u16 per player, 0xFFFF = unrated
+    expiration      u32 per player as YYYYMMDD, 0 = unknown
+    state           u32 string number per player
+    last/first/middle name
+                    u32 string number per player
+    last/first name index
+                    (token string number, player row) u32 pairs sorted by
+                    normalized name token, then row
+    string offsets  u32 per string plus one, into the string blob
+    string blob     UTF-8; every distinct name part, state and token once
+    
+Convert the existing dataset with:
+
+    python player_snapshot.py master-players.csv players.snap
+    python player_snapshot.py players.db players.snap
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from uscf_lookup import USCFPlayer
+from player_store import PlayerStore, normalize_name_tokens, split_name
+
+try:
+    import fcntl
+except ImportError:  # Windows; concurrent compiles just write the same file twice
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'USCFSNAP'
+VERSION = 1
+
+# magic, version, players, strings, last name index entries, first name index entries, string blob bytes
+_HEADER = struct.Struct('<8sIIIIII')
+
+NO_RATING = 0xFFFF
+NAME_FIELDS = ('last', 'first')
+
+def _padded(size: int) -> int:
+    return (size + 3) & ~3
+
+def _section_sizes(rows: int, strings: int, last_entries: int, first_entries: int) -> List[Tuple[str, str, int]]:
+    """(name, array typecode, item count) of every array section, in file order"""
+    return [
+        ('ids', 'I', rows),
+        ('rating_regular', 'H', rows),
+        ('rating_quick', 'H', rows),
+        ('expiration', 'I', rows),
+        ('state', 'I', rows),
+        ('last', 'I', rows),
+        ('first', 'I', rows),
+        ('middle', 'I', rows),
+        ('last_index', 'I', 2 * last_entries),
+        ('first_index', 'I', 2 * first_entries),
+        ('offsets', 'I', strings + 1),
+    ]
+
+def _encode_expiration(value: Optional[str]) -> int:
+    return int(value.replace('-', '')) if value else 0
+
+def _decode_expiration(value: int) -> Optional[str]:
+    if not value:
+        return None
+    text = str(value)
+    return f"{text[:4]}-{text[4:6]}-{text[6:]}"
+
+class _StringTable:
+    """Interns strings while a snapshot is built; string 0 is always the empty string"""
+    
+    def __init__(self):
+        self._numbers: Dict[str, int] = {'': 0}
+        self.strings: List[str] = ['']
+    
+    def intern(self, value: Optional[str]) -> int:
+        value = value or ''
+        number = self._numbers.get(value)
+        if number is None:
+            number = self._numbers[value] = len(self.strings)
+            self.strings.append(value)
+        return number
+
+def write_snapshot(players: Iterable[USCFPlayer], path: str) -> int:
+    """
+    Compile players into a snapshot file
+    
+    The file is written next to path and renamed into place, so workers that
+    already have the old snapshot mapped keep reading it undisturbed.
+    
+    Args:
+        players: Players to include; IDs must be numeric without leading zeros
+        path: Snapshot file to write
+        
+    Returns:
+        Number of players written
+    """
+    by_id: Dict[int, USCFPlayer] = {}
+    for player in players:
+        if not player.uscf_id.isdigit() or str(int(player.uscf_id)) != player.uscf_id:
+            logger.warning(f"Skipping player with unsupported USCF ID {player.uscf_id!r}")
+            continue
+        by_id[int(player.uscf_id)] = player
+    
+    table = _StringTable()
+    columns = {name: array(typecode) for name, typecode, _ in _section_sizes(0, 0, 0, 0)}
+    index_entries: Dict[str, List[Tuple[str, int]]] = {field: [] for field in NAME_FIELDS}
+    
+    for row, uscf_id in enumerate(sorted(by_id)):
+        player = by_id[uscf_id]
+        last, first, middle = split_name(player.name)
+        columns['ids'].append(uscf_id)
+        columns['rating_regular'].append(NO_RATING if player.rating_regular is None else player.rating_regular)
+        columns['rating_quick'].append(NO_RATING if player.rating_quick is None else player.rating_quick)
+        columns['expiration'].append(_encode_expiration(player.expiration_date))
+        columns['state'].append(table.intern(player.state))
+        columns['last'].append(table.intern(last))
+        columns['first'].append(table.intern(first))
+        columns['middle'].append(table.intern(middle))
+        for field, value in zip(NAME_FIELDS, (last, first)):
+            index_entries[field].extend((token, row) for token in set(normalize_name_tokens(value)))
+    
+    for field in NAME_FIELDS:
+        entries = index_entries[field]
+        # Tokens are ASCII, so sorting str matches the byte order used when searching
+        entries.sort()
+        column = columns[f'{field}_index']
+        for token, row in entries:
+            column.append(table.intern(token))
+            column.append(row)
+    
+    blob = bytearray()
+    for value in table.strings:
+        columns['offsets'].append(len(blob))
+        blob += value.encode('utf-8')
+    columns['offsets'].append(len(blob))
+    
+    if sys.byteorder != 'little':
+        for column in columns.values():
+            column.byteswap()
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.players-', suffix='.snap')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(by_id), len(table.strings),
+                                 len(index_entries['last']), len(index_entries['first']), len(blob)))
+            for name, _, _ in _section_sizes(0, 0, 0, 0):
+                data = columns[name].tobytes()
+                f.write(data)
+                f.write(b'\0' * (_padded(len(data)) - len(data)))
+            f.write(blob)
+        # mkstemp creates the file private to this user; workers may run as another
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(by_id)
+
+class PlayerSnapshot:
+    """
+    Read-only view of a snapshot file
+    
+    Nothing is parsed up front: columns are memoryviews over the mapped file
+    and players are decoded only when they are looked up.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Map a snapshot file
+        
+        Raises:
+            ValueError: The file is not a snapshot this version can read
+            OSError: The file can't be opened
+        """
+        if sys.byteorder != 'little':
+            raise ValueError("Snapshots can only be mapped on little-endian hosts")
+        
+        self.path = path
+        with open(path, 'rb') as f:
+            # An empty snapshot is still at least a header long, which mmap needs
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{path} is not a player snapshot")
+        magic, version, rows, strings, last_entries, first_entries, blob_len = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} player snapshot")
+        
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._columns = {}
+        for name, typecode, count in _section_sizes(rows, strings, last_entries, first_entries):
+            size = count * struct.calcsize(typecode)
+            self._columns[name] = view[offset:offset + size].cast(typecode)
+            offset += _padded(size)
+        if offset + blob_len > len(self._mmap):
+            raise ValueError(f"{path} is truncated")
+        
+        self._rows = rows
+        self._ids = self._columns['ids']
+        self._offsets = self._columns['offsets']
+        self._blob_start = offset
+    
+    def __len__(self) -> int:
+        return self._rows
+    
+    def __iter__(self) -> Iterator[USCFPlayer]:
+        return (self.player(row) for row in range(self._rows))
+    
+    def __contains__(self, uscf_id: str) -> bool:
+        return self._row(uscf_id) is not None
+    
+    def string(self, number: int) -> str:
+        start = self._blob_start + self._offsets[number]
+        end = self._blob_start + self._offsets[number + 1]
+        return self._mmap[start:end].decode('utf-8')
+    
+    def _string_bytes(self, number: int) -> bytes:
+        return self._mmap[self._blob_start + self._offsets[number]:self._blob_start + self._offsets[number + 1]]
+    
+    def _row(self, uscf_id: str) -> Optional[int]:
+        uscf_id = str(uscf_id).strip()
+        if not uscf_id.isdigit():
+            return None
+        key = int(uscf_id)
+        lo, hi = 0, self._rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ids[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._rows and self._ids[lo] == key and str(key) == uscf_id:
+            return lo
+        return None
+    
+    def uscf_id(self, row: int) -> str:
+        return str(self._ids[row])
+    
+    def player(self, row: int) -> USCFPlayer:
+        """Decode the player stored in a row"""
+        columns = self._columns
+        name = ", ".join(
+            part for part in (self.string(columns[field][row]) for field in ('last', 'first', 'middle')) if part
+        )
+        rating_regular = columns['rating_regular'][row]
+        rating_quick = columns['rating_quick'][row]
+        return USCFPlayer(
+            uscf_id=self.uscf_id(row),
+            name=name,
+            rating_regular=None if rating_regular == NO_RATING else rating_regular,
+            rating_quick=None if rating_quick == NO_RATING else rating_quick,
+            state=self.string(columns['state'][row]) or None,
+            expiration_date=_decode_expiration(columns['expiration'][row])
+        )
+    
+    def get(self, uscf_id: str) -> Optional[USCFPlayer]:
+        row = self._row(uscf_id)
+        return None if row is None else self.player(row)
+    
+    def name_tokens(self, row: int) -> Tuple[List[str], List[str]]:
+        """Normalized (last name, first name) tokens of a row, as indexed"""
+        return (normalize_name_tokens(self.string(self._columns['last'][row])),
+                normalize_name_tokens(self.string(self._columns['first'][row])))
+    
+    def _lower_bound(self, entries: memoryview, key: bytes) -> int:
+        lo, hi = 0, len(entries) // 2
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string_bytes(entries[2 * mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def token_rows(self, field: str, token: str, prefix: bool = False) -> List[int]:
+        """
+        Rows whose last or first name has a normalized token equal to (or starting with) token
+        
+        Args:
+            field: "last" or "first"
+            token: Token from normalize_name_tokens
+            prefix: Match every token starting with token
+        """
+        entries = self._columns[f'{field}_index']
+        key = token.encode('ascii')
+        start = self._lower_bound(entries, key)
+        end = self._lower_bound(entries, key + (b'\x7f' if prefix else b'\0'))
+        return [entries[2 * i + 1] for i in range(start, end)]
+    
+    def tokens(self, field: str) -> Iterator[str]:
+        """Every distinct normalized token in the last or first name index, in sorted order"""
+        entries = self._columns[f'{field}_index']
+        previous = None
+        for i in range(0, len(entries), 2):
+            if entries[i] != previous:
+                previous = entries[i]
+                yield self.string(previous)
+    
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self._mmap.close()
+
+def compile_snapshot(source: str, directory: str) -> Optional[str]:
+    """
+    Snapshot of a CSV or SQLite dataset, compiled into directory unless an up-to-date one is there
+    
+    Run once before workers start (gunicorn's on_starting), so the dataset is
+    parsed once and every worker maps the result. A lock file in directory
+    keeps servers started side by side from compiling it at the same time.
+    
+    Args:
+        source: master-players.csv or a SQLite database with a players table
+        directory: Where to keep the snapshot, e.g. USCF_SHARED_DIR
+        
+    Returns:
+        Path to the snapshot, or None if source is already a snapshot, is missing or has no players
+    """
+    if not source or source.endswith('.snap') or not os.path.exists(source):
+        return None
+    # Named for the source's full path, so switching datasets never picks up the old snapshot
+    name, _ = os.path.splitext(os.path.basename(source))
+    digest = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:8]
+    path = os.path.join(directory, f'{name}-{digest}.snap')
+    with open(path + '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+            return path
+        store = PlayerStore.from_path(source)
+        if not len(store):
+            return None
+        written = write_snapshot(store.players(), path)
+    logger.info(f"Compiled {written} players from {source} into {path}")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the player dataset into a memory-mapped snapshot')
+    parser.add_argument('source', help='master-players.csv or a SQLite database with a players table')
+    parser.add_argument('output', help='Snapshot file to write, e.g. players.snap')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    store = PlayerStore.from_path(args.source)
+    if not len(store):
+        sys.exit(f"No players loaded from {args.source}")
+    written = write_snapshot(store.players(), args.output)
+    print(f"Wrote {written} players to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,616 @@
+import bisect
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from datetime import date, datetime
+from typing import Optional, Callable, List, Dict, FrozenSet, Iterable, Iterator, Set, Tuple
+import logging
+
+from uscf_lookup import USCFPlayer, format_name
+
+logger = logging.getLogger(__name__)
+
+# Default dataset shipped with the Next.js app (only present when running from the repo)
+DEFAULT_PLAYER_DATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'public', 'data', 'master-players.csv'
+)
+
+_RATING_RE = re.compile(r'^(\d+)')
+
+def _parse_expiration(value: str) -> Optional[str]:
+    """Normalize an expiration date like "1/31/2026" to ISO "2026-01-31" """
+    value = (value or '').strip().split('T')[0]
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def _parse_rating(value) -> Optional[int]:
+    match = _RATING_RE.match(str(value or '').strip())
+    return int(match.group(1)) if match else None
+
+# Column names of master-players.csv and of the players table in a SQLite player database
+PLAYER_COLUMNS = ('uscfId', 'lastName', 'firstName', 'middleName', 'state', 'uscfExpiration',
+                  'regularRating', 'quickRating')
+
+def player_from_row(row: dict) -> Optional[USCFPlayer]:
+    """
+    Build a player from a row keyed by PLAYER_COLUMNS, or None if it has no valid ID or last name
+    
+    A single name column ("LAST, FIRST MIDDLE" as uschess.org shows it, or
+    "LAST, FIRST, MIDDLE") is accepted in place of the name parts, and split
+    the way scraped names are.
+    """
+    uscf_id = str(row.get('uscfId') or '').strip()
+    last_name = (row.get('lastName') or '').strip()
+    first_name = (row.get('firstName') or '').strip()
+    middle_name = (row.get('middleName') or '').strip()
+    if not last_name and row.get('name'):
+        last_name, first_name, middle_name = split_name(format_name(row['name']))
+    if not re.match(r'^\d{7,8}$', uscf_id) or not last_name:
+        return None
+    
+    state = (row.get('state') or '').strip()
+    name = ", ".join(part for part in (last_name, first_name, middle_name) if part)
+    return USCFPlayer(
+        uscf_id=uscf_id,
+        name=name,
+        rating_regular=_parse_rating(row.get('regularRating')),
+        rating_quick=_parse_rating(row.get('quickRating')),
+        state=state if re.match(r'^[A-Z]{2}$', state) else None,
+        expiration_date=_parse_expiration(row.get('uscfExpiration'))
+    )
+
+def player_to_row(player: USCFPlayer) -> dict:
+    """The PLAYER_COLUMNS row for a player, the inverse of player_from_row"""
+    last_name, first_name, middle_name = split_name(player.name)
+    return {
+        'uscfId': player.uscf_id,
+        'lastName': last_name,
+        'firstName': first_name,
+        'middleName': middle_name,
+        'state': player.state,
+        'uscfExpiration': player.expiration_date,
+        'regularRating': player.rating_regular,
+        'quickRating': player.rating_quick
+    }
+
+_NON_LETTER_RE = re.compile(r'[^A-Z]+')
+
+_SOUNDEX_CODES = {}
+for _letters, _code in (('BFPV', '1'), ('CGJKQSXZ', '2'), ('DT', '3'), ('L', '4'), ('MN', '5'), ('R', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _code
+
+def normalize_name_tokens(name: Optional[str]) -> List[str]:
+    """
+    Split a name into upper-case ASCII tokens for indexing and querying
+    
+    Accents are folded ("ACUÑA" -> "ACUNA") and hyphenated or multi-word names
+    yield each part plus the joined form, so "ADAMS-LUONG" can be found as
+    "ADAMS", "LUONG" or "ADAMSLUONG".
+    """
+    folded = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii').upper()
+    parts = [part for part in _NON_LETTER_RE.split(folded) if part]
+    if len(parts) > 1:
+        parts.append(''.join(parts))
+    return parts
+
+def split_name(name: str) -> Tuple[str, str, str]:
+    """Split a "LAST, FIRST, MIDDLE" name into its (last, first, middle) parts"""
+    parts = [part.strip() for part in name.split(',', 2)]
+    parts += [''] * (3 - len(parts))
+    return parts[0], parts[1], parts[2]
+
+def player_name_tokens(player: USCFPlayer) -> Tuple[List[str], List[str]]:
+    """Normalized (last name, first name) tokens of a player"""
+    last, first, _ = split_name(player.name)
+    return normalize_name_tokens(last), normalize_name_tokens(first)
+
+@lru_cache(maxsize=65536)
+def soundex(token: str) -> str:
+    """American Soundex code for an upper-case ASCII token"""
+    if not token:
+        return ''
+    code = token[0]
+    previous = _SOUNDEX_CODES.get(token[0], '')
+    for letter in token[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W don't separate letters with the same code; vowels do
+        if letter not in 'HW':
+            previous = digit
+    return code.ljust(4, '0')
+
+@lru_cache(maxsize=65536)
+def _trigrams(token: str) -> FrozenSet[str]:
+    padded = f'  {token} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+class _TokenIndex:
+    """Exact, prefix, phonetic and trigram lookups over one name field"""
+    
+    # Minimum trigram similarity for a fuzzy match
+    FUZZY_THRESHOLD = 0.45
+    # Shorter query tokens are treated as prefixes only; fuzzy matching them is mostly noise
+    FUZZY_MIN_LENGTH = 3
+    
+    def __init__(self):
+        self._ids: Dict[str, Set[str]] = defaultdict(set)
+        self._soundex: Dict[str, Set[str]] = defaultdict(set)
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._sorted: List[str] = []
+        self._dirty = False
+    
+    def add(self, token: str, uscf_id: str):
+        if not self._ids[token]:
+            self._soundex[soundex(token)].add(token)
+            for trigram in _trigrams(token):
+                self._trigrams[trigram].add(token)
+            self._dirty = True
+        self._ids[token].add(uscf_id)
+    
+    def remove(self, token: str, uscf_id: str):
+        ids = self._ids.get(token)
+        if not ids:
+            return
+        ids.discard(uscf_id)
+        if not ids:
+            del self._ids[token]
+            self._soundex[soundex(token)].discard(token)
+            for trigram in _trigrams(token):
+                self._trigrams[trigram].discard(token)
+            self._dirty = True
+    
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        if self._dirty:
+            self._sorted = sorted(self._ids)
+            self._dirty = False
+        start = bisect.bisect_left(self._sorted, prefix)
+        end = bisect.bisect_left(self._sorted, prefix + '\x7f')
+        return self._sorted[start:end]
+    
+    def _fuzzy_tokens(self, token: str) -> List[str]:
+        query = _trigrams(token)
+        shared = defaultdict(int)
+        for trigram in query:
+            for candidate in self._trigrams.get(trigram, ()):
+                shared[candidate] += 1
+        # Shared trigrams needed for Jaccard similarity >= FUZZY_THRESHOLD with a same-length token
+        needed = max(1, int(len(query) * self.FUZZY_THRESHOLD))
+        return [candidate for candidate, count in shared.items() if count >= needed]
+    
+    def matching_tokens(self, tokens: Iterable[str], fuzzy: bool = True, prefix: bool = True) -> Set[str]:
+        """Indexed tokens matching any query token exactly or by prefix, or (if fuzzy) phonetically or by trigrams"""
+        matched = set()
+        for token in tokens:
+            if prefix:
+                matched.update(self._prefix_tokens(token))
+            if fuzzy and len(token) >= self.FUZZY_MIN_LENGTH:
+                matched.update(self._soundex.get(soundex(token), ()))
+                matched.update(self._fuzzy_tokens(token))
+        return matched
+    
+    def candidates(self, tokens: Iterable[str], fuzzy: bool = True) -> Set[str]:
+        """USCF IDs whose tokens match any query token exactly, by prefix, or (if fuzzy) phonetically or by trigrams"""
+        ids = set()
+        for token in self.matching_tokens(tokens, fuzzy):
+            ids.update(self._ids.get(token, ()))
+        return ids
+    
+    @classmethod
+    def score(cls, query: str, tokens: Iterable[str], fuzzy: bool = True) -> float:
+        """How well one query token matches the best of a player's tokens (0 to 1)"""
+        best = 0.0
+        fuzzy = fuzzy and len(query) >= cls.FUZZY_MIN_LENGTH
+        for token in tokens:
+            if token == query:
+                return 1.0
+            if token.startswith(query):
+                best = max(best, 0.8)
+            elif fuzzy:
+                query_trigrams, token_trigrams = _trigrams(query), _trigrams(token)
+                similarity = len(query_trigrams & token_trigrams) / len(query_trigrams | token_trigrams)
+                # Sounding alike scores 0.5-0.75 depending on spelling; spelling alone at most 0.7
+                if soundex(token) == soundex(query):
+                    best = max(best, 0.5 + 0.25 * similarity)
+                elif similarity >= cls.FUZZY_THRESHOLD:
+                    best = max(best, 0.7 * similarity)
+        return best
+
+def _result_order(result: Tuple[float, USCFPlayer]):
+    score, player = result
+    return -score, -(player.rating_regular or 0), player.name
+
+class PlayerSearchIndex:
+    """
+    Ranked name search over players
+    
+    Last and first names are indexed separately by exact token, sorted prefix,
+    Soundex code and trigrams. Results are ranked by match quality, then rating.
+    """
+    
+    # Score from a single name field at or above which a match is exact or prefix, not fuzzy
+    STRONG_MATCH = 0.8
+    
+    def __init__(self):
+        self._last = _TokenIndex()
+        self._first = _TokenIndex()
+        # uscf_id -> (last name tokens, first name tokens)
+        self._tokens: Dict[str, Tuple[List[str], List[str]]] = {}
+    
+    def add(self, player: USCFPlayer):
+        self.remove(player.uscf_id)
+        last_tokens, first_tokens = player_name_tokens(player)
+        
+        self._tokens[player.uscf_id] = (last_tokens, first_tokens)
+        for token in last_tokens:
+            self._last.add(token, player.uscf_id)
+        for token in first_tokens:
+            self._first.add(token, player.uscf_id)
+    
+    def remove(self, uscf_id: str):
+        tokens = self._tokens.pop(uscf_id, None)
+        if tokens is None:
+            return
+        for token in tokens[0]:
+            self._last.remove(token, uscf_id)
+        for token in tokens[1]:
+            self._first.remove(token, uscf_id)
+    
+    @staticmethod
+    def _field_score(query_tokens: List[str], tokens: List[str], fuzzy: bool) -> float:
+        if not query_tokens:
+            return 0.0
+        # A joined query like "ADAMSLUONG" can match on its own; otherwise average the parts
+        joined = _TokenIndex.score(query_tokens[-1], tokens, fuzzy) if len(query_tokens) > 1 else 0.0
+        parts = query_tokens[:-1] if len(query_tokens) > 1 else query_tokens
+        average = sum(_TokenIndex.score(token, tokens, fuzzy) for token in parts) / len(parts)
+        return max(joined, average)
+    
+    def search(self, first_name: Optional[str], last_name: Optional[str],
+               get_player: Callable[[str], USCFPlayer], limit: int = 50,
+               fuzzy: bool = True) -> List[Tuple[float, USCFPlayer]]:
+        """
+        Find and rank players by name
+        
+        Args:
+            first_name: First name or prefix (optional)
+            last_name: Last name or prefix (optional)
+            get_player: Returns the indexed player for a USCF ID
+            limit: Maximum number of results
+            fuzzy: Also match phonetically similar and misspelled names
+            
+        Returns:
+            (score, player) tuples, best first; score is 0-1 and at least
+            STRONG_MATCH when every given name matched exactly or by prefix
+        """
+        last_query = normalize_name_tokens(last_name)
+        first_query = normalize_name_tokens(first_name)
+        if not last_query and not first_query:
+            return []
+        
+        if last_query:
+            candidates = self._last.candidates(last_query, fuzzy)
+        else:
+            candidates = self._first.candidates(first_query, fuzzy)
+        
+        return self.rank(
+            last_query, first_query,
+            ((get_player(uscf_id), *self._tokens[uscf_id]) for uscf_id in candidates),
+            limit, fuzzy
+        )
+    
+    @classmethod
+    def rank(cls, last_query: List[str], first_query: List[str],
+             candidates: Iterable[Tuple[USCFPlayer, List[str], List[str]]],
+             limit: int = 50, fuzzy: bool = True) -> List[Tuple[float, USCFPlayer]]:
+        """
+        Score candidate players against normalized query tokens, best first
+        
+        Args:
+            last_query: normalize_name_tokens of the last name query
+            first_query: normalize_name_tokens of the first name query
+            candidates: (player, last name tokens, first name tokens) tuples
+        """
+        results = []
+        for player, last_tokens, first_tokens in candidates:
+            scores = []
+            if last_query:
+                scores.append(cls._field_score(last_query, last_tokens, fuzzy))
+            if first_query:
+                scores.append(cls._field_score(first_query, first_tokens, fuzzy))
+            if min(scores) <= 0:
+                continue
+            results.append((sum(scores) / len(scores), player))
+        
+        results.sort(key=_result_order)
+        return results[:limit]
+
+def player_matches(player: USCFPlayer, state: Optional[str] = None,
+                   min_rating: Optional[int] = None, max_rating: Optional[int] = None) -> bool:
+    """Whether a player is from the given state and within the rating range; unrated players fail rating filters"""
+    if state and (player.state or '').upper() != state.strip().upper():
+        return False
+    if min_rating is not None and (player.rating_regular is None or player.rating_regular < min_rating):
+        return False
+    if max_rating is not None and (player.rating_regular is None or player.rating_regular > max_rating):
+        return False
+    return True
+
+def filter_players(players: Iterable[USCFPlayer], state: Optional[str] = None,
+                   min_rating: Optional[int] = None, max_rating: Optional[int] = None) -> Iterator[USCFPlayer]:
+    """Yield the players that pass player_matches"""
+    return (player for player in players if player_matches(player, state, min_rating, max_rating))
+
+class PlayerStore:
+    """
+    Indexed in-memory copy of the master player dataset
+    
+    Players are indexed by USCF ID and by a ranked name search index so that
+    most lookups can be answered without going to uschess.org.
+    
+    A store loaded from a compiled snapshot (see player_snapshot.py) reads
+    players straight from the memory-mapped file instead. Players added
+    afterwards, e.g. by the background refresh, are held in memory and take
+    precedence over the snapshot's copy.
+    """
+    
+    STRONG_MATCH = PlayerSearchIndex.STRONG_MATCH
+    
+    def __init__(self):
+        self._by_id: Dict[str, USCFPlayer] = {}
+        self._index = PlayerSearchIndex()
+        # Background refresh adds players while requests are searching
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # Last and first name token vocabularies of the snapshot for phonetic and
+        # misspelled matches; None until built in the background after loading
+        self._snapshot_vocabulary: Optional[Dict[str, _TokenIndex]] = None
+        # Players added on top of the snapshot that it doesn't contain
+        self._added = 0
+        # time.time() each player last changed after the dataset was loaded, for
+        # delta sync; None until a dataset has been loaded
+        self._changed: Dict[str, float] = {}
+        self._changes_since: Optional[float] = None
+    
+    def __len__(self) -> int:
+        if self._snapshot is None:
+            return len(self._by_id)
+        return len(self._snapshot) + self._added
+    
+    @classmethod
+    def from_path(cls, path: Optional[str]) -> 'PlayerStore':
+        """
+        Build a store from a CSV, SQLite or snapshot file, returning an empty store if it can't be read
+        
+        Args:
+            path: Path to master-players.csv, a SQLite database with a players table
+                  or a .snap file written by player_snapshot.py
+        """
+        store = cls()
+        store.load_path(path)
+        return store
+    
+    def load_path(self, path: Optional[str]) -> int:
+        """
+        Load players from a CSV, SQLite or snapshot file (see from_path), logging rather than raising on failure
+        
+        Lets a service start with an empty store and fill it in the background.
+        
+        Returns:
+            Number of players loaded
+        """
+        if not path or not os.path.exists(path):
+            logger.warning(f"Player dataset not found at {path}; local lookups disabled")
+            return 0
+        
+        try:
+            if path.endswith('.csv'):
+                loaded = self.load_csv(path)
+            elif path.endswith('.snap'):
+                loaded = self.load_snapshot(path)
+            else:
+                loaded = self.load_sqlite(path)
+        except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+            logger.error(f"Failed to load player dataset from {path}: {e}")
+            return 0
+        # Earlier changes are only known relative to the data this load replaced
+        self._changes_since = time.time()
+        logger.info(f"Loaded {loaded} players from {path}")
+        return loaded
+    
+    def load_csv(self, path: str) -> int:
+        """
+        Load players from a master-players.csv style file
+        
+        Columns: uscfId, lastName, firstName, middleName, state, uscfExpiration, regularRating
+        
+        Returns:
+            Number of players loaded
+        """
+        # The exported CSV is not always UTF-8 (e.g. "ACUÑA" comes through as cp1252)
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+        except UnicodeDecodeError:
+            with open(path, newline='', encoding='cp1252') as f:
+                rows = list(csv.DictReader(f))
+        
+        return sum(1 for row in rows if self._add_row(row))
+    
+    def load_sqlite(self, path: str) -> int:
+        """
+        Load players from a SQLite database with a players table using the CSV column names
+        
+        Returns:
+            Number of players loaded
+        """
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            conn.row_factory = sqlite3.Row
+            return sum(1 for row in conn.execute("SELECT * FROM players") if self._add_row(dict(row)))
+        finally:
+            conn.close()
+    
+    def load_snapshot(self, path: str) -> int:
+        """
+        Serve players from a snapshot file written by player_snapshot.py
+        
+        The file is memory-mapped, so this returns almost immediately. Exact and
+        prefix name searches work straight away; phonetic and misspelled matches
+        start once the token vocabulary has been built on a background thread.
+        
+        Returns:
+            Number of players in the snapshot
+        """
+        # player_snapshot builds on this module
+        from player_snapshot import PlayerSnapshot, NAME_FIELDS
+        
+        snapshot = PlayerSnapshot(path)
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_vocabulary = None
+            self._added = sum(1 for uscf_id in self._by_id if uscf_id not in snapshot)
+        
+        def build_vocabulary():
+            vocabulary = {}
+            for field in NAME_FIELDS:
+                vocabulary[field] = _TokenIndex()
+                for token in snapshot.tokens(field):
+                    vocabulary[field].add(token, '')
+            with self._lock:
+                if self._snapshot is snapshot:
+                    self._snapshot_vocabulary = vocabulary
+            logger.info(f"Fuzzy name search ready for {len(snapshot)} snapshot players")
+        
+        threading.Thread(target=build_vocabulary, name='uscf-snapshot-vocabulary', daemon=True).start()
+        return len(snapshot)
+    
+    def _add_row(self, row: dict) -> bool:
+        player = player_from_row(row)
+        if player is None:
+            return False
+        self.add(player, record_change=False)
+        return True
+    
+    def add(self, player: USCFPlayer, record_change: bool = True):
+        """
+        Add or replace a player in the store
+        
+        Args:
+            player: The player to store
+            record_change: Whether a new or different record is reported by changes()
+        """
+        changed = record_change and self.get(player.uscf_id) != player
+        with self._lock:
+            if (self._snapshot is not None and player.uscf_id not in self._by_id
+                    and player.uscf_id not in self._snapshot):
+                self._added += 1
+            self._by_id[player.uscf_id] = player
+            self._index.add(player)
+            if changed:
+                self._changed[player.uscf_id] = time.time()
+    
+    def get(self, uscf_id: str) -> Optional[USCFPlayer]:
+        uscf_id = str(uscf_id).strip()
+        player = self._by_id.get(uscf_id)
+        if player is None and self._snapshot is not None:
+            player = self._snapshot.get(uscf_id)
+        return player
+    
+    def players(self) -> List[USCFPlayer]:
+        """Every stored player"""
+        with self._lock:
+            players = list(self._by_id.values())
+            snapshot = self._snapshot
+        if snapshot is not None:
+            added = {player.uscf_id for player in players}
+            players.extend(player for player in snapshot if player.uscf_id not in added)
+        return players
+    
+    def changes(self, since: float) -> Optional[List[Tuple[float, USCFPlayer]]]:
+        """
+        Players added or changed after a point in time, oldest change first
+        
+        Args:
+            since: time.time() value, e.g. when the client's copy was exported
+            
+        Returns:
+            (changed at, player) pairs, or None if the store can't tell because
+            since predates the loading of its dataset; only this store's own
+            changes are known, so each worker process answers for itself
+        """
+        with self._lock:
+            if self._changes_since is None or since < self._changes_since:
+                return None
+            changed = sorted((at, uscf_id) for uscf_id, at in self._changed.items() if at > since)
+        return [(at, self.get(uscf_id)) for at, uscf_id in changed]
+    
+    def search(self, first_name: Optional[str], last_name: Optional[str], limit: int = 50,
+               fuzzy: bool = True) -> List[Tuple[float, USCFPlayer]]:
+        """
+        Ranked name search, see PlayerSearchIndex.search
+        
+        Returns:
+            (score, player) tuples, best first
+        """
+        with self._lock:
+            results = self._index.search(first_name, last_name, self._by_id.__getitem__, limit, fuzzy)
+            snapshot, vocabulary = self._snapshot, self._snapshot_vocabulary
+        if snapshot is None:
+            return results
+        
+        results += self._search_snapshot(snapshot, vocabulary, first_name, last_name, limit, fuzzy)
+        results.sort(key=_result_order)
+        return results[:limit]
+    
+    def _search_snapshot(self, snapshot, vocabulary: Optional[Dict[str, _TokenIndex]],
+                         first_name: Optional[str], last_name: Optional[str], limit: int,
+                         fuzzy: bool) -> List[Tuple[float, USCFPlayer]]:
+        last_query = normalize_name_tokens(last_name)
+        first_query = normalize_name_tokens(first_name)
+        if not last_query and not first_query:
+            return []
+        
+        field, query = ('last', last_query) if last_query else ('first', first_query)
+        rows = set()
+        for token in query:
+            rows.update(snapshot.token_rows(field, token, prefix=True))
+        if fuzzy and vocabulary is not None:
+            for token in vocabulary[field].matching_tokens(query, prefix=False):
+                rows.update(snapshot.token_rows(field, token))
+        
+        # Players added since the snapshot was loaded were searched in memory
+        candidates = (
+            (snapshot.player(row), *snapshot.name_tokens(row))
+            for row in rows if snapshot.uscf_id(row) not in self._by_id
+        )
+        return PlayerSearchIndex.rank(last_query, first_query, candidates, limit, fuzzy)
+    
+    def find_by_name(self, first_name: Optional[str], last_name: Optional[str], limit: int = 50) -> List[USCFPlayer]:
+        """
+        Find players by name, ranked best first
+        
+        Exact and prefix matches come first, followed by phonetic and misspelled
+        matches; hyphenated names match on either part.
+        """
+        return [player for _, player in self.search(first_name, last_name, limit)]
+    
+    @staticmethod
+    def is_fresh(player: USCFPlayer, today: Optional[date] = None) -> bool:
+        """A stored record is fresh while its USCF membership has not expired"""
+        if not player.expiration_date:
+            return False
+        return player.expiration_date >= (today or date.today()).isoformat()
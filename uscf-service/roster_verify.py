@@ -0,0 +1,186 @@
+import csv
+import io
+import re
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from uscf_lookup import USCFLookup, USCFPlayer
+from player_store import PlayerSearchIndex, normalize_name_tokens, player_name_tokens
+
+# Row flags
+UNKNOWN_ID = 'unknown_id'            # not a USCF ID, or USCF has no such member
+EXPIRED = 'expired'                  # membership expired before the as-of date
+RATING_MISMATCH = 'rating_mismatch'  # claimed rating differs from the regular rating
+NAME_MISMATCH = 'name_mismatch'      # claimed name doesn't match the member's name
+UNVERIFIED = 'unverified'            # the ID couldn't be checked because uschess.org is unavailable
+
+FLAGS = (UNKNOWN_ID, EXPIRED, RATING_MISMATCH, NAME_MISMATCH, UNVERIFIED)
+
+# Accepted spellings of each roster column, compared lower-case with punctuation removed
+_COLUMNS = {
+    'uscf_id': ('uscfid', 'id', 'memberid', 'uscf'),
+    'first_name': ('firstname', 'first'),
+    'last_name': ('lastname', 'last', 'surname'),
+    'name': ('name', 'playername', 'fullname'),
+    'rating': ('rating', 'regularrating', 'uscfrating', 'claimedrating'),
+}
+_COLUMN_KEY_RE = re.compile(r'[^a-z]')
+
+class RosterRow(NamedTuple):
+    """One submitted roster entry; every field except row is as the coach entered it"""
+    row: int
+    uscf_id: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    rating: Optional[str] = None
+
+def _column(key: str) -> Optional[str]:
+    key = _COLUMN_KEY_RE.sub('', key.lower())
+    for field, aliases in _COLUMNS.items():
+        if key in aliases:
+            return field
+    return None
+
+def _split_full_name(name: str):
+    """Split "LAST, FIRST" or "First Middle Last" into (first, last)"""
+    if ',' in name:
+        last, _, first = name.partition(',')
+        return first.strip() or None, last.strip() or None
+    parts = name.split()
+    if len(parts) < 2:
+        return None, name.strip() or None
+    return ' '.join(parts[:-1]), parts[-1]
+
+def _roster_row(number: int, entry: Dict[str, object]) -> RosterRow:
+    fields = {}
+    for key, value in entry.items():
+        field = _column(str(key))
+        if field and value not in (None, '') and field not in fields:
+            fields[field] = str(value).strip()
+    
+    first_name, last_name = fields.get('first_name'), fields.get('last_name')
+    if not first_name and not last_name and fields.get('name'):
+        first_name, last_name = _split_full_name(fields['name'])
+    return RosterRow(number, fields.get('uscf_id', ''), first_name, last_name, fields.get('rating'))
+
+def parse_roster_json(entries: Iterable[Dict[str, object]]) -> List[RosterRow]:
+    """
+    Read roster rows from decoded JSON objects
+    
+    Keys are matched loosely, so uscf_id, uscfId and "USCF ID" all work; a single
+    name field is accepted in place of first and last names.
+    
+    Raises:
+        ValueError: If an entry is not an object
+    """
+    rows = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Roster entry {number} is not an object")
+        rows.append(_roster_row(number, entry))
+    return rows
+
+def parse_roster_csv(text: str) -> List[RosterRow]:
+    """
+    Read roster rows from CSV text with a header row
+    
+    Columns are matched like parse_roster_json keys; unrecognized columns are ignored.
+    
+    Raises:
+        ValueError: If no column holds USCF IDs
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    if not any(_column(key) == 'uscf_id' for key in reader.fieldnames or ()):
+        raise ValueError("The roster has no USCF ID column")
+    return [_roster_row(number, entry) for number, entry in enumerate(reader, 1)]
+
+def _claimed_rating(value: Optional[str]):
+    """The claimed rating as an int, 'unrated', or None when no rating was given or it can't be read"""
+    if not value:
+        return None
+    if value.strip().lower() in ('unr', 'unrated', 'new'):
+        return 'unrated'
+    match = re.match(r'^(\d+)', value.strip())
+    return int(match.group(1)) if match else None
+
+def name_matches(player: USCFPlayer, first_name: Optional[str], last_name: Optional[str]) -> bool:
+    """
+    Whether a claimed name matches a member's name exactly or by prefix, ignoring case and accents
+    
+    "Rob Smith" matches "SMITH, ROBERT"; a misspelling like "Smyth" does not.
+    """
+    last_query = normalize_name_tokens(last_name)
+    first_query = normalize_name_tokens(first_name)
+    if not last_query and not first_query:
+        return True
+    results = PlayerSearchIndex.rank(last_query, first_query, [(player, *player_name_tokens(player))], fuzzy=False)
+    return bool(results) and results[0][0] >= PlayerSearchIndex.STRONG_MATCH
+
+def check_row(row: RosterRow, player: Optional[USCFPlayer], as_of: date,
+              rating_tolerance: int = 0) -> List[str]:
+    """
+    Flags for one roster row against the member record found for its ID
+    
+    Args:
+        row: The submitted row
+        player: The member with the row's USCF ID, or None if there is none
+        as_of: Date memberships must be current on, e.g. the event date
+        rating_tolerance: Largest claimed-vs-actual rating difference not flagged
+        
+    Returns:
+        Flags from FLAGS, empty if the row checks out
+    """
+    if player is None:
+        return [UNKNOWN_ID]
+    
+    flags = []
+    if not player.expiration_date or player.expiration_date < as_of.isoformat():
+        flags.append(EXPIRED)
+    
+    claimed = _claimed_rating(row.rating)
+    if claimed == 'unrated':
+        if player.rating_regular is not None:
+            flags.append(RATING_MISMATCH)
+    elif claimed is not None:
+        if player.rating_regular is None or abs(player.rating_regular - claimed) > rating_tolerance:
+            flags.append(RATING_MISMATCH)
+    
+    if not name_matches(player, row.first_name, row.last_name):
+        flags.append(NAME_MISMATCH)
+    return flags
+
+def verify_roster(lookup: USCFLookup, rows: List[RosterRow], as_of: Optional[date] = None,
+                  rating_tolerance: int = 0, fetch: bool = True) -> List[dict]:
+    """
+    Check a whole roster against USCF member records
+    
+    IDs are resolved together with USCFLookup.lookup_ids, so members in the
+    local store or cache cost nothing and uschess.org is only asked about the
+    rest, each distinct ID once. A row whose own ID couldn't be checked - not
+    fetched, shed, or unanswered by uschess.org - is flagged unverified rather
+    than unknown; one answered "not found", now or from the cache, is unknown.
+    
+    Args:
+        lookup: Lookup used to resolve the roster's IDs
+        rows: Roster rows from parse_roster_json or parse_roster_csv
+        as_of: Date memberships must be current on (default: today)
+        rating_tolerance: Largest claimed-vs-actual rating difference not flagged
+        fetch: Whether to ask uschess.org about IDs not known locally
+        
+    Returns:
+        One {"row", "uscf_id", "flags", "player"} dict per roster row, in order
+    """
+    as_of = as_of or date.today()
+    unchecked = set()
+    players = lookup.lookup_ids((row.uscf_id for row in rows), fetch=fetch, unchecked=unchecked)
+    
+    results = []
+    for row in rows:
+        uscf_id = row.uscf_id.strip()
+        player = players.get(uscf_id)
+        if player is None and uscf_id in unchecked:
+            flags = [UNVERIFIED]
+        else:
+            flags = check_row(row, player, as_of, rating_tolerance)
+        results.append({'row': row.row, 'uscf_id': uscf_id, 'flags': flags, 'player': player})
+    return results
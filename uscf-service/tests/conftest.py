@@ -0,0 +1,89 @@
+"""
+Tests for the USCF lookup service
+
+Run from uscf-service with: python -m pytest tests
+
+Nothing here talks to uschess.org; upstream pages come from the recorded
+fixtures in benchmarks/fixtures or are built inline.
+"""
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The service modules are top-level scripts, not a package; stub_server renders
+# uschess.org pages from the recorded fixtures
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def service(tmp_path_factory):
+    """The uscf_service module, configured against a local stub of uschess.org"""
+    from stub_server import start_stub_server
+
+    server, base_url = start_stub_server()
+    os.environ.update(
+        USCF_BASE_URL=base_url,
+        USCF_RATE_LIMIT_SECONDS='0',
+        USCF_RESPONSE_CACHE_SECONDS='0',
+        USCF_EXPORT_DIR=str(tmp_path_factory.mktemp('exports')),
+    )
+    import uscf_service
+    yield uscf_service
+    server.shutdown()
+
+
+@pytest.fixture
+def client(service):
+    """A Flask test client with empty caches and a closed circuit"""
+    from uscf_lookup import CircuitBreaker
+
+    lookup = service.uscf_lookup
+    service.player_cache._entries.clear()
+    lookup.responses._entries.clear()
+    lookup.responses._bytes = 0
+    lookup.breaker = CircuitBreaker(base_backoff=60, jitter=0)
+    return service.app.test_client()
+
+
+@pytest.fixture
+def make_lookup():
+    """Factory for unthrottled USCFLookups; players= gives one a local store holding them"""
+    from player_store import PlayerStore
+    from uscf_lookup import USCFLookup
+
+    def make(players=None, **options):
+        if players is not None:
+            options['store'] = PlayerStore()
+            for player in players:
+                options['store'].add(player)
+        return USCFLookup(rate_limit_seconds=0, **options)
+    return make
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path for a SQLite file shared by the caches, buckets or stores a test opens on it"""
+    return str(tmp_path / 'shared.db')
+
+
+@pytest.fixture
+def players_csv(tmp_path):
+    """Path to a master-players.csv style file holding one player, 12345678 (SMITH, JOHN)"""
+    path = tmp_path / 'players.csv'
+    path.write_text('uscfId,lastName,firstName,state,regularRating\n12345678,SMITH,JOHN,TX,1500\n')
+    return str(path)
+
+
+@pytest.fixture
+def other_process():
+    """Run a function in a forked process, as another gunicorn worker would, and check it succeeded"""
+    def run(target, *args):
+        process = multiprocessing.get_context('fork').Process(target=target, args=args)
+        process.start()
+        process.join(10)
+        assert process.exitcode == 0
+    return run
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+
+from uscf_lookup import PlayerCache, REQUEST_ADMISSION, USCFPlayer
+
+PLAYER = USCFPlayer('12345678', 'MORENO, RYAN, DAVID', 1623, None, 'TX', '2027-01-31')
+
+
+@pytest.fixture
+def asgi(client, service, monkeypatch):
+    """The ASGI app, failing any request handed on to Flask instead of served natively"""
+    import uscf_asgi
+
+    async def flask_app(scope, receive, send):
+        raise AssertionError(f"{scope['method']} {scope['path']} was not served natively")
+
+    monkeypatch.setattr(uscf_asgi, 'flask_app', flask_app)
+    return uscf_asgi.app
+
+
+def call(app, method, path, body=None, headers=()):
+    """Run one request through the ASGI app; returns (status, headers, body)"""
+    sent = []
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+             'http_version': '1.1', 'scheme': 'http', 'server': ('test', 80), 'root_path': ''}
+    asyncio.run(app(scope, receive, send))
+    response_headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    return sent[0]['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def test_get_lookup_is_served_natively_with_an_etag(asgi, service):
+    player = next(iter(service.player_store.players()))
+    status, headers, body = call(asgi, 'GET', f'/uscf-lookup?uscf_id={player.uscf_id}')
+    assert status == 200
+    assert json.loads(body)['uscf_id'] == player.uscf_id
+    assert headers['etag'].startswith('"')
+
+    status, post_headers, _ = call(asgi, 'POST', '/uscf-lookup', {'uscf_id': player.uscf_id})
+    assert (status, post_headers['etag']) == (200, headers['etag'])
+
+
+def test_matching_if_none_match_gets_an_empty_304(asgi, service):
+    player = next(iter(service.player_store.players()))
+    path = f'/uscf-lookup?uscf_id={player.uscf_id}'
+    etag = call(asgi, 'GET', path)[1]['etag']
+
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+        status, headers, body = call(asgi, 'GET', path, headers=[('If-None-Match', if_none_match)])
+        assert (status, body, headers['etag']) == (304, b'', etag)
+    assert call(asgi, 'GET', path, headers=[('If-None-Match', '"other"')])[0] == 200
+
+
+def test_post_ignores_if_none_match(asgi, service):
+    player = next(iter(service.player_store.players()))
+    etag = call(asgi, 'GET', f'/uscf-lookup?uscf_id={player.uscf_id}')[1]['etag']
+    status, _, body = call(asgi, 'POST', '/uscf-lookup', {'uscf_id': player.uscf_id},
+                           headers=[('If-None-Match', etag)])
+    assert status == 200 and body
+
+
+def test_get_name_lookup_matches_flask(asgi, client, service):
+    service.player_cache.set(PlayerCache.name_key('Ryan', 'Moreno'), [PLAYER])
+    path = '/uscf-lookup-name?first_name=Ryan&last_name=Moreno'
+    status, headers, body = call(asgi, 'GET', path)
+    flask_response = client.get(path)
+    assert (status, body) == (200, flask_response.data)
+    assert headers['etag'] == flask_response.headers['ETag']
+    assert call(asgi, 'GET', path, headers=[('If-None-Match', headers['etag'])])[0] == 304
+
+
+NAME_PATH = '/uscf-lookup-name?first_name=Jose&last_name=Munoz'
+ACCENTED = PLAYER._replace(name='MUÑOZ, JOSÉ')
+
+
+@pytest.mark.parametrize('accept, stream_format', [
+    ('application/x-ndjson', 'ndjson'),
+    ('text/event-stream', 'sse'),
+    ('application/json', None),
+    ('application/json, application/x-ndjson;q=0.5', None),
+    ('application/json;q=0.5, text/event-stream', 'sse'),
+    ('application/x-ndjson;q=0', None),
+    ('', None),
+])
+def test_stream_format_is_negotiated_like_flask(asgi, service, accept, stream_format):
+    import uscf_asgi
+    with service.app.test_request_context(headers={'Accept': accept}):
+        assert service._stream_format() == stream_format
+    assert uscf_asgi._stream_format({'headers': [(b'accept', accept.encode())]}) == stream_format
+
+
+def test_streamed_items_use_the_json_body_encoding(asgi, client, service):
+    service.player_cache.set(PlayerCache.name_key('Jose', 'Munoz'), [ACCENTED])
+    encoded = service._encoded_player(ACCENTED).body
+
+    status, _, body = call(asgi, 'GET', NAME_PATH, headers=[('Accept', 'application/x-ndjson')])
+    assert (status, body) == (200, encoded + b'\n')
+    assert client.get(NAME_PATH, headers={'Accept': 'application/x-ndjson'}).data == encoded + b'\n'
+
+    status, _, body = call(asgi, 'GET', NAME_PATH, headers=[('Accept', 'text/event-stream')])
+    assert body.startswith(b'data: ' + encoded + b'\n\n')
+
+
+@pytest.mark.parametrize('accept', ['application/json', 'application/x-ndjson'])
+def test_bad_name_filters_are_rejected_before_the_lookup(asgi, service, monkeypatch, accept):
+    import uscf_asgi
+
+    async def lookup(first_name, last_name):
+        raise AssertionError('looked up despite a bad filter')
+
+    monkeypatch.setattr(uscf_asgi.async_lookup, 'lookup_by_name', lookup)
+    monkeypatch.setattr(uscf_asgi.async_lookup, 'iter_by_name', lookup)
+    status, _, body = call(asgi, 'GET', NAME_PATH + '&limit=ten', headers=[('Accept', accept)])
+    assert (status, json.loads(body)) == (400, {'error': service.NAME_FILTERS_ERROR})
+
+
+@pytest.mark.parametrize('accept', ['application/x-ndjson', 'text/event-stream'])
+def test_open_circuit_turns_an_empty_stream_into_a_503(asgi, service, accept):
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    status, headers, body = call(asgi, 'GET', '/uscf-lookup-name?first_name=Nobody&last_name=Qqxyzzy',
+                                 headers=[('Accept', accept)])
+    assert (status, json.loads(body)) == (503, {'error': service.UNAVAILABLE_ERROR})
+    assert int(headers['retry-after']) >= 1
+
+
+def test_stream_cut_short_by_the_circuit_ends_with_an_error(asgi, service, monkeypatch):
+    import uscf_asgi
+
+    async def iter_by_name(first_name, last_name):
+        yield PLAYER
+        REQUEST_ADMISSION.get().unavailable = True
+
+    monkeypatch.setattr(uscf_asgi.async_lookup, 'iter_by_name', iter_by_name)
+    status, _, body = call(asgi, 'GET', NAME_PATH, headers=[('Accept', 'application/x-ndjson')])
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200
+    assert lines[0]['uscf_id'] == PLAYER.uscf_id
+    assert lines[1]['error'] == service.UNAVAILABLE_ERROR and lines[1]['retry_after'] >= 1
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from uscf_lookup import PlayerCache, USCFPlayer
+from uscf_lookup_async import AsyncUSCFLookup
+
+PLAYER = USCFPlayer('12345678', 'MORENO, RYAN, DAVID', 1623, None, 'TX', '2027-01-31')
+
+
+def test_sqlite_cache_is_read_off_the_event_loop(make_lookup, db_path, monkeypatch):
+    cache = PlayerCache(db_path=db_path)
+    cache.set(PlayerCache.id_key(PLAYER.uscf_id), [PLAYER])
+    lookup = make_lookup(cache=cache)
+    resolve = lookup._resolve_id_locally
+    threads = []
+
+    def resolve_in_thread(uscf_id):
+        threads.append(threading.current_thread())
+        return resolve(uscf_id)
+
+    monkeypatch.setattr(lookup, '_resolve_id_locally', resolve_in_thread)
+    assert asyncio.run(AsyncUSCFLookup(lookup).lookup_by_id(PLAYER.uscf_id)) == PLAYER
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_memory_cache_is_read_inline(make_lookup, monkeypatch):
+    lookup = make_lookup()
+    lookup.cache.set(PlayerCache.id_key(PLAYER.uscf_id), [PLAYER])
+    resolve = lookup._resolve_id_locally
+    threads = []
+
+    def resolve_inline(uscf_id):
+        threads.append(threading.current_thread())
+        return resolve(uscf_id)
+
+    monkeypatch.setattr(lookup, '_resolve_id_locally', resolve_inline)
+    assert asyncio.run(AsyncUSCFLookup(lookup).lookup_by_id(PLAYER.uscf_id)) == PLAYER
+    assert threads == [threading.main_thread()]
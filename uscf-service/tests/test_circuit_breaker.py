@@ -0,0 +1,123 @@
+import json
+import time
+
+import pytest
+
+from uscf_lookup import CircuitBreaker, PlayerCache, REQUEST_ADMISSION, USCFPlayer
+
+UNKNOWN_ID = '87654321'
+PLAYER = USCFPlayer('12345678', 'MORENO, RYAN, DAVID', 1623, None, 'TX', '2027-01-31')
+
+
+def test_failures_degrade_then_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=3, base_backoff=60, jitter=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.DEGRADED
+    assert breaker.allow()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() > 59
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_a_block_opens_the_circuit_at_once():
+    breaker = CircuitBreaker(failure_threshold=5)
+    breaker.record_failure(blocked=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_success_resets_a_degraded_circuit():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.DEGRADED
+
+
+def test_one_probe_per_backoff_window_then_close_on_success():
+    breaker = CircuitBreaker(base_backoff=0.02, jitter=0)
+    breaker.record_failure(blocked=True)
+    time.sleep(0.03)
+    assert breaker.allow()
+    assert breaker.stats()['state'] == 'half_open'
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.HEALTHY
+    assert breaker.allow()
+
+
+def test_failed_probe_doubles_the_backoff():
+    breaker = CircuitBreaker(base_backoff=0.02, max_backoff=0.05, jitter=0)
+    breaker.record_failure(blocked=True)
+    for expected in (0.04, 0.05):
+        time.sleep(breaker.retry_after() + 0.01)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.stats()['backoff_seconds'] == expected
+    assert breaker.stats()['opened'] == 1
+
+
+def test_open_circuit_turns_an_unchecked_lookup_into_a_503(client, service):
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    response = client.post('/uscf-lookup', json={'uscf_id': UNKNOWN_ID})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_open_circuit_keeps_a_cached_not_found(client, service):
+    service.player_cache.set(PlayerCache.id_key(UNKNOWN_ID), [])
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    assert client.post('/uscf-lookup', json={'uscf_id': UNKNOWN_ID}).status_code == 404
+
+
+def test_open_circuit_still_serves_local_players(client, service):
+    player = next(iter(service.player_store.players()))
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    assert client.post('/uscf-lookup', json={'uscf_id': player.uscf_id}).status_code == 200
+
+
+def test_open_circuit_keeps_a_cached_empty_name_search(client, service):
+    service.player_cache.set(PlayerCache.name_key('Nobody', 'Zzyzx'), [])
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    response = client.post('/uscf-lookup-name', json={'first_name': 'Nobody', 'last_name': 'Zzyzx'})
+    assert (response.status_code, response.get_json()) == (200, [])
+
+    response = client.post('/uscf-lookup-name', json={'first_name': 'Nobody', 'last_name': 'Qqxyzzy'})
+    assert response.status_code == 503
+
+
+def test_a_definitive_not_found_is_a_404_even_if_the_circuit_opens_later(client, service):
+    # IDs starting with 9 get the stub's "Players found: 0" page
+    assert client.post('/uscf-lookup', json={'uscf_id': '91234567'}).status_code == 404
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    assert client.post('/uscf-lookup', json={'uscf_id': '91234567'}).status_code == 404
+
+
+@pytest.mark.parametrize('accept', ['application/x-ndjson', 'text/event-stream'])
+def test_open_circuit_turns_an_empty_stream_into_a_503(client, service, accept):
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    response = client.post('/uscf-lookup-name', json={'first_name': 'Nobody', 'last_name': 'Qqxyzzy'},
+                           headers={'Accept': accept})
+    assert response.status_code == 503
+    assert response.get_json() == {'error': service.UNAVAILABLE_ERROR}
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_stream_cut_short_by_the_circuit_ends_with_an_error(client, service, monkeypatch):
+    def iter_by_name(first_name, last_name):
+        yield PLAYER
+        REQUEST_ADMISSION.get().unavailable = True
+
+    monkeypatch.setattr(service.uscf_lookup, 'iter_by_name', iter_by_name)
+    response = client.post('/uscf-lookup-name', json={'last_name': 'Moreno'},
+                           headers={'Accept': 'text/event-stream'})
+    assert response.status_code == 200
+    events = response.get_data(as_text=True).split('\n\n')
+    assert events[0].startswith('data: ')
+    assert events[1].startswith('event: error\ndata: ')
+    assert json.loads(events[1].split('data: ', 1)[1])['error'] == service.UNAVAILABLE_ERROR
+    assert events[2] == 'event: end\ndata: {}'
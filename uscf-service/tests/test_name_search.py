@@ -0,0 +1,92 @@
+import logging
+import threading
+
+import pytest
+
+from uscf_lookup import PlayerCache, USCFLookup, USCFPlayer
+
+PLAYER = USCFPlayer('12345678', 'MORENO, RYAN, DAVID', 1623, None, 'TX', '2027-01-31')
+LAPSED = PLAYER._replace(expiration_date='2020-01-31')
+
+
+def test_the_format_that_wins_most_is_tried_first(make_lookup):
+    lookup = make_lookup()
+    assert lookup._search_formats('Ryan', 'Moreno')[0] == ('last_comma_first', 'Moreno, Ryan')
+
+    lookup._finish_name_lookup('Ryan', 'Moreno', 'first_last', [PLAYER], False)
+    assert lookup._search_formats('Ryan', 'Moreno')[0] == ('first_last', 'Ryan Moreno')
+
+
+def test_format_wins_are_counted_across_threads(make_lookup):
+    lookup = make_lookup()
+
+    def win(index):
+        for _ in range(200):
+            lookup._finish_name_lookup('Ryan', f'Moreno{index}', 'last_first', [PLAYER], False)
+            lookup._search_formats('Ryan', 'Moreno')
+
+    threads = [threading.Thread(target=win, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lookup.format_wins['last_first'] == 1600
+
+
+def test_parallel_search_without_burst_is_disabled(caplog):
+    with caplog.at_level(logging.WARNING, logger='uscf_lookup'):
+        serial = USCFLookup(rate_limit_seconds=1, burst=1, parallel_name_search=True)
+        parallel = USCFLookup(rate_limit_seconds=1, burst=3, parallel_name_search=True)
+    assert [record.getMessage() for record in caplog.records] == [
+        'Parallel name search disabled: it has no effect with a rate limit burst of 1'
+    ]
+    assert not serial.parallel_name_search and serial._name_search_executor is None
+    assert parallel.parallel_name_search and parallel._name_search_executor is not None
+
+
+def test_concurrent_parallel_searches_share_one_executor(make_lookup, monkeypatch):
+    lookup = make_lookup(parallel_name_search=True)
+    executor = lookup._name_search_executor
+    monkeypatch.setattr(lookup, '_search_name_format', lambda search_term, cancel: ([PLAYER], False))
+    threads = [threading.Thread(target=lookup._fetch_by_name, args=('Ryan', f'Moreno{index}')) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert lookup._name_search_executor is executor
+
+
+def test_fresh_local_matches_answer_a_name_lookup(make_lookup):
+    lookup = make_lookup(players=[PLAYER._replace(expiration_date='2099-12-31')])
+    assert [player.uscf_id for player in lookup._resolve_name_locally('Ryan', 'Moreno')] == ['12345678']
+
+
+def test_expired_local_matches_go_upstream(make_lookup):
+    lookup = make_lookup(players=[LAPSED])
+    assert lookup._resolve_name_locally('Ryan', 'Moreno') is None
+
+
+def test_cached_negative_is_not_replaced_by_local_matches(make_lookup):
+    lookup = make_lookup(players=[LAPSED])
+    lookup.cache.set(PlayerCache.name_key('Ryan', 'Moreno'), [])
+    assert lookup._resolve_name_locally('Ryan', 'Moreno') == []
+
+
+@pytest.mark.parametrize('accept', ['application/json', 'application/x-ndjson'])
+def test_bad_name_filters_are_rejected_before_the_lookup(client, service, monkeypatch, accept):
+    def lookup(first_name, last_name):
+        raise AssertionError('looked up despite a bad filter')
+
+    monkeypatch.setattr(service.uscf_lookup, 'lookup_by_name', lookup)
+    monkeypatch.setattr(service.uscf_lookup, 'iter_by_name', lookup)
+    response = client.get('/uscf-lookup-name?last_name=Moreno&min_rating=high', headers={'Accept': accept})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': service.NAME_FILTERS_ERROR}
+
+
+def test_lookup_errors_are_not_reported_as_bad_filters(client, service, monkeypatch):
+    def lookup(first_name, last_name):
+        raise ValueError('parse failure')
+
+    monkeypatch.setattr(service.uscf_lookup, 'lookup_by_name', lookup)
+    assert client.get('/uscf-lookup-name?last_name=Moreno&min_rating=1500').status_code == 500
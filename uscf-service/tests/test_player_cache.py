@@ -0,0 +1,96 @@
+import json
+import time
+
+from uscf_lookup import PlayerCache, USCFPlayer
+
+PLAYER = USCFPlayer('12345678', 'MORENO, RYAN, DAVID', 1623, None, 'TX', '2027-01-31')
+UPDATED = PLAYER._replace(rating_regular=1650)
+KEY = PlayerCache.id_key('12345678')
+
+
+def test_found_and_negative_entries():
+    cache = PlayerCache()
+    assert cache.get(KEY) is None
+    cache.set(KEY, [PLAYER])
+    assert cache.get(KEY) == [PLAYER]
+
+    missing = PlayerCache.id_key('99999999')
+    cache.set(missing, [])
+    assert cache.get(missing) == []
+    stats = cache.stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_negative_entries_use_their_own_ttl():
+    cache = PlayerCache(ttl_seconds=60, negative_ttl_seconds=0.01, stale_seconds=0)
+    cache.set(KEY, [])
+    time.sleep(0.02)
+    assert cache.get(KEY) is None
+
+
+def test_expired_entries_are_only_served_as_stale():
+    cache = PlayerCache(ttl_seconds=0.01, stale_seconds=60)
+    cache.set(KEY, [PLAYER])
+    time.sleep(0.02)
+    assert cache.get(KEY) is None
+    assert cache.get(KEY, allow_stale=True) == [PLAYER]
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PlayerCache(max_entries=2)
+    for uscf_id in ('11111111', '22222222', '33333333'):
+        cache.set(PlayerCache.id_key(uscf_id), [PLAYER._replace(uscf_id=uscf_id)])
+    assert cache.get(PlayerCache.id_key('11111111')) is None
+    assert cache.get(PlayerCache.id_key('33333333')) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_name_keys_ignore_case_and_spacing():
+    assert PlayerCache.name_key(' John ', 'SMITH') == PlayerCache.name_key('john', 'smith ')
+
+
+def test_entries_survive_a_restart(db_path):
+    PlayerCache(db_path=db_path).set(KEY, [PLAYER])
+    assert PlayerCache(db_path=db_path).get(KEY) == [PLAYER]
+
+
+def test_entry_written_by_another_worker_is_read(db_path):
+    first, second = PlayerCache(db_path=db_path), PlayerCache(db_path=db_path)
+    first.set(KEY, [PLAYER])
+    assert second.get(KEY) == [PLAYER]
+
+
+def _set_in_other_process(db_path, players):
+    PlayerCache(db_path=db_path).set(KEY, players)
+
+
+def test_entry_written_by_another_process_is_read(db_path, other_process):
+    this_worker = PlayerCache(db_path=db_path)
+    assert this_worker.get(KEY) is None
+
+    other_process(_set_in_other_process, db_path, [PLAYER])
+    # A miss isn't remembered, so the other worker's fetch is picked up straight away
+    assert this_worker.get(KEY) == [PLAYER]
+
+
+def test_expired_copy_falls_through_to_a_fresher_shared_entry(db_path):
+    this_worker = PlayerCache(ttl_seconds=0.01, db_path=db_path)
+    other_worker = PlayerCache(ttl_seconds=60, db_path=db_path)
+
+    this_worker.set(KEY, [PLAYER])
+    time.sleep(0.02)
+    # This worker's copy has expired, but the other worker has fetched the player since
+    other_worker.set(KEY, [UPDATED])
+    assert this_worker.get(KEY) == [UPDATED]
+    assert this_worker.stats()['hits'] == 1
+
+
+def test_expired_copy_is_kept_when_the_shared_entry_is_older(db_path):
+    cache = PlayerCache(ttl_seconds=0.01, db_path=db_path)
+    cache.set(KEY, [UPDATED])
+    cache._db.execute("UPDATE player_cache SET value = ?, expires_at = expires_at - 1",
+                      (json.dumps([PLAYER._asdict()]),))
+    cache._db.commit()
+    time.sleep(0.02)
+    assert cache.get(KEY, allow_stale=True) == [UPDATED]
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from player_export import LAST_NAME_FIELD
+from player_store import PlayerStore
+from uscf_lookup import USCFPlayer
+
+PLAYER = USCFPlayer('12345678', 'SMITH, JOHN', 1500, None, 'TX', '2027-01-31')
+
+
+def _store(players_csv):
+    store = PlayerStore()
+    store.load_path(players_csv)
+    return store
+
+
+def test_changes_after_the_load_are_reported(players_csv):
+    store = _store(players_csv)
+    since = time.time()
+    store.add(PLAYER)  # unchanged, so not reported
+    store.add(PLAYER._replace(rating_regular=1550))
+    changes = store.changes(since)
+    assert [player.rating_regular for _, player in changes] == [1550]
+    assert store.changes(changes[-1][0]) == []
+
+
+def test_changes_from_before_the_load_are_unknown(players_csv):
+    assert PlayerStore().changes(time.time()) is None
+    store = _store(players_csv)
+    assert store.changes(time.time() - 60) is None
+
+
+@pytest.mark.parametrize('since', ['', 'yesterday', 'nan', 'inf', '-inf', 'Infinity'])
+def test_since_must_be_a_finite_time(client, since):
+    response = client.get('/players/changes', query_string={'since': since})
+    assert response.status_code == 400
+
+
+def test_since_before_the_workers_log_needs_a_resync(client, service):
+    service.store_loaded.wait(service.STARTUP_WAIT_SECONDS)
+    response = client.get('/players/changes', query_string={'since': '0'})
+    assert response.status_code == 410
+    assert response.get_json()['resync'] is True
+
+
+def test_changes_are_chained_through_until(client, service):
+    service.store_loaded.wait(service.STARTUP_WAIT_SECONDS)
+    body = client.get('/players/changes', query_string={'since': repr(time.time())}).get_json()
+    assert body['players'] == []
+
+    # An ID the other tests don't use, since the service's store outlives this test
+    service.player_store.add(USCFPlayer('55555555', 'CHANGED, PLAYER', 2001, None, 'CA', '2030-01-01'))
+    body = client.get('/players/changes', query_string={'since': repr(body['until'])}).get_json()
+    assert [row['uscfId'] for row in body['players']] == ['55555555']
+    assert ['CHANGED', LAST_NAME_FIELD] in body['players'][0]['nameTokens']
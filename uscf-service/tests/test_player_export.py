@@ -0,0 +1,58 @@
+import sqlite3
+
+from player_export import FIRST_NAME_FIELD, LAST_NAME_FIELD, export_players
+from player_store import player_from_row
+from uscf_lookup import USCFPlayer
+
+PLAYERS = [
+    USCFPlayer('30000001', 'SMITH, JOHN, DAVID', 1500, 1400, 'TX', '2027-01-31'),
+    USCFPlayer('12345678', 'MUÑOZ, JOSÉ', None, None, None, None),
+    USCFPlayer('20000002', 'SMITHERS, ANA', 2200, None, 'CA', '2030-12-01'),
+]
+
+
+def _export(tmp_path, players=PLAYERS):
+    path = str(tmp_path / 'players.db')
+    written = export_players(players, path, synced_at=1700000000.5)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    return written, db
+
+
+def test_players_read_back_unchanged(tmp_path):
+    written, db = _export(tmp_path)
+    assert written == len(PLAYERS)
+    rows = db.execute("SELECT * FROM players ORDER BY uscfId").fetchall()
+    assert [player_from_row(dict(row, uscfId=str(row['uscfId']))) for row in rows] == \
+        sorted(PLAYERS, key=lambda player: int(player.uscf_id))
+    assert dict(db.execute("SELECT key, value FROM meta").fetchall()) == {
+        'format': '1', 'syncedAt': '1700000000.5', 'players': '3'
+    }
+
+
+def test_documented_prefix_search(tmp_path):
+    _, db = _export(tmp_path)
+    ids = [row[0] for row in db.execute(
+        "SELECT p.uscfId FROM players p "
+        "WHERE p.uscfId IN (SELECT uscfId FROM name_tokens WHERE field = ? AND token >= 'SMI' AND token < 'SMJ') "
+        "AND p.uscfId IN (SELECT uscfId FROM name_tokens WHERE field = ? AND token >= 'J' AND token < 'K')",
+        (LAST_NAME_FIELD, FIRST_NAME_FIELD)
+    )]
+    assert ids == [30000001]
+    assert [row[0] for row in db.execute("SELECT uscfId FROM name_tokens WHERE token = 'MUNOZ'")] == [12345678]
+
+
+def test_ids_with_a_leading_zero_are_skipped(tmp_path):
+    written, _ = _export(tmp_path, [PLAYERS[0], PLAYERS[0]._replace(uscf_id='01234567')])
+    assert written == 1
+
+
+def test_download_is_conditional_and_names_its_since(client, service):
+    service.store_loaded.wait(service.STARTUP_WAIT_SECONDS)
+    response = client.get('/players/snapshot.db')
+    assert response.status_code == 200
+    assert response.data.startswith(b'SQLite format 3')
+
+    assert client.get('/players/snapshot.db', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    since = response.headers['X-Players-Synced-At']
+    assert client.get('/players/changes', query_string={'since': since}).status_code == 200
@@ -0,0 +1,57 @@
+from uscf_lookup import USCFLookup, USCFPlayer
+from player_import import PlayerImporter, read_players
+from stub_server import results_page
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_reads_loosely_named_columns(tmp_path):
+    path = _write(tmp_path / 'supplement.txt',
+                  'Mem ID\tMem Name\tState\tExp Date\tRegular\tQuick\n'
+                  '12345678\tSMITH, JOHN DAVID\tTX\t1/31/2027\t1500/40\tUnrated\n'
+                  'not-an-id\tNOBODY, REALLY\tTX\t\t\t\n')
+    stats = {}
+    players = list(read_players(path, stats))
+    assert players == [USCFPlayer('12345678', 'SMITH, JOHN, DAVID', 1500, None, 'TX', '2027-01-31')]
+    assert stats == {'rows': 2, 'invalid': 1}
+
+
+def test_only_new_and_changed_players_are_written(tmp_path):
+    importer = PlayerImporter(str(tmp_path / 'players.db'), batch_size=2)
+    first = _write(tmp_path / 'first.csv',
+                   'uscfId,lastName,firstName,regularRating,quickRating\n'
+                   '11111111,SMITH,JOHN,1500,1400\n'
+                   '22222222,JONES,ANA,1200,\n'
+                   '33333333,LEE,KIM,900,\n')
+    stats = importer.import_file(first)
+    assert (stats['inserted'], stats['updated'], stats['unchanged']) == (3, 0, 0)
+
+    stats = importer.import_file(first)
+    assert (stats['inserted'], stats['updated'], stats['unchanged']) == (0, 0, 3)
+
+    # A file without quick ratings updates the regular rating but keeps the quick one
+    second = _write(tmp_path / 'second.csv', 'uscfId,lastName,firstName,regularRating\n11111111,SMITH,JOHN,1550\n')
+    stats = importer.import_file(second)
+    assert (stats['inserted'], stats['updated'], stats['unchanged']) == (0, 1, 0)
+    players = {player.uscf_id: player for player in importer.players()}
+    assert (players['11111111'].rating_regular, players['11111111'].rating_quick) == (1550, 1400)
+    importer.close()
+
+
+def test_member_export_matches_scraped_players(tmp_path):
+    html = results_page('12345678', [('12345678', 'SMITH, JOHN DAVID')])
+    scraped = next(USCFLookup()._iter_players(html, '12345678'))
+
+    importer = PlayerImporter(str(tmp_path / 'players.db'))
+    importer.import_players([scraped])
+    export = _write(tmp_path / 'members.csv',
+                    'Mem ID,Mem Name,State,Exp Date,Regular,Quick\n'
+                    f'12345678,"SMITH, JOHN DAVID",{scraped.state},{scraped.expiration_date},'
+                    f'{scraped.rating_regular},{scraped.rating_quick or ""}\n')
+    stats = importer.import_file(export)
+    # The same person, named the same way by both sources
+    assert (stats['updated'], stats['unchanged']) == (0, 1)
+    importer.close()
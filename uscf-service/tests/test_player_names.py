@@ -0,0 +1,46 @@
+import pytest
+
+from uscf_lookup import USCFLookup, format_name
+from player_store import player_from_row, player_to_row, split_name
+from stub_server import results_page
+
+
+@pytest.mark.parametrize('raw_name, formatted', [
+    ('MORENO, RYAN', 'MORENO, RYAN'),
+    ('SMITH, JOHN DAVID', 'SMITH, JOHN, DAVID'),
+    ('SMITH, JOHN DAVID LEE', 'SMITH, JOHN, DAVID LEE'),
+    ('SMITH,JOHN  DAVID ', 'SMITH, JOHN, DAVID'),
+    ('SMITH, JOHN, DAVID', 'SMITH, JOHN, DAVID'),
+    ('DE LA CRUZ, ANA', 'DE LA CRUZ, ANA'),
+    ('SMITH,', 'SMITH'),
+    ('CHER', 'CHER'),
+])
+def test_format_name(raw_name, formatted):
+    assert format_name(raw_name) == formatted
+    assert format_name(formatted) == formatted
+
+
+@pytest.mark.parametrize('name, parts', [
+    ('SMITH, JOHN, DAVID', ('SMITH', 'JOHN', 'DAVID')),
+    ('SMITH, JOHN', ('SMITH', 'JOHN', '')),
+    ('SMITH', ('SMITH', '', '')),
+])
+def test_split_name(name, parts):
+    assert split_name(name) == parts
+
+
+def test_row_round_trip():
+    player = player_from_row({'uscfId': '12345678', 'lastName': 'SMITH', 'firstName': 'JOHN',
+                               'middleName': 'DAVID', 'state': 'TX', 'uscfExpiration': '1/31/2027',
+                               'regularRating': '1500', 'quickRating': ''})
+    assert player.name == 'SMITH, JOHN, DAVID'
+    assert player.expiration_date == '2027-01-31'
+    assert player_from_row(player_to_row(player)) == player
+
+
+@pytest.mark.parametrize('raw_name', ['SMITH, JOHN DAVID', 'MORENO, RYAN', 'ADAMS-LUONG, MAI ANH THI'])
+def test_scraped_and_imported_names_agree(raw_name):
+    html = results_page('12345678', [('12345678', raw_name)])
+    scraped = next(USCFLookup()._iter_players(html, '12345678'))
+    imported = player_from_row({'uscfId': '12345678', 'name': raw_name})
+    assert imported.name == scraped.name
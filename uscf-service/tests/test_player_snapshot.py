@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from player_snapshot import PlayerSnapshot, compile_snapshot, write_snapshot
+from player_store import PlayerStore
+from uscf_lookup import USCFPlayer
+
+PLAYERS = [
+    USCFPlayer('30000001', 'SMITH, JOHN, DAVID', 1500, 1400, 'TX', '2027-01-31'),
+    USCFPlayer('12345678', 'MUÑOZ, JOSÉ', None, None, None, None),
+    USCFPlayer('20000002', 'SMITHERS, ANA', 2200, None, 'CA', '2030-12-01'),
+    USCFPlayer('40000004', 'CHER', 800, None, 'NY', None),
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / 'players.snap')
+    assert write_snapshot(PLAYERS, path) == len(PLAYERS)
+    snapshot = PlayerSnapshot(path)
+    yield snapshot
+    snapshot.close()
+
+
+def test_every_player_reads_back_unchanged(snapshot):
+    assert len(snapshot) == len(PLAYERS)
+    for player in PLAYERS:
+        assert snapshot.get(player.uscf_id) == player
+        assert player.uscf_id in snapshot
+    assert sorted(snapshot) == sorted(PLAYERS, key=lambda player: int(player.uscf_id))
+
+
+@pytest.mark.parametrize('uscf_id', ['99999999', '012345678', 'abc', ''])
+def test_unknown_ids_are_not_found(snapshot, uscf_id):
+    assert snapshot.get(uscf_id) is None
+    assert uscf_id not in snapshot
+
+
+def test_name_index_finds_exact_and_prefix_tokens(snapshot):
+    assert [snapshot.uscf_id(row) for row in snapshot.token_rows('last', 'SMITH')] == ['30000001']
+    rows = snapshot.token_rows('last', 'SMITH', prefix=True)
+    assert sorted(snapshot.uscf_id(row) for row in rows) == ['20000002', '30000001']
+    assert [snapshot.uscf_id(row) for row in snapshot.token_rows('first', 'JOSE')] == ['12345678']
+    assert list(snapshot.tokens('last')) == sorted(set(snapshot.tokens('last')))
+
+
+def test_ids_with_a_leading_zero_are_skipped(tmp_path):
+    path = str(tmp_path / 'players.snap')
+    assert write_snapshot([PLAYERS[0], PLAYERS[0]._replace(uscf_id='01234567')], path) == 1
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    write_snapshot([], path)
+    snapshot = PlayerSnapshot(path)
+    assert len(snapshot) == 0 and snapshot.get('12345678') is None
+    snapshot.close()
+
+
+def test_other_files_are_rejected(tmp_path, snapshot):
+    other = tmp_path / 'players.csv'
+    other.write_text('uscfId,lastName\n12345678,SMITH\n')
+    with pytest.raises(ValueError):
+        PlayerSnapshot(str(other))
+
+    truncated = tmp_path / 'truncated.snap'
+    truncated.write_bytes(open(snapshot.path, 'rb').read()[:-8])
+    with pytest.raises(ValueError):
+        PlayerSnapshot(str(truncated))
+
+
+def test_store_serves_a_snapshot(tmp_path, snapshot):
+    store = PlayerStore.from_path(snapshot.path)
+    assert len(store) == len(PLAYERS)
+    assert store.get('12345678') == PLAYERS[1]
+    assert [player.uscf_id for _, player in store.search('Jose', 'Munoz')][:1] == ['12345678']
+
+    store.add(PLAYERS[0]._replace(rating_regular=1600))
+    assert store.get('30000001').rating_regular == 1600
+    assert len(store) == len(PLAYERS)
+
+
+def test_dataset_is_compiled_once_until_it_changes(tmp_path, players_csv):
+    path = compile_snapshot(players_csv, str(tmp_path))
+    assert path.endswith('.snap') and PlayerStore.from_path(path).get('12345678').name == 'SMITH, JOHN'
+    compiled_at = os.path.getmtime(path)
+    assert compile_snapshot(players_csv, str(tmp_path)) == path
+    assert os.path.getmtime(path) == compiled_at
+
+    os.utime(players_csv, (compiled_at + 10, compiled_at + 10))
+    assert compile_snapshot(players_csv, str(tmp_path)) == path
+    assert os.path.getmtime(path) > compiled_at
+
+
+def test_only_a_readable_csv_or_sqlite_dataset_is_compiled(tmp_path, snapshot):
+    assert compile_snapshot(snapshot.path, str(tmp_path)) is None
+    assert compile_snapshot(str(tmp_path / 'missing.csv'), str(tmp_path)) is None
+    assert compile_snapshot('', str(tmp_path)) is None
+
+
+def test_gunicorn_workers_map_the_compiled_snapshot(tmp_path, players_csv, monkeypatch):
+    import logging
+    import runpy
+
+    shared_dir = tmp_path / 'shared'
+    for name, value in (('USCF_SHARED_DIR', str(shared_dir)), ('USCF_PLAYER_DATA', players_csv),
+                        ('USCF_SHARED_THROTTLE_PATH', ''), ('USCF_CACHE_PATH', '')):
+        monkeypatch.setenv(name, value)
+    config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+
+    class Server:
+        log = logging.getLogger('gunicorn.error')
+
+    config['on_starting'](Server())
+    assert os.path.dirname(os.environ['USCF_PLAYER_DATA']) == str(shared_dir)
+    assert len(PlayerStore.from_path(os.environ['USCF_PLAYER_DATA'])) == 1
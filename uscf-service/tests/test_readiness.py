@@ -0,0 +1,33 @@
+from player_store import PlayerStore
+
+
+def _warm_up(service, monkeypatch, player_data):
+    monkeypatch.setattr(service, 'PLAYER_DATA', player_data)
+    monkeypatch.setattr(service, 'player_store', PlayerStore())
+    monkeypatch.setattr(service, 'player_data_error', None)
+    service._warm_up()
+
+
+def test_ready_once_the_dataset_loads(service, client, monkeypatch, players_csv):
+    _warm_up(service, monkeypatch, players_csv)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()['local_players'] == 1
+
+
+def test_missing_dataset_keeps_the_service_unready(service, client, monkeypatch, tmp_path):
+    missing = str(tmp_path / 'master-players.csv')
+    _warm_up(service, monkeypatch, missing)
+    response = client.get('/ready')
+    assert response.status_code == 503
+    body = response.get_json()
+    assert not body['ready']
+    assert missing in body['error']
+    assert 'Retry-After' not in response.headers
+
+
+def test_no_dataset_configured_serves_from_upstream_only(service, client, monkeypatch):
+    _warm_up(service, monkeypatch, '')
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert 'error' not in response.get_json()
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from uscf_lookup import (
+    Admission, REQUEST_ADMISSION, RequestScheduler, SharedTokenBucket, TokenBucket,
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_ROSTER, SHED_DEADLINE, SHED_QUEUE_FULL
+)
+
+
+@pytest.fixture
+def admission():
+    def admit(priority=PRIORITY_INTERACTIVE, timeout=None):
+        value = Admission(priority, timeout)
+        token = REQUEST_ADMISSION.set(value)
+        tokens.append(token)
+        return value
+
+    tokens = []
+    yield admit
+    for token in reversed(tokens):
+        REQUEST_ADMISSION.reset(token)
+
+
+def test_unthrottled_bucket_always_grants():
+    scheduler = RequestScheduler(TokenBucket(None))
+    assert all(scheduler.acquire() for _ in range(20))
+    assert scheduler.stats()['granted'] == 20
+
+
+def test_bucket_spaces_requests_after_burst():
+    scheduler = RequestScheduler(TokenBucket(20.0, capacity=2))
+    started = time.monotonic()
+    for _ in range(4):
+        assert scheduler.acquire()
+    # Two go out at once, the other two one token interval apart
+    assert time.monotonic() - started == pytest.approx(0.1, abs=0.05)
+
+
+def test_higher_priority_is_served_first():
+    scheduler = RequestScheduler(TokenBucket(5.0))
+    assert scheduler.acquire()  # empty the bucket so the others queue
+    served = []
+
+    def acquire(priority):
+        assert scheduler.acquire(priority=priority)
+        served.append(priority)
+
+    threads = []
+    for priority in (PRIORITY_BACKGROUND, PRIORITY_ROSTER, PRIORITY_INTERACTIVE):
+        threads.append(threading.Thread(target=acquire, args=(priority,)))
+        threads[-1].start()
+        queued = time.monotonic()
+        while not scheduler.stats()['queued'][priority] and time.monotonic() - queued < 0.1:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(2)
+
+    # The background caller queued first but waits for both higher classes
+    assert served == [PRIORITY_INTERACTIVE, PRIORITY_ROSTER, PRIORITY_BACKGROUND]
+
+
+def test_full_queue_is_shed(admission):
+    scheduler = RequestScheduler(TokenBucket(1.0), max_queued={PRIORITY_INTERACTIVE: 1})
+    assert scheduler.acquire()
+    waiter = threading.Thread(target=scheduler.acquire, kwargs={'timeout': 0.3})
+    waiter.start()
+    time.sleep(0.05)
+
+    request = admission()
+    assert not scheduler.acquire(timeout=0.3)
+    assert request.shed == SHED_QUEUE_FULL
+    assert request.retry_after > 0
+    waiter.join()
+    assert scheduler.stats()['shed']['interactive:queue_full'] == 1
+
+
+def test_unmeetable_deadline_is_shed_without_waiting(admission):
+    scheduler = RequestScheduler(TokenBucket(1.0))
+    assert scheduler.acquire()
+    waiter = threading.Thread(target=scheduler.acquire, kwargs={'timeout': 0.5})
+    waiter.start()
+    time.sleep(0.05)
+
+    request = admission(timeout=0.5)
+    started = time.monotonic()
+    # One caller ahead at one request a second can't be served within half a second
+    assert not scheduler.acquire()
+    assert time.monotonic() - started < 0.1
+    assert request.shed == SHED_DEADLINE
+    waiter.join()
+
+
+def test_cancel_withdraws_a_waiting_caller():
+    scheduler = RequestScheduler(TokenBucket(0.5))
+    assert scheduler.acquire()
+    cancel = threading.Event()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(scheduler.acquire(cancel=cancel)))
+    waiter.start()
+    time.sleep(0.05)
+    cancel.set()
+    scheduler.wake()
+    waiter.join(1)
+    assert result == [False]
+    assert scheduler.stats()['queued'][PRIORITY_INTERACTIVE] == 0
+
+
+class _SlowBucket(TokenBucket):
+    """A bucket whose draws block until released, like one waiting on another worker's file lock"""
+
+    def __init__(self):
+        super().__init__(None)
+        self.drawing = threading.Event()
+        self.release = threading.Event()
+
+    def try_take(self, yield_to=()):
+        self.drawing.set()
+        self.release.wait(2)
+        return 0.0
+
+
+def test_slow_draw_does_not_block_queueing_or_stats():
+    bucket = _SlowBucket()
+    scheduler = RequestScheduler(bucket)
+    first = threading.Thread(target=scheduler.acquire)
+    first.start()
+    assert bucket.drawing.wait(1)
+
+    second = threading.Thread(target=scheduler.acquire)
+    second.start()
+    started = time.monotonic()
+    while scheduler.stats()['queued'][PRIORITY_INTERACTIVE] < 2 and time.monotonic() - started < 1:
+        time.sleep(0.001)
+    # The first caller is still drawing, yet the second queued and stats answered meanwhile
+    assert scheduler.stats()['queued'][PRIORITY_INTERACTIVE] == 2
+    assert time.monotonic() - started < 0.5
+
+    bucket.release.set()
+    first.join(1)
+    second.join(1)
+    assert scheduler.stats()['granted'] == 2
+
+
+def test_async_callers_draw_from_a_blocking_bucket_off_the_event_loop(monkeypatch):
+    bucket = _SlowBucket()
+    monkeypatch.setattr(_SlowBucket, 'blocking', True)
+    scheduler = RequestScheduler(bucket)
+
+    async def run():
+        acquired = asyncio.ensure_future(scheduler.acquire_async())
+        while not bucket.drawing.is_set():
+            await asyncio.sleep(0.001)
+        # The loop keeps running while the draw waits; inline, it would stall until the bucket gave up
+        await asyncio.sleep(0.01)
+        bucket.release.set()
+        return await acquired
+
+    started = time.monotonic()
+    assert asyncio.run(run())
+    assert time.monotonic() - started < 1
+
+
+def _report_waiting(db_path, waiting):
+    SharedTokenBucket(1.0, db_path=db_path).report_waiting(waiting)
+
+
+def test_shared_bucket_is_one_budget_across_instances(db_path):
+    first = SharedTokenBucket(1.0, db_path=db_path)
+    second = SharedTokenBucket(1.0, db_path=db_path)
+    assert first.try_take() == 0
+    assert second.try_take() > 0
+
+
+def test_lower_class_yields_to_higher_class_waiting_in_another_worker(db_path, other_process):
+    other_process(_report_waiting, db_path, {PRIORITY_INTERACTIVE: 2, PRIORITY_ROSTER: 0, PRIORITY_BACKGROUND: 0})
+
+    bucket = SharedTokenBucket(20.0, db_path=db_path)
+    assert bucket.waiting_elsewhere((PRIORITY_INTERACTIVE,)) == 2
+    assert bucket.waiting_elsewhere((PRIORITY_ROSTER,)) == 0
+
+    scheduler = RequestScheduler(bucket)
+    assert not scheduler.acquire(priority=PRIORITY_BACKGROUND, timeout=0.2)
+    assert scheduler.acquire(priority=PRIORITY_INTERACTIVE, timeout=0.2)
+
+
+def test_callers_in_other_workers_count_towards_deadlines(db_path, admission, other_process):
+    other_process(_report_waiting, db_path, {PRIORITY_INTERACTIVE: 5, PRIORITY_ROSTER: 0, PRIORITY_BACKGROUND: 0})
+
+    scheduler = RequestScheduler(SharedTokenBucket(2.0, db_path=db_path))
+    request = admission(PRIORITY_ROSTER, timeout=1.0)
+    # Five interactive callers elsewhere take 2.5s of budget before this one
+    assert not scheduler.acquire()
+    assert request.shed == SHED_DEADLINE
+
+
+def test_stale_reports_from_other_workers_are_ignored(db_path, monkeypatch, other_process):
+    other_process(_report_waiting, db_path, {PRIORITY_INTERACTIVE: 3, PRIORITY_ROSTER: 0, PRIORITY_BACKGROUND: 0})
+
+    bucket = SharedTokenBucket(20.0, db_path=db_path)
+    monkeypatch.setattr(bucket, 'waiter_ttl', 0.0)
+    assert bucket.waiting_elsewhere((PRIORITY_INTERACTIVE,)) == 0
+    assert RequestScheduler(bucket).acquire(priority=PRIORITY_BACKGROUND, timeout=0.2)
+
+
+def test_own_queue_is_published_and_cleared(db_path):
+    scheduler = RequestScheduler(SharedTokenBucket(0.5, db_path=db_path))
+    assert scheduler.acquire()
+    waiter = threading.Thread(target=scheduler.acquire, kwargs={'timeout': 0.3})
+    waiter.start()
+    time.sleep(0.05)
+
+    def reported():
+        return SharedTokenBucket(0.5, db_path=db_path)._db.execute(
+            "SELECT SUM(waiting) FROM bucket_waiters WHERE priority = ?", (PRIORITY_INTERACTIVE,)
+        ).fetchone()[0]
+
+    assert reported() == 1
+    waiter.join()
+    assert reported() == 0
@@ -0,0 +1,41 @@
+from uscf_lookup import PlayerCache
+
+from roster_verify import UNKNOWN_ID, UNVERIFIED
+
+
+def _verify(client, *uscf_ids):
+    response = client.post('/roster-verify', json=[{'uscf_id': uscf_id} for uscf_id in uscf_ids])
+    assert response.status_code == 200
+    return [row['flags'] for row in response.get_json()['rows']]
+
+
+def test_not_found_ids_are_unknown(client):
+    # IDs starting with 9 get the stub's "Players found: 0" page
+    flags = _verify(client, '91234567', '12345678')
+    assert flags[0] == [UNKNOWN_ID]
+    assert UNKNOWN_ID not in flags[1] and UNVERIFIED not in flags[1]
+
+
+def test_open_circuit_marks_only_unchecked_ids_unverified(client, service):
+    service.player_cache.set(PlayerCache.id_key('91234567'), [])
+    service.uscf_lookup.breaker.record_failure(blocked=True)
+    # The cached "not found" is still an answer; the other ID was never asked about
+    assert _verify(client, '91234567', '87654321') == [[UNKNOWN_ID], [UNVERIFIED]]
+
+
+def test_circuit_opening_mid_roster_only_affects_later_ids(client, service, monkeypatch):
+    lookup = service.uscf_lookup
+    make_request = lookup._make_request
+
+    def open_after_first(uscf_id):
+        html = make_request(uscf_id)
+        lookup.breaker.record_failure(blocked=True)
+        return html
+
+    monkeypatch.setattr(lookup, '_make_request', open_after_first)
+    assert _verify(client, '91234567', '87654321') == [[UNKNOWN_ID], [UNVERIFIED]]
+
+
+def test_unfetched_ids_are_unverified(client):
+    response = client.post('/roster-verify', json={'players': [{'uscf_id': '91234567'}], 'fetch': False})
+    assert [row['flags'] for row in response.get_json()['rows']] == [[UNVERIFIED]]
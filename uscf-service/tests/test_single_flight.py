@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+from uscf_lookup import Admission, AsyncSingleFlight, REQUEST_ADMISSION, SHED_DEADLINE, SingleFlight
+
+
+def _wait_for_followers(flight, count):
+    started = time.monotonic()
+    while flight.shared < count and time.monotonic() - started < 2:
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return 'result'
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', fn))) for _ in range(3)]
+    threads[0].start()
+    while not calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_for_followers(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert (len(calls), results, flight.shared) == (1, ['result'] * 3, 2)
+    # The key is released once the call finishes
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fn():
+        release.wait(2)
+        raise ValueError('upstream')
+
+    def call():
+        try:
+            flight.do('key', fn)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    _wait_for_followers(flight, 1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_cancelled_follower_leaves_the_leader_running():
+    async def run():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        leader = asyncio.ensure_future(flight.do('key', fetch))
+        follower = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        assert await leader == 'result'
+        assert follower.cancelled() and calls == [1]
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_leaves_the_followers_waiting():
+    async def run():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        leader = asyncio.ensure_future(flight.do('key', fetch))
+        followers = [asyncio.ensure_future(flight.do('key', fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await asyncio.gather(*followers) == ['result', 'result']
+        assert leader.cancelled() and calls == [1]
+
+    asyncio.run(run())
+
+
+def test_fetch_is_cancelled_once_every_caller_is():
+    async def run():
+        flight = AsyncSingleFlight()
+        finished = []
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        callers = [asyncio.ensure_future(flight.do('key', fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.sleep(0.1)
+        assert finished == []
+        # The key is released once the fetch is gone
+        assert await flight.do('key', lambda: asyncio.sleep(0, 'again')) == 'again'
+
+    asyncio.run(run())
+
+
+def test_name_lookup_followers_inherit_a_shed_leader(make_lookup, monkeypatch):
+    lookup = make_lookup()
+    release = threading.Event()
+    searches = []
+
+    def shed_search(first_name, last_name):
+        searches.append(1)
+        release.wait(2)
+        REQUEST_ADMISSION.get().shed = SHED_DEADLINE
+        return []
+
+    def search(admission):
+        REQUEST_ADMISSION.set(admission)
+        lookup.lookup_by_name('Ryan', 'Moreno')
+
+    monkeypatch.setattr(lookup, '_fetch_by_name', shed_search)
+    leader, follower = Admission(), Admission()
+    threads = [threading.Thread(target=search, args=(admission,)) for admission in (leader, follower)]
+    threads[0].start()
+    while not searches:
+        time.sleep(0.001)
+    threads[1].start()
+    _wait_for_followers(lookup.inflight, 1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert searches == [1]
+    assert leader.shed == follower.shed == SHED_DEADLINE
+
+
+def test_async_name_lookup_followers_inherit_a_shed_leader(make_lookup, monkeypatch):
+    from uscf_lookup_async import AsyncUSCFLookup
+    async_lookup = AsyncUSCFLookup(make_lookup())
+
+    async def shed_search(first_name, last_name):
+        await asyncio.sleep(0.05)
+        REQUEST_ADMISSION.get().shed = SHED_DEADLINE
+        return []
+
+    async def search(admission):
+        REQUEST_ADMISSION.set(admission)
+        return await async_lookup.lookup_by_name('Ryan', 'Moreno')
+
+    async def run():
+        await asyncio.gather(search(leader), search(follower))
+
+    monkeypatch.setattr(async_lookup, '_fetch_by_name', shed_search)
+    leader, follower = Admission(), Admission()
+    asyncio.run(run())
+
+    assert async_lookup.inflight.shared == 1
+    assert leader.shed == follower.shed == SHED_DEADLINE
@@ -0,0 +1,306 @@
+"""
+ASGI entry point for the USCF lookup service
+
+Serves /uscf-lookup and /uscf-lookup-name (POST and GET) natively on the event
+loop through AsyncUSCFLookup and hands every other route to the Flask app, so
+both modes expose the same API - including ETags and 304s for conditional GETs -
+and share one cache, local store and request scheduler.
+
+Run with: uvicorn uscf_asgi:app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+import uscf_service
+from player_store import player_matches
+from uscf_lookup import REQUEST_ADMISSION
+from uscf_metrics import RequestTrace, REQUEST_TRACE
+from uscf_lookup_async import AsyncUSCFLookup
+
+async_lookup = AsyncUSCFLookup(
+    uscf_service.uscf_lookup,
+    connection_limit=int(os.environ.get('USCF_CONNECTION_LIMIT', 20))
+)
+flask_app = WSGIMiddleware(uscf_service.app)
+
+async def _read_json(receive) -> dict:
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+async def _read_request(scope, receive) -> dict:
+    """Fields of a lookup: the JSON body of a POST, or the query string of a GET"""
+    if scope['method'] != 'GET':
+        return await _read_json(receive)
+    fields = {}
+    for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1')):
+        fields.setdefault(name, value)
+    return fields
+
+async def _send_json(send, payload, status: int = 200, if_none_match: str = None) -> int:
+    """
+    Send payload as JSON; an EncodedJSON is sent as-is with its ETag and Cache-Control
+    
+    If if_none_match (a GET's If-None-Match header) matches the ETag, a 304
+    with no body is sent instead, as Flask's make_conditional does. Returns
+    the status sent.
+    """
+    if isinstance(payload, uscf_service.EncodedJSON):
+        body = payload.body
+        extra = [
+            (b'etag', f'"{payload.etag}"'.encode()),
+            (b'cache-control', f'public, max-age={uscf_service.HTTP_MAX_AGE}'.encode()),
+        ]
+        if status == 200 and if_none_match and parse_etags(if_none_match).contains_weak(payload.etag):
+            status, body = 304, b''
+    else:
+        body = uscf_service._encode_json(payload)
+        extra = []
+    headers = [(b'access-control-allow-origin', b'*'), *extra]
+    if status != 304:
+        headers += [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]
+    if status in (429, 503):
+        headers.append((b'retry-after', uscf_service._retry_after().encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+async def _send_stream(send, items, stream_format: str):
+    """Send each item of an async iterator as an NDJSON line or server-sent event as soon as it's ready"""
+    mimetype = b'text/event-stream' if stream_format == 'sse' else b'application/x-ndjson'
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', mimetype),
+            (b'access-control-allow-origin', b'*'),
+            *((name.lower().encode(), value.encode()) for name, value in uscf_service.STREAM_HEADERS.items()),
+        ],
+    })
+    try:
+        async for item in items:
+            body = uscf_service._encode_stream_item(item, stream_format).encode('utf-8')
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        # As in Flask, lookups left unanswered partway end the stream with an error record
+        unanswered = uscf_service._unanswered_error()
+        if unanswered is not None:
+            body = uscf_service._encode_stream_error(unanswered, stream_format).encode('utf-8')
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except Exception as e:
+        logging.error(f"Error streaming response: {e}")
+        body = uscf_service._encode_stream_error({'error': 'Internal server error'}, stream_format).encode('utf-8')
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    end = uscf_service.STREAM_END_EVENT.encode() if stream_format == 'sse' else b''
+    await send({'type': 'http.response.body', 'body': end})
+
+async def _prime_stream(items):
+    """
+    Pull the first item of an async iterator before the status is sent
+    
+    Returns:
+        (iterator still yielding every item, whether there was a first item)
+    """
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        return items, False
+    
+    async def primed():
+        yield first
+        async for item in items:
+            yield item
+    
+    return primed(), True
+
+def _stream_format(scope):
+    """Streaming format preferred by the Accept header, weighed by q-value as in Flask, or None for plain JSON"""
+    accept = dict(scope.get('headers') or []).get(b'accept', b'').decode('latin-1')
+    return uscf_service._negotiate_stream_format(parse_accept_header(accept, MIMEAccept))
+
+async def _track_player(player):
+    # Tracking writes to the refresh job's SQLite file, so it runs off the event loop
+    if uscf_service.refresh_job is not None:
+        await asyncio.to_thread(uscf_service._track_player, player)
+
+def _shed_response():
+    """429 or 503 response for a lookup that came up empty because it was shed, or None"""
+    admission = uscf_service._request_shed()
+    if admission is None:
+        return None
+    return {'error': uscf_service.SHED_ERRORS[admission.shed]}, uscf_service._shed_status(admission)
+
+def _unanswered_response():
+    """503 or 429 response for a lookup that came up empty because uschess.org wasn't asked, or None"""
+    if uscf_service._upstream_unavailable():
+        return {'error': uscf_service.UNAVAILABLE_ERROR}, 503
+    return _shed_response()
+
+async def lookup_player(data: dict):
+    uscf_id = data.get('uscf_id')
+    
+    if not uscf_id:
+        return {'error': 'USCF ID is required'}, 400
+    
+    player = await async_lookup.lookup_by_id(uscf_id)
+    
+    if not player:
+        if uscf_service._upstream_unavailable():
+            return {'error': uscf_service.UNAVAILABLE_ERROR}, 503
+        return _shed_response() or ({'error': 'Player not found'}, 404)
+    
+    await _track_player(player)
+    return uscf_service._encoded_player(player), 200
+
+async def lookup_players_by_name(data: dict):
+    first_name = data.get('first_name')
+    last_name = data.get('last_name')
+    
+    if not first_name and not last_name:
+        return {'error': 'At least a first or last name is required'}, 400
+    
+    try:
+        criteria, limit = uscf_service._name_filters(data)
+    except ValueError:
+        return {'error': uscf_service.NAME_FILTERS_ERROR}, 400
+    
+    players = await async_lookup.lookup_by_name(first_name, last_name)
+    players = list(uscf_service._filter_name_results(players, criteria, limit))
+    
+    if not players:
+        unanswered = _unanswered_response()
+        if unanswered is not None:
+            return unanswered
+    
+    return uscf_service._encoded_players(players), 200
+
+async def stream_players_by_name(data: dict):
+    first_name = data.get('first_name')
+    last_name = data.get('last_name')
+    
+    if not first_name and not last_name:
+        return {'error': 'At least a first or last name is required'}, 400
+    
+    try:
+        criteria, limit = uscf_service._name_filters(data)
+    except ValueError:
+        return {'error': uscf_service.NAME_FILTERS_ERROR}, 400
+    
+    async def players():
+        sent = 0
+        if limit is not None and limit <= 0:
+            return
+        async for player in async_lookup.iter_by_name(first_name, last_name):
+            if player_matches(player, **criteria):
+                yield uscf_service._player_to_dict(player)
+                sent += 1
+                if sent == limit:
+                    return
+    
+    return players(), 200
+
+ROUTES = {
+    ('POST', '/uscf-lookup'): lookup_player,
+    ('GET', '/uscf-lookup'): lookup_player,
+    ('POST', '/uscf-lookup-name'): lookup_players_by_name,
+    ('GET', '/uscf-lookup-name'): lookup_players_by_name,
+}
+
+# Used instead of ROUTES when the client asks for a streamed response
+STREAM_ROUTES = {
+    ('POST', '/uscf-lookup-name'): stream_players_by_name,
+    ('GET', '/uscf-lookup-name'): stream_players_by_name,
+}
+
+def _warm_up_done(future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.error(f"Async warm-up failed: {future.exception()}")
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Import aiohttp off the event loop without holding up startup
+            warm_up = asyncio.get_running_loop().run_in_executor(None, async_lookup.warm_up)
+            warm_up.add_done_callback(_warm_up_done)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_lookup.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+def _record_request_time(route: str, status: int, started: float):
+    elapsed = time.perf_counter() - started
+    uscf_service.request_time.observe(elapsed, route, str(status))
+    uscf_service.slow_requests.record(route, status, elapsed, REQUEST_TRACE.get())
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    
+    route = (scope.get('method'), scope.get('path')) if scope['type'] == 'http' else None
+    stream_format = _stream_format(scope) if route in STREAM_ROUTES else None
+    handler = STREAM_ROUTES[route] if stream_format else ROUTES.get(route)
+    if handler is None:
+        return await flask_app(scope, receive, send)
+    
+    started = time.perf_counter()
+    headers = dict(scope.get('headers') or [])
+    # Each request runs in its own task, so this is only seen by this request's lookups
+    REQUEST_ADMISSION.set(uscf_service._admission(
+        handler.__name__,
+        headers.get(b'x-uscf-priority', b'').decode('latin-1'),
+        headers.get(b'x-uscf-deadline', b'').decode('latin-1')
+    ))
+    if uscf_service.slow_requests.enabled:
+        REQUEST_TRACE.set(RequestTrace())
+    # As in the Flask routes, a lookup during a fast start waits for the store rather than going upstream
+    if not uscf_service.store_loaded.is_set():
+        await asyncio.get_running_loop().run_in_executor(
+            None, uscf_service.store_loaded.wait, uscf_service.STARTUP_WAIT_SECONDS)
+    try:
+        payload, status = await handler(await _read_request(scope, receive))
+    except Exception as e:
+        logging.error(f"Error in {handler.__name__}: {e}")
+        payload, status = {'error': 'Internal server error'}, 500
+    if stream_format and status == 200:
+        # As in Flask, the first item comes before the status so an empty stream from a
+        # shed or unavailable lookup can still get its 429/503
+        try:
+            payload, has_items = await _prime_stream(payload)
+        except Exception as e:
+            logging.error(f"Error in {handler.__name__}: {e}")
+            payload, status = {'error': 'Internal server error'}, 500
+        else:
+            unanswered = None if has_items else _unanswered_response()
+            if unanswered is not None:
+                payload, status = unanswered
+    if stream_format and status == 200:
+        # Timed up to the first byte, matching the Flask routes
+        _record_request_time(scope['path'], status, started)
+        return await _send_stream(send, payload, stream_format)
+    if_none_match = headers.get(b'if-none-match') if scope['method'] == 'GET' else None
+    status = await _send_json(send, payload, status, if_none_match and if_none_match.decode('latin-1'))
+    _record_request_time(scope['path'], status, started)
@@ -1,16 +1,94 @@
-import requests
 import time
-from bs4 import BeautifulSoup
 import re
-from dataclasses import dataclass
-from typing import Optional, List
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import zlib
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from functools import lru_cache
+from typing import Optional, Dict, List, Iterable, Iterator, NamedTuple, Set, Tuple
+from urllib.parse import urlparse
 import logging
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class USCFPlayer:
-    """Data class to hold USCF player information"""
+# requests, lxml and BeautifulSoup are imported on first use rather than with
+# this module; together they are most of a cold start's import time
+
+def _requests():
+    import requests
+    return requests
+
+@lru_cache(maxsize=None)
+def _lxml_etree():
+    """lxml's etree module, or None if lxml is missing and BeautifulSoup must be used"""
+    try:
+        from lxml import etree
+    except ImportError:  # pragma: no cover - lxml is pinned, BeautifulSoup remains the fallback
+        return None
+    return etree
+
+# Browser-like headers sent with every upstream request
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+}
+
+# Precompiled patterns used on every parsed row
+_USCF_ID_PREFIX_RE = re.compile(r'^\d{7,8}')
+_USCF_ID_RE = re.compile(r'^\d{7,8}$')
+_RATING_RE = re.compile(r'^(\d+)')
+
+# Page-level checks, each a single scan over the HTML
+_BLOCKED_RE = re.compile(r'cloudflare|error 1003', re.IGNORECASE)
+_NO_RESULTS_RE = re.compile(r'Players found: 0|No players found')
+
+# Result table columns: USCF ID, Rating, Q Rtg, BL Rtg, OL R, OL Q, OL BL, State, Exp Date, Name
+_RESULT_COLUMNS = (0, 1, 2, 7, 8, 9)
+
+# Size of the chunks fed to the streaming parser; small enough to stop early on ID lookups
+_PARSE_CHUNK_SIZE = 16384
+
+def _iter_result_rows_lxml(html_content: str) -> Iterator[Tuple[str, ...]]:
+    """
+    Stream the page through lxml and yield player rows from the results table
+    
+    Only <tr> elements are materialized, and parsing stops as soon as the
+    caller stops consuming rows.
+    
+    Yields:
+        Tuples of (USCF ID, rating, quick rating, state, expiration, name) cell text
+    """
+    parser = _lxml_etree().HTMLPullParser(events=('end',), tag='tr')
+    
+    for start in range(0, len(html_content), _PARSE_CHUNK_SIZE):
+        parser.feed(html_content[start:start + _PARSE_CHUNK_SIZE])
+        for _, row in parser.read_events():
+            cells = [cell for cell in row if cell.tag == 'td']
+            if len(cells) >= 10:
+                uscf_id = ''.join(text.strip() for text in cells[0].itertext())
+                if _USCF_ID_PREFIX_RE.match(uscf_id):
+                    yield tuple(
+                        ''.join(text.strip() for text in cells[column].itertext())
+                        for column in _RESULT_COLUMNS
+                    )
+            row.clear()
+    
+    parser.close()
+
+class USCFPlayer(NamedTuple):
+    """Compact record holding USCF player information"""
     uscf_id: str
     name: str
     rating_regular: Optional[int] = None
@@ -18,111 +96,1207 @@ class USCFPlayer:
     state: Optional[str] = None
     expiration_date: Optional[str] = None
 
+def format_name(raw_name: str) -> str:
+    """
+    Format name from USCF format to "lastName, firstName, middleName"
+    
+    Used for scraped names and for single-column names in imported files, so
+    both sources spell a player the same way. Formatting a formatted name
+    leaves it unchanged.
+    
+    Args:
+        raw_name: Name as it appears in USCF (e.g., "MORENO, RYAN" or "SMITH, JOHN DAVID")
+        
+    Returns:
+        Formatted name as "lastName, firstName, middleName"
+    """
+    try:
+        if ',' not in raw_name:
+            return raw_name.strip()
+        
+        # Split on the first comma to separate last name from first/middle names
+        last_name, remaining_names = raw_name.split(',', 1)
+        last_name = ' '.join(last_name.split())
+        # Further commas (an already formatted name) separate names like spaces do
+        name_parts = remaining_names.replace(',', ' ').split()
+        
+        if not name_parts:
+            return last_name
+        
+        if len(name_parts) == 1:
+            # Only first name
+            return f"{last_name}, {name_parts[0]}"
+        
+        # First name and middle name(s)
+        return f"{last_name}, {name_parts[0]}, {' '.join(name_parts[1:])}"
+        
+    except Exception as e:
+        logger.warning(f"Error formatting name '{raw_name}': {e}")
+        return raw_name.strip()
+
+class PlayerCache:
+    """
+    TTL cache for lookup results with LRU eviction and an optional SQLite backend
+    
+    Entries are lists of USCFPlayer objects; an empty list is a negative entry
+    ("Players found: 0") and expires after negative_ttl_seconds instead of ttl_seconds.
+    When db_path is set, entries are also written to SQLite so a warm cache
+    survives restarts and is shared by worker processes; the in-memory LRU
+    sits in front of it, and falls through to SQLite once its own copy has
+    expired in case another worker has fetched the player since.
+    
+    Expired entries are kept for a further stale_seconds so they can still be
+    served while uschess.org is unreachable (see get's allow_stale).
+    """
+    
+    def __init__(self, ttl_seconds: float = 86400, negative_ttl_seconds: float = 3600,
+                 max_entries: int = 10000, db_path: Optional[str] = None,
+                 stale_seconds: float = 7 * 86400):
+        """
+        Initialize the cache
+        
+        Args:
+            ttl_seconds: How long a found player stays cached
+            negative_ttl_seconds: How long a "no players found" result stays cached
+            max_entries: Maximum number of entries held in memory before LRU eviction
+            db_path: Optional SQLite file used to persist entries across restarts
+            stale_seconds: How long past expiry an entry is kept as a fallback for upstream outages
+        """
+        self.ttl = ttl_seconds
+        self.negative_ttl = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            # WAL lets worker processes sharing the file read while another writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS player_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM player_cache WHERE expires_at < ?", (time.time() - stale_seconds,))
+            self._db.commit()
+    
+    @property
+    def blocking(self) -> bool:
+        """Whether get and set may wait on SQLite, so async callers should make them off the event loop"""
+        return self._db is not None
+    
+    @staticmethod
+    def id_key(uscf_id: str) -> str:
+        return f"id:{str(uscf_id).strip()}"
+    
+    @staticmethod
+    def name_key(first_name: Optional[str], last_name: Optional[str]) -> str:
+        first = " ".join((first_name or "").lower().split())
+        last = " ".join((last_name or "").lower().split())
+        return f"name:{last}|{first}"
+    
+    def get(self, key: str, allow_stale: bool = False) -> Optional[List[USCFPlayer]]:
+        """
+        Return the cached players for key, or None on a miss
+        
+        A cached negative result is returned as an empty list. With allow_stale,
+        entries up to stale_seconds past expiry are returned too.
+        """
+        now = time.time()
+        oldest = now - self.stale_seconds if allow_stale else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now - self.stale_seconds:
+                del self._entries[key]
+                entry = None
+            
+            if (entry is None or entry[0] < now) and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM player_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] >= now - self.stale_seconds and (entry is None or row[1] > entry[0]):
+                    entry = (row[1], [USCFPlayer(**p) for p in json.loads(row[0])])
+                    self._store(key, entry)
+            
+            if entry is None or entry[0] < oldest:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            if entry[0] < now:
+                self.stale_hits += 1
+            elif entry[1]:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return list(entry[1])
+    
+    def set(self, key: str, players: List[USCFPlayer]):
+        """Cache players for key; an empty list records a negative result"""
+        ttl = self.ttl if players else self.negative_ttl
+        entry = (time.time() + ttl, list(players))
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO player_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps([p._asdict() for p in players]), entry[0])
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist cache entry {key}: {e}")
+    
+    def _store(self, key: str, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'persistent': self._db is not None
+            }
+
+class CachedResponse(NamedTuple):
+    """A search page held by ResponseCache"""
+    body: bytes  # zlib-compressed UTF-8 text
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+
+class ResponseCache:
+    """
+    HTTP-level cache of uschess.org search pages, keyed by normalized URL
+    
+    Pages are reused without any request while fresh. After that they are
+    revalidated with If-None-Match / If-Modified-Since when the site sent an
+    ETag or Last-Modified, so an unchanged page costs a 304 instead of a full
+    transfer. Bodies are kept zlib-compressed (search pages shrink about 10x)
+    and the cache is capped by compressed size with LRU eviction.
+    """
+    
+    def __init__(self, fresh_seconds: float = 300, max_bytes: int = 32 * 1024 * 1024,
+                 compression_level: int = 6):
+        """
+        Initialize the cache
+        
+        Args:
+            fresh_seconds: How long a page is reused without contacting uschess.org
+            max_bytes: Cap on the total compressed size of cached pages (0 disables the cache)
+            compression_level: zlib level used for stored bodies
+        """
+        self.fresh_seconds = fresh_seconds
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(base_url: str, search_term: str) -> str:
+        """Search URL with the term's case and whitespace normalized, as uschess.org ignores both"""
+        return f"{base_url}?name={' '.join(search_term.split()).upper()}"
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return entry.fresh_until >= time.time()
+    
+    def text(self, entry: CachedResponse, fresh_hit: bool = False) -> str:
+        """Decompress a cached page; fresh_hit counts it as served without contacting uschess.org"""
+        if fresh_hit:
+            with self._lock:
+                self.fresh_hits += 1
+        return zlib.decompress(entry.body).decode('utf-8')
+    
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> dict:
+        """Validators to send when re-requesting a cached page"""
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+    
+    def _fresh_until(self, headers) -> Optional[float]:
+        cache_control = (headers.get('Cache-Control') or '').lower()
+        if 'no-store' in cache_control:
+            return None
+        if 'no-cache' in cache_control:
+            return time.time()
+        return time.time() + self.fresh_seconds
+    
+    def store(self, key: str, text: str, headers):
+        """Cache a 200 response body with its validators, unless the response forbids it"""
+        if self.max_bytes <= 0:
+            return
+        fresh_until = self._fresh_until(headers)
+        if fresh_until is None:
+            return
+        
+        body = zlib.compress(text.encode('utf-8'), self.compression_level)
+        if len(body) > self.max_bytes:
+            return
+        entry = CachedResponse(body, headers.get('ETag'), headers.get('Last-Modified'), fresh_until)
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+    
+    def refresh(self, key: str, headers) -> Optional[CachedResponse]:
+        """Extend a cached page's freshness after a 304 Not Modified"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.revalidated += 1
+            fresh_until = self._fresh_until(headers) or time.time()
+            entry = entry._replace(
+                etag=headers.get('ETag') or entry.etag,
+                last_modified=headers.get('Last-Modified') or entry.last_modified,
+                fresh_until=fresh_until
+            )
+            self._entries[key] = entry
+            return entry
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'fresh_hits': self.fresh_hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of up to `capacity`
+    
+    Not locked on its own; RequestScheduler serializes access to it, except
+    for waiting_elsewhere, which may be called alongside the other methods. A
+    plain bucket serves one process, so report_waiting and waiting_elsewhere
+    have nothing to share; see SharedTokenBucket.
+    """
+    
+    def __init__(self, rate: Optional[float], capacity: int = 1):
+        """
+        Args:
+            rate: Tokens added per second (None or <= 0 disables throttling)
+            capacity: Maximum number of tokens that can accumulate for a burst
+        """
+        self.rate = rate if rate and rate > 0 else None
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+    
+    @property
+    def blocking(self) -> bool:
+        """Whether calls may wait on I/O, so async callers should make them off the event loop"""
+        return False
+    
+    def try_take(self, yield_to: Tuple[str, ...] = ()) -> float:
+        """
+        Take a token if one is available
+        
+        Args:
+            yield_to: Priority classes that go first when callers in another
+                      process sharing the bucket are waiting in them
+        
+        Returns:
+            0 if a token was taken, otherwise the number of seconds until one is available
+        """
+        if self.rate is None:
+            return 0.0
+        
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+    
+    def report_waiting(self, waiting: Dict[str, int]):
+        """Publish how many callers in this process wait in each priority class"""
+    
+    def waiting_elsewhere(self, priorities: Tuple[str, ...]) -> int:
+        """Callers waiting in other processes in any of the given priority classes"""
+        return 0
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in SQLite so worker processes share one budget
+    
+    Every process pointed at the same file draws from the same bucket, so
+    adding workers adds throughput without multiplying requests to uschess.org.
+    If the file can't be used the bucket falls back to a per-process budget.
+    
+    Each process also publishes how many of its callers wait in each priority
+    class, so priorities hold across workers: a process lets a token go while
+    another has callers waiting in a higher class, and deadline estimates count
+    the callers queued in every process. A process that stops reporting (e.g.
+    one that was killed) is ignored after WAITER_TTL seconds.
+    """
+    
+    # Seconds a process's waiting counts count for without being refreshed
+    WAITER_TTL = 10.0
+    
+    def __init__(self, rate: Optional[float], capacity: int = 1, db_path: str = 'uscf-shared.db',
+                 name: str = 'uschess'):
+        """
+        Args:
+            rate: Tokens added per second (None or <= 0 disables throttling)
+            capacity: Maximum number of tokens that can accumulate for a burst
+            db_path: SQLite file shared by every worker process
+            name: Bucket name, so one file can hold several budgets
+        """
+        super().__init__(rate, capacity)
+        self.name = name
+        # Autocommit mode, so BEGIN IMMEDIATE below controls the transaction
+        self._db = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bucket_waiters ("
+            "name TEXT NOT NULL, worker INTEGER NOT NULL, priority TEXT NOT NULL, "
+            "waiting INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (name, worker, priority))"
+        )
+        # Reads of other workers' counts go through their own connection: in WAL mode they
+        # don't wait for a writer, so queueing never waits on a draw in progress
+        self._reader = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        # The head of a queue re-checks at least once a token interval, refreshing its counts
+        self.waiter_ttl = max(self.WAITER_TTL, 3 / self.rate) if self.rate else self.WAITER_TTL
+    
+    @property
+    def blocking(self) -> bool:
+        # Every call is a SQLite transaction that may wait on another worker's lock
+        return True
+    
+    def _waiting_elsewhere(self, db: sqlite3.Connection, priorities: Tuple[str, ...], now: float) -> int:
+        # pid is read on every call, as gunicorn forks workers from one parent
+        row = db.execute(
+            f"SELECT SUM(waiting) FROM bucket_waiters WHERE name = ? AND worker != ? AND updated > ? "
+            f"AND priority IN ({', '.join('?' * len(priorities))})",
+            (self.name, os.getpid(), now - self.waiter_ttl, *priorities)
+        ).fetchone()
+        return row[0] or 0
+    
+    def try_take(self, yield_to: Tuple[str, ...] = ()) -> float:
+        if self.rate is None:
+            return 0.0
+        
+        try:
+            # Take the write lock up front so no other process reads the same token count
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                tokens, updated = row if row else (float(self.capacity), now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                
+                if yield_to and self._waiting_elsewhere(self._db, yield_to, now):
+                    # Leave the token for the higher class waiting in another process
+                    wait = max(1 - tokens, 0.0) / self.rate or 1 / self.rate
+                elif tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / self.rate
+                
+                self._db.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                # Still waiting; keep this process's counts from going stale
+                self._db.execute(
+                    "UPDATE bucket_waiters SET updated = ? WHERE name = ? AND worker = ?",
+                    (now, self.name, os.getpid())
+                )
+                self._db.execute("COMMIT")
+                return wait
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Shared rate limit unavailable, using a per-process budget: {e}")
+            return super().try_take()
+    
+    def report_waiting(self, waiting: Dict[str, int]):
+        try:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO bucket_waiters (name, worker, priority, waiting, updated) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(self.name, os.getpid(), priority, count, now) for priority, count in waiting.items()]
+                )
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Could not share queued request counts: {e}")
+    
+    def waiting_elsewhere(self, priorities: Tuple[str, ...]) -> int:
+        if not priorities:
+            return 0
+        try:
+            return self._waiting_elsewhere(self._reader, priorities, time.time())
+        except sqlite3.Error as e:
+            logger.error(f"Could not read queued request counts: {e}")
+            return 0
+
+# Priority classes of upstream requests, highest first
+PRIORITY_INTERACTIVE = 'interactive'  # typeahead and single lookups someone is waiting on
+PRIORITY_ROSTER = 'roster'            # batch lookups and roster validation
+PRIORITY_BACKGROUND = 'background'    # the refresh job and other unattended work
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_ROSTER, PRIORITY_BACKGROUND)
+
+# Why a request was turned away instead of being given a slot
+SHED_QUEUE_FULL = 'queue_full'  # its class already has as many callers waiting as allowed
+SHED_DEADLINE = 'deadline'      # it could not have been served before its deadline
+
+class Admission:
+    """
+    Priority class and deadline of the service request being handled
+    
+    Set with REQUEST_ADMISSION for the duration of a request; the scheduler
+    queues the request's upstream calls by its priority, drops them once they
+    can no longer finish before its deadline, and records why on shed so the
+    service can answer 429 or 503 instead of "not found". Likewise unavailable
+    records that an upstream call was skipped because the circuit was open, or
+    got no answer from uschess.org.
+    """
+    
+    def __init__(self, priority: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        self.priority = priority
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.shed: Optional[str] = None
+        self.retry_after = 0.0
+        self.unavailable = False
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None if there is none"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+# Admission of the request being handled in this thread or task, if any
+REQUEST_ADMISSION: ContextVar[Optional[Admission]] = ContextVar('uscf_request_admission', default=None)
+
+class RequestScheduler:
+    """
+    Thread-safe scheduler for outbound uschess.org requests
+    
+    Callers queue by priority class and are served strictly by priority, FIFO
+    within a class, as tokens become available in the bucket. Each class's
+    queue is bounded, and a caller is turned away as soon as the callers ahead
+    of it mean it can't be served before its deadline, rather than waiting
+    until it times out. Only requests that actually go upstream pass through
+    here, so cache and local hits never wait behind the throttle.
+    
+    With a SharedTokenBucket the ordering holds across worker processes too:
+    the head of this process's queue lets a token go while another worker has
+    callers waiting in a higher class, and callers queued in other workers
+    count towards deadline estimates. With a plain TokenBucket both only
+    cover this process.
+    """
+    
+    # How often async callers that aren't next in line re-check the queue
+    POLL_INTERVAL = 0.05
+    # Callers allowed to wait in each class before more are turned away
+    MAX_QUEUED = {PRIORITY_INTERACTIVE: 50, PRIORITY_ROSTER: 200, PRIORITY_BACKGROUND: 20}
+    
+    def __init__(self, bucket: TokenBucket, max_queued: Optional[Dict[str, int]] = None):
+        self.bucket = bucket
+        self._cond = threading.Condition()
+        # Serializes calls into the bucket, which may block on SQLite; never taken while holding _cond
+        self._bucket_lock = threading.Lock()
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self.max_queued = {**self.MAX_QUEUED, **(max_queued or {})}
+        self._reported = {}
+        
+        self.granted = 0
+        self.expired = 0
+        self.shed = Counter()
+    
+    def _head(self):
+        for priority in PRIORITIES:
+            if self._queues[priority]:
+                return self._queues[priority][0]
+        return None
+    
+    def _ahead(self, ticket, priority: str, elsewhere: int) -> int:
+        """Callers that will be served before ticket, elsewhere being those waiting in other workers"""
+        ahead = elsewhere
+        for other in PRIORITIES:
+            if other == priority:
+                return ahead + self._queues[other].index(ticket)
+            ahead += len(self._queues[other])
+        return ahead
+    
+    def _waiting_elsewhere(self, priority: str) -> int:
+        # Same-class callers elsewhere may or may not get in first; counting them errs long
+        return self.bucket.waiting_elsewhere(PRIORITIES[:PRIORITIES.index(priority) + 1])
+    
+    def _publish_waiting(self):
+        """Share this process's queue lengths through the bucket if they changed; _bucket_lock must be held"""
+        with self._cond:
+            waiting = {priority: len(queue) for priority, queue in self._queues.items()}
+        if waiting != self._reported:
+            self.bucket.report_waiting(waiting)
+            self._reported = waiting
+    
+    def _report_waiting(self):
+        with self._bucket_lock:
+            self._publish_waiting()
+    
+    def _estimated_wait(self, ahead: int) -> float:
+        # Every caller ahead takes one token; a burst may serve some sooner, so this errs long
+        return ahead / self.bucket.rate if self.bucket.rate else 0.0
+    
+    def _shed(self, admission: Optional[Admission], priority: str, reason: str, retry_after: float) -> bool:
+        self.shed[(priority, reason)] += 1
+        if admission is not None:
+            admission.shed = reason
+            admission.retry_after = retry_after
+        logger.warning(f"Shed a {priority} request ({reason}), retry in {retry_after:.1f}s")
+        return False
+    
+    def _admission(self, priority: Optional[str], timeout: Optional[float]):
+        """
+        Class and deadline a caller queues with, from its arguments and the current Admission
+        
+        Returns:
+            (priority, deadline, admission)
+        """
+        admission = REQUEST_ADMISSION.get()
+        if priority is None:
+            priority = admission.priority if admission is not None else PRIORITY_INTERACTIVE
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if admission is not None and admission.deadline is not None:
+            deadline = admission.deadline if deadline is None else min(deadline, admission.deadline)
+        return priority, deadline, admission
+    
+    def _admit(self, priority: str, deadline: Optional[float], admission: Optional[Admission]):
+        """
+        Queue a caller, or turn it away if its class is full or its deadline can't be met
+        
+        Returns:
+            The caller's ticket, or None if it was turned away
+        """
+        elsewhere = self._waiting_elsewhere(priority)
+        with self._cond:
+            queue = self._queues[priority]
+            ahead = sum(len(self._queues[other]) for other in PRIORITIES[:PRIORITIES.index(priority) + 1])
+            ahead += elsewhere
+            if len(queue) >= self.max_queued[priority]:
+                self._shed(admission, priority, SHED_QUEUE_FULL, self._estimated_wait(ahead))
+                return None
+            if deadline is not None and time.monotonic() + self._estimated_wait(ahead) > deadline:
+                self._shed(admission, priority, SHED_DEADLINE, self._estimated_wait(ahead))
+                return None
+            
+            ticket = object()
+            queue.append(ticket)
+        self._report_waiting()
+        return ticket
+    
+    def _is_next(self, ticket) -> bool:
+        with self._cond:
+            return self._head() is ticket
+    
+    def _draw(self, ticket, priority: str) -> float:
+        """
+        Take a token for ticket, granting it a request slot if one is available
+        
+        Called without _cond held: a shared bucket may wait on a file lock held
+        by another worker, and queueing, withdrawing and stats carry on meanwhile.
+        A caller overtaken by a higher class while drawing keeps the token it got.
+        
+        Returns:
+            0 if granted, otherwise seconds until a token is available
+        """
+        with self._bucket_lock:
+            wait = self.bucket.try_take(yield_to=PRIORITIES[:PRIORITIES.index(priority)])
+            if wait > 0:
+                return wait
+            with self._cond:
+                self._queues[priority].remove(ticket)
+                self.granted += 1
+                self._cond.notify_all()
+            self._publish_waiting()
+        return 0.0
+    
+    def _past_deadline(self, ticket, priority: str, deadline: Optional[float]) -> bool:
+        """Whether ticket can no longer be served before its deadline, given the callers ahead of it"""
+        if deadline is None:
+            return False
+        now = time.monotonic()
+        return now >= deadline or now + self._estimated_wait(self._queued_ahead(ticket, priority)) > deadline
+    
+    def _queued_ahead(self, ticket, priority: str) -> int:
+        elsewhere = self._waiting_elsewhere(priority)
+        with self._cond:
+            return self._ahead(ticket, priority, elsewhere)
+    
+    def _dequeue(self, ticket, priority: str):
+        """Withdraw ticket if it is still queued, i.e. it wasn't granted"""
+        with self._cond:
+            queue = self._queues[priority]
+            if ticket not in queue:
+                return
+            queue.remove(ticket)
+            self._cond.notify_all()
+        self._report_waiting()
+    
+    def _give_up(self, ticket, priority: str, kind: str, admission: Optional[Admission]) -> bool:
+        self.expired += 1
+        logger.warning(f"Dropped a {priority} {kind} request that could no longer be served in time")
+        retry_after = self._estimated_wait(self._queued_ahead(ticket, priority))
+        with self._cond:
+            return self._shed(admission, priority, SHED_DEADLINE, retry_after)
+    
+    def wake(self):
+        """Wake blocked callers so they re-check their cancel events"""
+        with self._cond:
+            self._cond.notify_all()
+    
+    def acquire(self, kind: str = 'id', timeout: Optional[float] = None,
+                cancel: Optional[threading.Event] = None, priority: Optional[str] = None) -> bool:
+        """
+        Block until this caller may make an upstream request
+        
+        Args:
+            kind: What the request is for ("id", "name" or "refresh"), used in logs
+            timeout: Maximum seconds to wait, or None to wait indefinitely; the
+                     current Admission's deadline also applies
+            cancel: Optional event that withdraws the request once set (followed by wake())
+            priority: Class to queue in (defaults to the current Admission's, or interactive)
+            
+        Returns:
+            True if a request slot was granted, False if it was turned away, the
+            deadline passed or it was cancelled
+        """
+        priority, deadline, admission = self._admission(priority, timeout)
+        ticket = self._admit(priority, deadline, admission)
+        if ticket is None:
+            return False
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return False
+                
+                wait = self._draw(ticket, priority) if self._is_next(ticket) else None
+                if wait == 0:
+                    return True
+                
+                if deadline is not None:
+                    if self._past_deadline(ticket, priority, deadline):
+                        return self._give_up(ticket, priority, kind, admission)
+                    remaining = deadline - time.monotonic()
+                    wait = remaining if wait is None else min(wait, remaining)
+                
+                with self._cond:
+                    # A caller that became next in line since the check above doesn't wait to be told
+                    if wait is not None or self._head() is not ticket:
+                        self._cond.wait(wait)
+        finally:
+            self._dequeue(ticket, priority)
+    
+    async def acquire_async(self, kind: str = 'id', timeout: Optional[float] = None,
+                            priority: Optional[str] = None) -> bool:
+        """
+        Async counterpart of acquire that waits on the event loop instead of a thread
+        
+        Async callers share the same queues and bucket as threaded callers; since they
+        can't wait on the condition, callers that aren't next in line poll briefly.
+        Calls into a blocking (shared) bucket run in a worker thread, so a worker
+        holding the throttle file never stalls the event loop.
+        """
+        # Only async callers need asyncio, and the threaded service never loads it
+        import asyncio
+        
+        async def call(fn, *args):
+            if self.bucket.blocking:
+                return await asyncio.to_thread(fn, *args)
+            return fn(*args)
+        
+        priority, deadline, admission = self._admission(priority, timeout)
+        ticket = await call(self._admit, priority, deadline, admission)
+        if ticket is None:
+            return False
+        try:
+            while True:
+                wait = await call(self._draw, ticket, priority) if self._is_next(ticket) else None
+                if wait == 0:
+                    return True
+                if await call(self._past_deadline, ticket, priority, deadline):
+                    return await call(self._give_up, ticket, priority, kind, admission)
+                
+                wait = self.POLL_INTERVAL if wait is None else wait
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                
+                await asyncio.sleep(wait)
+        finally:
+            await call(self._dequeue, ticket, priority)
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'queued': {priority: len(queue) for priority, queue in self._queues.items()},
+                'granted': self.granted,
+                'expired': self.expired,
+                'shed': {f'{priority}:{reason}': count for (priority, reason), count in self.shed.items()}
+            }
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution
+    
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait for it and receive the same result (or exception).
+    """
+    
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+    
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.shared += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of SingleFlight for callers on one event loop
+    
+    The first caller's coroutine runs as its own task, so any caller (leader
+    included) can be cancelled without cancelling the others; the fetch is
+    only cancelled once every caller waiting for it has gone.
+    
+    Its calls are separate from any SingleFlight's: under uscf_asgi a native
+    lookup and one made through a Flask route (batch, roster) for the same key
+    at the same moment each fetch, and only later callers find the result in
+    the shared cache.
+    """
+    
+    class _Call:
+        def __init__(self, task):
+            self.task = task
+            self.waiters = 0
+    
+    def __init__(self):
+        self._calls = {}
+        self.shared = 0
+    
+    async def do(self, key: str, coro_fn):
+        import asyncio
+        
+        call = self._calls.get(key)
+        if call is None:
+            # The task runs in a copy of the leader's context, so it sees the leader's admission
+            call = self._calls[key] = self._Call(asyncio.ensure_future(coro_fn()))
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+        else:
+            self.shared += 1
+        
+        call.waiters += 1
+        try:
+            # Shield so a cancelled caller doesn't cancel the fetch the others are waiting for
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+    
+    def _finished(self, key: str, call: '_Call'):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark an exception as retrieved in case every caller was cancelled first
+        if not call.task.cancelled():
+            call.task.exception()
+
+class CircuitBreaker:
+    """
+    Tracks the health of uschess.org so failing requests stop piling up
+    
+    healthy:  requests go out normally
+    degraded: recent failures; requests still go out but with a shorter timeout
+    open:     requests fail fast until the backoff passes, then one probe at a
+              time is let through (half-open); a successful probe closes the
+              circuit, a failed one reopens it with double the backoff
+    
+    A Cloudflare block (or 403/429) opens the circuit straight away, since
+    retrying only makes the block last longer. Backoff is exponential with
+    jitter so several workers don't probe in lockstep.
+    """
+    
+    HEALTHY = 'healthy'
+    DEGRADED = 'degraded'
+    OPEN = 'open'
+    
+    def __init__(self, failure_threshold: int = 5, base_backoff: float = 5.0,
+                 max_backoff: float = 300.0, jitter: float = 0.5):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            base_backoff: Seconds the circuit stays open the first time it opens
+            max_backoff: Upper bound on the backoff as it doubles
+            jitter: Fraction of the backoff randomly added or removed
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        
+        self.state = self.HEALTHY
+        self.failures = 0
+        self._backoff = base_backoff
+        self._open_until = 0.0
+        self._probing = False
+        
+        self.opened = 0
+        self.rejected = 0
+    
+    def _open(self, now: float):
+        if self.state == self.OPEN:
+            # A failed probe: back off further
+            self._backoff = min(self.max_backoff, self._backoff * 2)
+        else:
+            self._backoff = self.base_backoff
+            self.opened += 1
+            logger.warning(f"Upstream circuit opened after {self.failures} failures")
+        self.state = self.OPEN
+        self._probing = False
+        self._open_until = now + self._jittered(self._backoff)
+    
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+    
+    def allow(self) -> bool:
+        """Whether a request may go upstream now; while open only a periodic probe is allowed"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return True
+            now = time.monotonic()
+            if now >= self._open_until:
+                # Let one probe through per backoff window; a probe that never
+                # reports back (e.g. dropped from the queue) doesn't wedge the circuit
+                self._probing = True
+                self._open_until = now + self._jittered(self._backoff)
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                logger.info("Upstream circuit closed after a successful probe")
+            self.state = self.HEALTHY
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self, blocked: bool = False):
+        """Record a failed request; blocked marks a Cloudflare block or rate-limit response"""
+        with self._lock:
+            self.failures += 1
+            if blocked or self.state == self.OPEN or self.failures >= self.failure_threshold:
+                self._open(time.monotonic())
+            else:
+                self.state = self.DEGRADED
+    
+    def retry_after(self) -> float:
+        """Seconds until the next probe may go out (0 unless the circuit is open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': 'half_open' if self.state == self.OPEN and self._probing else self.state,
+                'consecutive_failures': self.failures,
+                'backoff_seconds': round(self._backoff, 3),
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
 class USCFLookup:
     """
     USCF Player Lookup System using the HTTP approach
     """
     
-    def __init__(self, rate_limit_seconds: float = 2.0):
+    # Maximum players returned from the local name index
+    NAME_RESULT_LIMIT = 100
+    # Upstream request timeouts in seconds, normally and once requests have started failing
+    REQUEST_TIMEOUT = 15
+    DEGRADED_TIMEOUT = 5
+    # Status codes uschess.org (Cloudflare) sends when it is blocking or throttling us
+    BLOCKED_STATUSES = (403, 429)
+    
+    def __init__(self, rate_limit_seconds: float = 2.0, cache: Optional[PlayerCache] = None,
+                 store=None, burst: int = 1, queue_timeout: Optional[float] = 30.0,
+                 parallel_name_search: bool = False, metrics=None,
+                 base_url: str = "http://www.uschess.org/datapage/player-search.php",
+                 shared_throttle_path: Optional[str] = None, breaker: Optional[CircuitBreaker] = None,
+                 response_cache: Optional[ResponseCache] = None, max_queued: Optional[Dict[str, int]] = None):
         """
         Initialize the USCF lookup system
         
         Args:
-            rate_limit_seconds: Minimum time between requests (conservative for production)
-        """
-        self.base_url = "http://www.uschess.org/datapage/player-search.php"
-        self.session = requests.Session()
-        
-        # Browser-like headers
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        })
+            rate_limit_seconds: Average time between requests (conservative for production)
+            cache: Cache for lookup results (defaults to an in-memory PlayerCache)
+            store: Optional local PlayerStore consulted before the cache and uschess.org
+            burst: Number of requests that may go out back to back after an idle period
+            queue_timeout: Maximum seconds a request waits for a slot before giving up
+            parallel_name_search: Try all name formats at once and keep the first with results;
+                                  each format still takes a rate limit slot, so this is
+                                  ignored (formats are tried in turn) unless burst is above 1
+            metrics: Optional LookupMetrics receiving per-phase timings
+            base_url: Player search page to query (override to point at a mirror or stub)
+            shared_throttle_path: SQLite file holding a rate limit shared with other worker processes
+            breaker: Circuit breaker guarding uschess.org (defaults to a CircuitBreaker with default settings)
+            response_cache: Cache of raw search pages (defaults to a ResponseCache with default settings)
+            max_queued: Bound on requests waiting for a slot per priority class (see RequestScheduler.MAX_QUEUED)
+        """
+        self.base_url = base_url
+        self.headers = dict(BROWSER_HEADERS)
+        # Created on first use (or by warm_up) so constructing a lookup doesn't import requests
+        self._session = None
+        self._session_lock = threading.Lock()
         
         self.rate_limit = rate_limit_seconds
-        self.last_request_time = 0
+        self.queue_timeout = queue_timeout
+        rate = 1.0 / rate_limit_seconds if rate_limit_seconds > 0 else None
+        if shared_throttle_path:
+            bucket = SharedTokenBucket(rate, burst, shared_throttle_path)
+        else:
+            bucket = TokenBucket(rate, burst)
+        self.scheduler = RequestScheduler(bucket, max_queued)
+        self.cache = cache if cache is not None else PlayerCache()
+        self.store = store
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.responses = response_cache if response_cache is not None else ResponseCache()
+        self.inflight = SingleFlight()
+        
+        # With a burst of 1 the formats would only queue for one slot at a time, so they are searched in turn
+        self.parallel_name_search = parallel_name_search and (rate is None or burst > 1)
+        if parallel_name_search and not self.parallel_name_search:
+            logger.warning("Parallel name search disabled: it has no effect with a rate limit burst of 1")
+        self._name_search_executor = (
+            ThreadPoolExecutor(thread_name_prefix='uscf-name-search') if self.parallel_name_search else None
+        )
+        # How often each name format produced results, used to try the best one first;
+        # updated by concurrent lookups, so guarded by its own lock
+        self.format_wins = Counter()
+        self._format_wins_lock = threading.Lock()
+        self.metrics = metrics
         
-    def _rate_limit_delay(self):
-        """Ensure we don't make requests too frequently"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit:
-            time.sleep(self.rate_limit - time_since_last)
-        self.last_request_time = time.time()
+    @property
+    def session(self):
+        """Shared requests.Session, pooling connections to uschess.org"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = _requests().Session()
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
     
-    def _make_request(self, search_term: str) -> Optional[str]:
+    def warm_up(self):
+        """
+        Do the one-off work of a first upstream lookup ahead of time
+        
+        Imports the HTTP stack and the result parser, builds the session and
+        resolves uschess.org's address. Nothing is sent upstream, so no rate
+        limit slot is used.
+        """
+        self.session
+        list(self._iter_rows('<table><tr><td>12345678</td></tr></table>'))
+        host = urlparse(self.base_url).hostname
+        if host:
+            try:
+                socket.getaddrinfo(host, None)
+            except OSError as e:
+                logger.warning(f"Could not resolve {host} during warm-up: {e}")
+    
+    def _make_request(self, search_term: str, kind: str = 'id',
+                      cancel: Optional[threading.Event] = None) -> Optional[str]:
         """
         Make a request to the USCF website
         
         Args:
             search_term: The search term (USCF ID or name)
+            kind: What the request is for ("id" or "name"); it queues in the current Admission's class
+            cancel: Optional event that abandons the request while it is still queued
             
         Returns:
-            HTML content if successful, None if failed
+            HTML content if successful, None if failed or the circuit breaker is open
         """
-        self._rate_limit_delay()
+        # A page fetched moments ago needs neither a request slot nor a request
+        cached = self._cached_response(search_term)
+        if cached is not None and self.responses.is_fresh(cached):
+            return self.responses.text(cached, fresh_hit=True)
+        
+        if not self._upstream_allowed(kind):
+            return None
         
+        started = time.perf_counter()
+        granted = self.scheduler.acquire(kind, timeout=self.queue_timeout, cancel=cancel)
+        if self.metrics is not None:
+            self.metrics.on_queue_wait(kind, time.perf_counter() - started, granted)
+        if not granted:
+            return None
+        return self._fetch(search_term, kind, cached)
+    
+    def _fetch(self, search_term: str, kind: str, cached: Optional[CachedResponse] = None) -> Optional[str]:
+        """Fetch a search page once a request slot has been granted, revalidating cached if given"""
+        requests = _requests()
+        started = time.perf_counter()
         try:
             url = f"{self.base_url}?name={search_term}"
             logger.info(f"Searching for: {search_term}")
             
-            response = self.session.get(url, timeout=15)
+            response = self.session.get(url, headers=ResponseCache.conditional_headers(cached),
+                                        timeout=self._request_timeout())
             response.raise_for_status()
             
-            return response.text
+            not_modified = response.status_code == 304 and cached is not None
+            html_content = None if not_modified else response.text
+            if self.metrics is not None:
+                self.metrics.on_upstream(kind, time.perf_counter() - started, True, len(html_content or ''))
+            if not_modified:
+                return self._reuse_response(search_term, cached, response.headers)
+            return self._store_response(search_term, html_content, response.headers)
             
         except requests.RequestException as e:
+            if self.metrics is not None:
+                self.metrics.on_upstream(kind, time.perf_counter() - started, False)
             logger.error(f"Request failed for search term {search_term}: {e}")
+            status = e.response.status_code if e.response is not None else None
+            self._record_failure(blocked=status in self.BLOCKED_STATUSES)
             return None
     
+    @staticmethod
+    def _mark_unavailable():
+        """Note on the current request that uschess.org couldn't answer one of its lookups"""
+        admission = REQUEST_ADMISSION.get()
+        if admission is not None:
+            admission.unavailable = True
+    
+    def _record_failure(self, blocked: bool = False):
+        self.breaker.record_failure(blocked=blocked)
+        self._mark_unavailable()
+    
+    def _upstream_allowed(self, kind: str) -> bool:
+        """Check the circuit breaker before queueing for an upstream request"""
+        if self.breaker.allow():
+            return True
+        if self.metrics is not None:
+            self.metrics.on_rejected(kind)
+        logger.warning(f"Upstream circuit open, not sending {kind} request")
+        self._mark_unavailable()
+        return False
+    
+    def _request_timeout(self) -> float:
+        return self.DEGRADED_TIMEOUT if self.breaker.state != CircuitBreaker.HEALTHY else self.REQUEST_TIMEOUT
+    
+    def _cached_response(self, search_term: str) -> Optional[CachedResponse]:
+        return self.responses.get(ResponseCache.key(self.base_url, search_term))
+    
+    def _store_response(self, search_term: str, html_content: str, headers) -> str:
+        """Report a page that came back from uschess.org to the circuit breaker and cache it unless blocked"""
+        if _BLOCKED_RE.search(html_content):
+            self._record_failure(blocked=True)
+        else:
+            self.breaker.record_success()
+            self.responses.store(ResponseCache.key(self.base_url, search_term), html_content, headers)
+        return html_content
+    
+    def _reuse_response(self, search_term: str, cached: CachedResponse, headers) -> str:
+        """Handle a 304 Not Modified for a cached page"""
+        self.breaker.record_success()
+        self.responses.refresh(ResponseCache.key(self.base_url, search_term), headers)
+        return self.responses.text(cached)
+    
     def _format_name(self, raw_name: str) -> str:
-        """
-        Format name from USCF format to "lastName, firstName, middleName"
-        
-        Args:
-            raw_name: Name as it appears in USCF (e.g., "MORENO, RYAN" or "SMITH, JOHN DAVID")
-            
-        Returns:
-            Formatted name as "lastName, firstName, middleName"
-        """
-        try:
-            if ',' not in raw_name:
-                return raw_name.strip()
-            
-            # Split on comma to separate last name from first/middle names
-            parts = raw_name.split(',', 1)
-            last_name = parts[0].strip()
-            remaining_names = parts[1].strip() if len(parts) > 1 else ""
-            
-            if not remaining_names:
-                return last_name
-            
-            # Split the remaining names by spaces
-            name_parts = remaining_names.split()
-            
-            if len(name_parts) == 1:
-                # Only first name
-                first_name = name_parts[0]
-                return f"{last_name}, {first_name}"
-            
-            elif len(name_parts) >= 2:
-                # First name and middle name(s)
-                first_name = name_parts[0]
-                middle_names = " ".join(name_parts[1:])
-                return f"{last_name}, {first_name}, {middle_names}"
-            
-            else:
-                return raw_name.strip()
-                
-        except Exception as e:
-            logger.warning(f"Error formatting name '{raw_name}': {e}")
-            return raw_name.strip()
+        """Format name from USCF format to "lastName, firstName, middleName"; see format_name"""
+        return format_name(raw_name)
     
     def _parse_rating(self, rating_text: str) -> Optional[int]:
         """
@@ -138,16 +1312,92 @@ class USCFLookup:
             return None
         
         # Extract the rating number (the part before the slash)
-        match = re.match(r'^(\d+)', rating_text.strip())
+        match = _RATING_RE.match(rating_text.strip())
         if match:
             return int(match.group(1))
         
         return None
     
+    def _is_no_results(self, html_content: str) -> bool:
+        """Whether the page is a definitive "no players found" response"""
+        return _NO_RESULTS_RE.search(html_content) is not None
+    
+    def _iter_rows_bs4(self, html_content: str) -> Iterator[Tuple[str, ...]]:
+        """
+        Fallback row extraction that builds a full BeautifulSoup tree
+        
+        Yields:
+            Tuples of (USCF ID, rating, quick rating, state, expiration, name) cell text
+        """
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(html_content, 'html.parser')
+        
+        for row in soup.find_all('tr'):
+            cells = row.find_all('td')
+            if len(cells) >= 10:
+                uscf_id_cell = cells[0].get_text(strip=True)
+                
+                # Validate that this looks like a USCF ID (7-8 digits)
+                if _USCF_ID_PREFIX_RE.match(uscf_id_cell):
+                    yield tuple(cells[column].get_text(strip=True) for column in _RESULT_COLUMNS)
+    
+    def _iter_rows(self, html_content: str) -> Iterator[Tuple[str, ...]]:
+        """Yield player rows with the lxml fast path, falling back to BeautifulSoup"""
+        etree = _lxml_etree()
+        if etree is not None:
+            yielded = False
+            try:
+                for row in _iter_result_rows_lxml(html_content):
+                    yielded = True
+                    yield row
+                return
+            except (etree.LxmlError, ValueError) as e:
+                if yielded:
+                    logger.error(f"Fast result parser failed part way through the page: {e}")
+                    return
+                logger.warning(f"Fast result parser failed, falling back to BeautifulSoup: {e}")
+        yield from self._iter_rows_bs4(html_content)
+    
+    def _iter_players(self, html_content: str, search_term: str) -> Iterator[USCFPlayer]:
+        """
+        Single pass over a player-search page, yielding players as their rows are parsed
+        
+        Blocked and empty pages yield nothing. Cell text comes back already
+        stripped from the row extractors.
+        
+        Args:
+            html_content: Raw HTML from USCF website
+            search_term: The original search term used
+        """
+        # Check for Cloudflare protection or other blocks
+        if _BLOCKED_RE.search(html_content):
+            logger.warning("Request blocked by Cloudflare protection")
+            if self.metrics is not None:
+                self.metrics.on_blocked()
+            return
+        
+        # Check if no players were found
+        if self._is_no_results(html_content):
+            logger.info(f"No players found for search term: {search_term}")
+            return
+        
+        for uscf_id, rating, quick_rating, state, exp_date, raw_name in self._iter_rows(html_content):
+            yield USCFPlayer(
+                uscf_id,
+                self._format_name(raw_name),
+                self._parse_rating(rating),
+                self._parse_rating(quick_rating),
+                state or None,
+                exp_date or None
+            )
+    
     def _parse_player_data(self, html_content: str, search_term: str) -> Optional[USCFPlayer]:
         """
         Parse the HTML response to extract player information
         
+        Only the first player row is parsed; the rest of the page is never read.
+        
         Args:
             html_content: Raw HTML from USCF website
             search_term: The original search term used
@@ -155,62 +1405,14 @@ class USCFLookup:
         Returns:
             USCFPlayer object if parsing successful, None otherwise
         """
+        started = time.perf_counter()
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Check for Cloudflare protection or other blocks
-            if "cloudflare" in html_content.lower() or "error 1003" in html_content.lower():
-                logger.warning("Request blocked by Cloudflare protection")
-                return None
-            
-            # Check if no players were found
-            if "Players found: 0" in html_content or "No players found" in html_content:
-                logger.info(f"No player found for search term: {search_term}")
-                return None
-            
-            # Look for the player data table
-            # Headers: USCF ID, Rating, Q Rtg, BL Rtg, OL R, OL Q, OL BL, State, Exp Date, Name
-            rows = soup.find_all('tr')
-            
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 10:
-                    
-                    # Extract data from each cell
-                    uscf_id_cell = cells[0].get_text(strip=True)
-                    rating_cell = cells[1].get_text(strip=True)
-                    quick_rating_cell = cells[2].get_text(strip=True)
-                    state_cell = cells[7].get_text(strip=True)
-                    exp_date_cell = cells[8].get_text(strip=True)
-                    name_cell = cells[9].get_text(strip=True)
-                    
-                    # Validate that this looks like a USCF ID (7-8 digits)
-                    if re.match(r'^\d{7,8}', uscf_id_cell):
-                        
-                        # Parse the ratings
-                        regular_rating = self._parse_rating(rating_cell)
-                        quick_rating = self._parse_rating(quick_rating_cell)
-                        
-                        # Clean up the data
-                        uscf_id = uscf_id_cell.strip()
-                        raw_name = name_cell.strip()
-                        formatted_name = self._format_name(raw_name)
-                        state = state_cell.strip() if state_cell.strip() else None
-                        exp_date = exp_date_cell.strip() if exp_date_cell.strip() else None
-                        
-                        logger.info(f"Successfully parsed player: {formatted_name} (ID: {uscf_id})")
-                        
-                        return USCFPlayer(
-                            uscf_id=uscf_id,
-                            name=formatted_name,
-                            rating_regular=regular_rating,
-                            rating_quick=quick_rating,
-                            state=state,
-                            expiration_date=exp_date
-                        )
-            
-            logger.warning(f"Could not find valid player data in HTML for search term: {search_term}")
-            return None
+            player = next(self._iter_players(html_content, search_term), None)
+            if self.metrics is not None:
+                self.metrics.on_parse('id', time.perf_counter() - started)
+            if player:
+                logger.info(f"Successfully parsed player: {player.name} (ID: {player.uscf_id})")
+            return player
             
         except Exception as e:
             logger.error(f"Failed to parse player data: {e}")
@@ -227,67 +1429,114 @@ class USCFLookup:
         Returns:
             List of USCFPlayer objects found
         """
+        started = time.perf_counter()
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            players = []
-            
-            # Check for Cloudflare protection or other blocks
-            if "cloudflare" in html_content.lower() or "error 1003" in html_content.lower():
-                logger.warning("Request blocked by Cloudflare protection")
-                return []
-            
-            # Check if no players were found
-            if "Players found: 0" in html_content or "No players found" in html_content:
-                logger.info(f"No players found for search term: {search_term}")
-                return []
-            
-            # Look for all table rows that contain player data
-            rows = soup.find_all('tr')
-            
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 10:
-                    
-                    uscf_id_cell = cells[0].get_text(strip=True)
-                    
-                    # Validate that this looks like a USCF ID (7-8 digits)
-                    if re.match(r'^\d{7,8}', uscf_id_cell):
-                        
-                        rating_cell = cells[1].get_text(strip=True)
-                        quick_rating_cell = cells[2].get_text(strip=True)
-                        state_cell = cells[7].get_text(strip=True)
-                        exp_date_cell = cells[8].get_text(strip=True)
-                        name_cell = cells[9].get_text(strip=True)
-                        
-                        # Parse the ratings
-                        regular_rating = self._parse_rating(rating_cell)
-                        quick_rating = self._parse_rating(quick_rating_cell)
-                        
-                        # Clean up the data
-                        uscf_id = uscf_id_cell.strip()
-                        raw_name = name_cell.strip()
-                        formatted_name = self._format_name(raw_name)
-                        state = state_cell.strip() if state_cell.strip() else None
-                        exp_date = exp_date_cell.strip() if exp_date_cell.strip() else None
-                        
-                        player = USCFPlayer(
-                            uscf_id=uscf_id,
-                            name=formatted_name,
-                            rating_regular=regular_rating,
-                            rating_quick=quick_rating,
-                            state=state,
-                            expiration_date=exp_date
-                        )
-                        
-                        players.append(player)
-                        logger.info(f"Found player: {formatted_name} (ID: {uscf_id})")
-            
+            players = list(self._iter_players(html_content, search_term))
+            if self.metrics is not None:
+                self.metrics.on_parse('name', time.perf_counter() - started)
+            logger.info(f"Found {len(players)} players for search term: {search_term}")
             return players
             
         except Exception as e:
             logger.error(f"Failed to parse multiple players: {e}")
             return []
     
+    def _normalize_id(self, uscf_id: str) -> Optional[str]:
+        """Strip and validate a USCF ID (typically 7-8 digits), returning None if invalid"""
+        uscf_id = str(uscf_id).strip()
+        if not _USCF_ID_RE.match(uscf_id):
+            logger.warning(f"Invalid USCF ID format: {uscf_id}")
+            return None
+        return uscf_id
+    
+    # Name formats that USCF might accept when both names are given
+    NAME_FORMATS = (
+        ('last_comma_first', "{last}, {first}"),
+        ('first_last', "{first} {last}"),
+        ('last_first', "{last} {first}"),
+    )
+    
+    def _search_formats(self, first_name: Optional[str], last_name: Optional[str]) -> List[Tuple[str, str]]:
+        """
+        Name searches to try, with the format that has succeeded most often first
+        
+        Returns:
+            List of (format key, search term) tuples
+        """
+        if last_name and first_name:
+            with self._format_wins_lock:
+                wins = dict(self.format_wins)
+            formats = sorted(self.NAME_FORMATS, key=lambda fmt: -wins.get(fmt[0], 0))
+            return [(key, template.format(first=first_name, last=last_name)) for key, template in formats]
+        elif last_name:
+            return [('last', last_name)]
+        elif first_name:
+            return [('first', first_name)]
+        return []
+    
+    def _resolve_id_locally(self, uscf_id: str) -> Tuple[bool, Optional[USCFPlayer]]:
+        """
+        Try to answer an ID lookup from the local store or the cache
+        
+        Returns:
+            (answered, player) - answered is False when uschess.org must be asked
+        """
+        local_player = self.store.get(uscf_id) if self.store is not None else None
+        if local_player and self.store.is_fresh(local_player):
+            self._count_lookup('id', 'local')
+            return True, local_player
+        
+        cached = self.cache.get(PlayerCache.id_key(uscf_id))
+        if cached is not None:
+            self._count_lookup('id', 'cache')
+            return True, cached[0] if cached else local_player
+        return False, None
+    
+    def _finish_id_lookup(self, uscf_id: str, html_content: Optional[str]) -> Optional[USCFPlayer]:
+        """Parse and cache an upstream ID response, falling back to stale cached or local records"""
+        self._count_lookup('id', 'upstream')
+        if html_content:
+            player = self._parse_player_data(html_content, uscf_id)
+            if player:
+                self.cache.set(PlayerCache.id_key(uscf_id), [player])
+                return player
+            if self._is_no_results(html_content):
+                self.cache.set(PlayerCache.id_key(uscf_id), [])
+                return self.store.get(uscf_id) if self.store is not None else None
+        
+        # uschess.org failed or the circuit is open: serve the last known answer
+        stale = self.cache.get(PlayerCache.id_key(uscf_id), allow_stale=True)
+        if stale:
+            return stale[0]
+        return self.store.get(uscf_id) if self.store is not None else None
+    
+    def _resolve_name_locally(self, first_name: Optional[str], last_name: Optional[str]) -> Optional[List[USCFPlayer]]:
+        """
+        Try to answer a name lookup from the local store or the cache
+        
+        Returns:
+            List of players (possibly empty) if answered, None when uschess.org must be asked
+        """
+        # Fresh exact and prefix matches answer the lookup; fuzzy-only and expired
+        # matches are left as a fallback in case uschess.org has nothing better
+        strong = [player for score, player in self._local_name_matches(first_name, last_name)
+                  if score >= self.store.STRONG_MATCH and self.store.is_fresh(player)]
+        if strong:
+            self._count_lookup('name', 'local')
+            return strong
+        
+        cached = self.cache.get(PlayerCache.name_key(first_name, last_name))
+        if cached is not None:
+            self._count_lookup('name', 'cache')
+        return cached
+    
+    def _count_lookup(self, kind: str, source: str):
+        if self.metrics is not None:
+            self.metrics.on_lookup(kind, source)
+    
+    def _local_name_matches(self, first_name: Optional[str], last_name: Optional[str]) -> List[Tuple[float, USCFPlayer]]:
+        return self.store.search(first_name, last_name, self.NAME_RESULT_LIMIT) if self.store is not None else []
+    
     def lookup_by_id(self, uscf_id: str) -> Optional[USCFPlayer]:
         """
         Look up a player by their USCF ID
@@ -298,16 +1547,84 @@ class USCFLookup:
         Returns:
             USCFPlayer object if found, None if not found or error
         """
-        # Validate USCF ID format (typically 7-8 digits)
-        uscf_id = str(uscf_id).strip()
-        if not re.match(r'^\d{7,8}$', uscf_id):
-            logger.warning(f"Invalid USCF ID format: {uscf_id}")
+        uscf_id = self._normalize_id(uscf_id)
+        if not uscf_id:
             return None
         
-        html_content = self._make_request(uscf_id)
-        if html_content:
-            return self._parse_player_data(html_content, uscf_id)
-        return None
+        answered, player = self._resolve_id_locally(uscf_id)
+        if answered:
+            return player
+        
+        def fetch():
+            player = self._finish_id_lookup(uscf_id, self._make_request(uscf_id))
+            return player, self._unanswered(REQUEST_ADMISSION.get())
+        
+        # Concurrent lookups of the same ID share one fetch and parse
+        player, unanswered = self.inflight.do(PlayerCache.id_key(uscf_id), fetch)
+        return self._share_unanswered(player, unanswered)
+    
+    @staticmethod
+    def _unanswered(admission: Optional[Admission]) -> Optional[Tuple[Optional[str], float, bool]]:
+        """(shed reason, retry_after, unavailable) of a request whose lookups were shed or unanswered"""
+        if admission is None or (admission.shed is None and not admission.unavailable):
+            return None
+        return admission.shed, admission.retry_after, admission.unavailable
+    
+    @staticmethod
+    def _share_unanswered(result, unanswered: Optional[Tuple[Optional[str], float, bool]]):
+        """
+        Mark the current request shed or unavailable too when an empty lookup
+        it shared with another request was, and return the shared result
+        """
+        admission = REQUEST_ADMISSION.get()
+        if not result and unanswered is not None and admission is not None:
+            shed, retry_after, unavailable = unanswered
+            if shed is not None and admission.shed is None:
+                admission.shed, admission.retry_after = shed, retry_after
+            admission.unavailable = admission.unavailable or unavailable
+        return result
+    
+    def refresh_by_id(self, uscf_id: str, timeout: Optional[float] = None) -> Tuple[bool, Optional[USCFPlayer]]:
+        """
+        Re-fetch a player from uschess.org, bypassing the local store and the cache
+        
+        Used by background refresh; the request queues in the background class so
+        interactive and roster lookups always go first. A found player replaces the cached
+        and local records.
+        
+        Args:
+            uscf_id: The USCF ID number as a string
+            timeout: Maximum seconds to wait for a request slot (defaults to queue_timeout)
+            
+        Returns:
+            (fetched, player) - fetched is False when uschess.org gave no usable answer
+        """
+        uscf_id = self._normalize_id(uscf_id)
+        if not uscf_id or not self._upstream_allowed('refresh'):
+            return False, None
+        
+        started = time.perf_counter()
+        granted = self.scheduler.acquire('refresh', timeout=self.queue_timeout if timeout is None else timeout,
+                                         priority=PRIORITY_BACKGROUND)
+        if self.metrics is not None:
+            self.metrics.on_queue_wait('refresh', time.perf_counter() - started, granted)
+        if not granted:
+            return False, None
+        
+        html_content = self._fetch(uscf_id, 'refresh', self._cached_response(uscf_id))
+        if not html_content:
+            return False, None
+        
+        player = self._parse_player_data(html_content, uscf_id)
+        if player:
+            self.cache.set(PlayerCache.id_key(uscf_id), [player])
+            if self.store is not None:
+                self.store.add(player)
+            return True, player
+        if self._is_no_results(html_content):
+            self.cache.set(PlayerCache.id_key(uscf_id), [])
+            return True, None
+        return False, None
     
     def lookup_by_name(self, first_name: str, last_name: str) -> List[USCFPlayer]:
         """
@@ -320,27 +1637,229 @@ class USCFLookup:
         Returns:
             List of USCFPlayer objects found
         """
-        # Try different name formats that USCF might accept
-        search_formats = []
+        players = self._resolve_name_locally(first_name, last_name)
+        if players is not None:
+            return players
+        
+        def fetch():
+            players = self._fetch_by_name(first_name, last_name)
+            return players, self._unanswered(REQUEST_ADMISSION.get())
+        
+        # Concurrent searches for the same name share one set of fetches
+        players, unanswered = self.inflight.do(PlayerCache.name_key(first_name, last_name), fetch)
+        return self._share_unanswered(players, unanswered)
+    
+    def iter_by_name(self, first_name: Optional[str], last_name: Optional[str]) -> Iterator[USCFPlayer]:
+        """
+        Look up players by name, yielding each player as soon as its row is parsed
         
-        if last_name and first_name:
-            search_formats.extend([
-                f"{last_name}, {first_name}",
-                f"{first_name} {last_name}",
-                f"{last_name} {first_name}"
-            ])
-        elif last_name:
-            search_formats.append(last_name)
-        elif first_name:
-            search_formats.append(first_name)
+        Local and cached answers are yielded straight away. Upstream name formats
+        are tried in turn and the first one that finds players is streamed as it
+        parses; the complete result is cached just as lookup_by_name would.
+        Streaming callers don't share fetches with concurrent lookups of the
+        same name, since those would only see the result once it was complete.
+        
+        Args:
+            first_name: Player's first name
+            last_name: Player's last name
+            
+        Yields:
+            USCFPlayer objects in page order
+        """
+        players = self._resolve_name_locally(first_name, last_name)
+        if players is not None:
+            yield from players
+            return
         
-        for search_term in search_formats:
+        search_formats = self._search_formats(first_name, last_name)
+        all_empty = bool(search_formats)
+        for format_key, search_term in search_formats:
             logger.info(f"Trying name format: {search_term}")
-            html_content = self._make_request(search_term)
+            html_content = self._make_request(search_term, kind='name')
+            if not html_content:
+                all_empty = False
+                continue
             
-            if html_content:
-                players = self._parse_multiple_players(html_content, search_term)
-                if players:
-                    return players
+            players = []
+            for player in self._iter_players(html_content, search_term):
+                players.append(player)
+                yield player
+            if players:
+                self._finish_name_lookup(first_name, last_name, format_key, players, False)
+                return
+            all_empty = all_empty and self._is_no_results(html_content)
         
-        return []
+        yield from self._finish_name_lookup(first_name, last_name, None, [], all_empty)
+    
+    def _fetch_by_name(self, first_name: Optional[str], last_name: Optional[str]) -> List[USCFPlayer]:
+        """Search uschess.org for the name and cache the outcome"""
+        search_formats = self._search_formats(first_name, last_name)
+        
+        if self.parallel_name_search and len(search_formats) > 1:
+            format_key, players, all_empty = self._search_formats_parallel(search_formats)
+        else:
+            format_key, players, all_empty = self._search_formats_in_turn(search_formats)
+        
+        return self._finish_name_lookup(first_name, last_name, format_key, players, all_empty)
+    
+    def _finish_name_lookup(self, first_name: Optional[str], last_name: Optional[str],
+                            format_key: Optional[str], players: List[USCFPlayer],
+                            all_empty: bool) -> List[USCFPlayer]:
+        """Record which format worked and cache the outcome of a name search"""
+        self._count_lookup('name', 'upstream')
+        cache_key = PlayerCache.name_key(first_name, last_name)
+        if players:
+            with self._format_wins_lock:
+                self.format_wins[format_key] += 1
+            self.cache.set(cache_key, players)
+            return players
+        
+        # Only cache a negative result when every format got a definitive "no players" page
+        if all_empty:
+            self.cache.set(cache_key, [])
+        else:
+            stale = self.cache.get(cache_key, allow_stale=True)
+            if stale:
+                return stale
+        return [player for _, player in self._local_name_matches(first_name, last_name)]
+    
+    def _search_name_format(self, search_term: str,
+                            cancel: Optional[threading.Event] = None) -> Tuple[List[USCFPlayer], bool]:
+        """
+        Run one name search
+        
+        Returns:
+            (players, definitive_empty) - definitive_empty is True for a "no players found" page
+        """
+        logger.info(f"Trying name format: {search_term}")
+        html_content = self._make_request(search_term, kind='name', cancel=cancel)
+        if not html_content:
+            return [], False
+        
+        players = self._parse_multiple_players(html_content, search_term)
+        return players, not players and self._is_no_results(html_content)
+    
+    def _search_formats_in_turn(self, search_formats: List[Tuple[str, str]]):
+        all_empty = bool(search_formats)
+        for format_key, search_term in search_formats:
+            players, empty = self._search_name_format(search_term)
+            if players:
+                return format_key, players, False
+            all_empty = all_empty and empty
+        return None, [], all_empty
+    
+    def _search_formats_parallel(self, search_formats: List[Tuple[str, str]]):
+        """
+        Fire every name format at once and keep the first one that finds players
+        
+        All searches still queue for scheduler slots, so the rate budget holds;
+        searches that haven't gone out yet are withdrawn once one succeeds.
+        """
+        cancel = threading.Event()
+        pending = {
+            # Run in a copy of this context so each search queues with the request's priority and deadline
+            self._name_search_executor.submit(
+                copy_context().run, self._search_name_format, search_term, cancel
+            ): format_key
+            for format_key, search_term in search_formats
+        }
+        all_empty = True
+        try:
+            while pending:
+                done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    format_key = pending.pop(future)
+                    players, empty = future.result()
+                    if players:
+                        return format_key, players, False
+                    all_empty = all_empty and empty
+            return None, [], all_empty
+        finally:
+            if pending:
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+                self.scheduler.wake()
+    
+    def lookup_many(self, uscf_ids: Iterable[str]) -> Iterator[Tuple[str, Optional[USCFPlayer]]]:
+        """
+        Look up a batch of players by USCF ID, yielding each result as it resolves
+        
+        Duplicate IDs are only looked up once, and every lookup goes through
+        lookup_by_id so the cache, shared session and rate limiting still apply.
+        
+        Args:
+            uscf_ids: Iterable of USCF ID strings (e.g., a full roster)
+            
+        Yields:
+            (uscf_id, USCFPlayer or None) tuples in first-seen order
+        """
+        seen = set()
+        for raw_id in uscf_ids:
+            uscf_id = str(raw_id).strip()
+            if not uscf_id or uscf_id in seen:
+                continue
+            seen.add(uscf_id)
+            yield uscf_id, self.lookup_by_id(uscf_id)
+    
+    def lookup_ids(self, uscf_ids: Iterable[str], fetch: bool = True,
+                   unchecked: Optional[Set[str]] = None) -> Dict[str, Optional[USCFPlayer]]:
+        """
+        Resolve a set of USCF IDs, answering as many as possible locally before going upstream
+        
+        Every ID is first joined against the local store and the cache in one
+        pass; only the IDs neither can answer are then looked up on uschess.org,
+        one at a time through the usual rate limiting.
+        
+        Args:
+            uscf_ids: Iterable of USCF ID strings; invalid and duplicate IDs are skipped
+            fetch: Whether to ask uschess.org about IDs not answered locally; if
+                   False they get the local record, however old, or None
+            unchecked: Optional set that receives the IDs left without a player
+                       because uschess.org wasn't asked (fetch is False, the
+                       lookup was shed or the circuit was open) or didn't answer,
+                       so None for them doesn't mean there is no such member
+            
+        Returns:
+            Dict of normalized USCF ID -> USCFPlayer or None if not found
+        """
+        results: Dict[str, Optional[USCFPlayer]] = {}
+        unresolved: List[str] = []
+        for raw_id in uscf_ids:
+            uscf_id = self._normalize_id(raw_id)
+            if not uscf_id or uscf_id in results:
+                continue
+            answered, player = self._resolve_id_locally(uscf_id)
+            results[uscf_id] = player
+            if not answered:
+                unresolved.append(uscf_id)
+        
+        if not fetch:
+            for uscf_id in unresolved:
+                results[uscf_id] = self.store.get(uscf_id) if self.store is not None else None
+                if results[uscf_id] is None and unchecked is not None:
+                    unchecked.add(uscf_id)
+            return results
+        
+        # Each ID's own lookup says whether it was checked, so track them on an Admission
+        admission = REQUEST_ADMISSION.get()
+        token = REQUEST_ADMISSION.set(Admission()) if admission is None and unchecked is not None else None
+        admission = REQUEST_ADMISSION.get()
+        try:
+            for uscf_id in unresolved:
+                if admission is None:
+                    results[uscf_id] = self.lookup_by_id(uscf_id)
+                    continue
+                earlier = (admission.shed, admission.retry_after, admission.unavailable)
+                admission.shed, admission.unavailable = None, False
+                results[uscf_id] = self.lookup_by_id(uscf_id)
+                if results[uscf_id] is None and unchecked is not None and (admission.shed or admission.unavailable):
+                    unchecked.add(uscf_id)
+                # The request as a whole stays marked by any of its lookups
+                if admission.shed is None:
+                    admission.shed, admission.retry_after = earlier[0], earlier[1]
+                admission.unavailable = admission.unavailable or earlier[2]
+        finally:
+            if token is not None:
+                REQUEST_ADMISSION.reset(token)
+        return results
@@ -0,0 +1,261 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional, List, Tuple
+import logging
+
+from uscf_lookup import USCFLookup, USCFPlayer, PlayerCache, AsyncSingleFlight, REQUEST_ADMISSION
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+def _aiohttp():
+    """Import aiohttp on first use; it takes longer to import than the rest of the service"""
+    import aiohttp
+    return aiohttp
+
+class AsyncUSCFLookup:
+    """
+    Asyncio variant of USCFLookup
+    
+    Wraps a USCFLookup and shares its local store, cache, request scheduler and
+    parsers, but fetches pages through a pooled aiohttp session so waiting
+    lookups don't each hold a thread. Concurrent lookups are collapsed on the
+    event loop only; see AsyncSingleFlight. When the cache is backed by SQLite,
+    the shared local and cache steps run in worker threads so a slow write
+    never stalls the event loop.
+    """
+    
+    def __init__(self, lookup: USCFLookup, connection_limit: int = 20, request_timeout: float = 15):
+        """
+        Initialize the async lookup client
+        
+        Args:
+            lookup: Synchronous lookup whose store, cache and scheduler are shared
+            connection_limit: Maximum number of pooled connections to uschess.org
+            request_timeout: Total timeout in seconds for a single upstream request
+        """
+        self.lookup = lookup
+        self.connection_limit = connection_limit
+        self.request_timeout = request_timeout
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self.inflight = AsyncSingleFlight()
+    
+    def warm_up(self):
+        """Import the HTTP client ahead of the first upstream lookup; safe to call from any thread"""
+        _aiohttp()
+        self.lookup.warm_up()
+    
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        aiohttp = _aiohttp()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=dict(self.lookup.headers),
+                connector=aiohttp.TCPConnector(limit=self.connection_limit, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+    
+    async def _off_loop(self, fn, *args):
+        """Run a USCFLookup step that may wait on the SQLite cache in a thread, or inline if it can't"""
+        if self.lookup.cache.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+    
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def _make_request(self, search_term: str, kind: str = 'id') -> Optional[str]:
+        """
+        Make a request to the USCF website
+        
+        Args:
+            search_term: The search term (USCF ID or name)
+            kind: Scheduler queue for the request ("id" or "name")
+            
+        Returns:
+            HTML content if successful, None if failed or the circuit breaker is open
+        """
+        responses = self.lookup.responses
+        cached = self.lookup._cached_response(search_term)
+        if cached is not None and responses.is_fresh(cached):
+            return responses.text(cached, fresh_hit=True)
+        
+        if not self.lookup._upstream_allowed(kind):
+            return None
+        
+        metrics = self.lookup.metrics
+        started = time.perf_counter()
+        granted = await self.lookup.scheduler.acquire_async(kind, timeout=self.lookup.queue_timeout)
+        if metrics is not None:
+            metrics.on_queue_wait(kind, time.perf_counter() - started, granted)
+        if not granted:
+            return None
+        
+        aiohttp = _aiohttp()
+        started = time.perf_counter()
+        try:
+            logger.info(f"Searching for: {search_term}")
+            timeout = aiohttp.ClientTimeout(total=min(self.request_timeout, self.lookup._request_timeout()))
+            async with self._get_session().get(self.lookup.base_url, params={'name': search_term},
+                                               headers=responses.conditional_headers(cached),
+                                               timeout=timeout) as response:
+                response.raise_for_status()
+                not_modified = response.status == 304 and cached is not None
+                html_content = None if not_modified else await response.text()
+            if metrics is not None:
+                metrics.on_upstream(kind, time.perf_counter() - started, True, len(html_content or ''))
+            if not_modified:
+                return self.lookup._reuse_response(search_term, cached, response.headers)
+            return self.lookup._store_response(search_term, html_content, response.headers)
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if metrics is not None:
+                metrics.on_upstream(kind, time.perf_counter() - started, False)
+            logger.error(f"Request failed for search term {search_term}: {e}")
+            status = getattr(e, 'status', None)
+            self.lookup._record_failure(blocked=status in self.lookup.BLOCKED_STATUSES)
+            return None
+    
+    async def lookup_by_id(self, uscf_id: str) -> Optional[USCFPlayer]:
+        """
+        Look up a player by their USCF ID
+        
+        Args:
+            uscf_id: The USCF ID number as a string
+            
+        Returns:
+            USCFPlayer object if found, None if not found or error
+        """
+        uscf_id = self.lookup._normalize_id(uscf_id)
+        if not uscf_id:
+            return None
+        
+        answered, player = await self._off_loop(self.lookup._resolve_id_locally, uscf_id)
+        if answered:
+            return player
+        
+        async def fetch():
+            player = await self._off_loop(self.lookup._finish_id_lookup, uscf_id, await self._make_request(uscf_id))
+            return player, self.lookup._unanswered(REQUEST_ADMISSION.get())
+        
+        # Concurrent lookups of the same ID share one fetch and parse
+        player, unanswered = await self.inflight.do(PlayerCache.id_key(uscf_id), fetch)
+        return self.lookup._share_unanswered(player, unanswered)
+    
+    async def lookup_by_name(self, first_name: str, last_name: str) -> List[USCFPlayer]:
+        """
+        Look up players by name (may return multiple results)
+        
+        Args:
+            first_name: Player's first name
+            last_name: Player's last name
+            
+        Returns:
+            List of USCFPlayer objects found
+        """
+        players = await self._off_loop(self.lookup._resolve_name_locally, first_name, last_name)
+        if players is not None:
+            return players
+        
+        async def fetch():
+            players = await self._fetch_by_name(first_name, last_name)
+            return players, self.lookup._unanswered(REQUEST_ADMISSION.get())
+        
+        # Concurrent searches for the same name share one set of fetches
+        players, unanswered = await self.inflight.do(PlayerCache.name_key(first_name, last_name), fetch)
+        return self.lookup._share_unanswered(players, unanswered)
+    
+    async def iter_by_name(self, first_name: Optional[str], last_name: Optional[str]) -> AsyncIterator[USCFPlayer]:
+        """
+        Look up players by name, yielding each player as soon as its row is parsed
+        
+        See USCFLookup.iter_by_name; name formats are tried in turn and the
+        complete result is cached once a format finds players.
+        """
+        players = await self._off_loop(self.lookup._resolve_name_locally, first_name, last_name)
+        if players is not None:
+            for player in players:
+                yield player
+            return
+        
+        search_formats = self.lookup._search_formats(first_name, last_name)
+        all_empty = bool(search_formats)
+        for format_key, search_term in search_formats:
+            logger.info(f"Trying name format: {search_term}")
+            html_content = await self._make_request(search_term, kind='name')
+            if not html_content:
+                all_empty = False
+                continue
+            
+            players = []
+            for player in self.lookup._iter_players(html_content, search_term):
+                players.append(player)
+                yield player
+            if players:
+                await self._off_loop(self.lookup._finish_name_lookup, first_name, last_name, format_key, players, False)
+                return
+            all_empty = all_empty and self.lookup._is_no_results(html_content)
+        
+        for player in await self._off_loop(self.lookup._finish_name_lookup, first_name, last_name, None, [], all_empty):
+            yield player
+    
+    async def _fetch_by_name(self, first_name: Optional[str], last_name: Optional[str]) -> List[USCFPlayer]:
+        """Search uschess.org for the name and cache the outcome"""
+        search_formats = self.lookup._search_formats(first_name, last_name)
+        
+        if self.lookup.parallel_name_search and len(search_formats) > 1:
+            format_key, players, all_empty = await self._search_formats_parallel(search_formats)
+        else:
+            format_key, players, all_empty = await self._search_formats_in_turn(search_formats)
+        
+        return await self._off_loop(self.lookup._finish_name_lookup,
+                                    first_name, last_name, format_key, players, all_empty)
+    
+    async def _search_name_format(self, search_term: str) -> Tuple[List[USCFPlayer], bool]:
+        """
+        Run one name search
+        
+        Returns:
+            (players, definitive_empty) - definitive_empty is True for a "no players found" page
+        """
+        logger.info(f"Trying name format: {search_term}")
+        html_content = await self._make_request(search_term, kind='name')
+        if not html_content:
+            return [], False
+        
+        players = self.lookup._parse_multiple_players(html_content, search_term)
+        return players, not players and self.lookup._is_no_results(html_content)
+    
+    async def _search_formats_in_turn(self, search_formats: List[Tuple[str, str]]):
+        all_empty = bool(search_formats)
+        for format_key, search_term in search_formats:
+            players, empty = await self._search_name_format(search_term)
+            if players:
+                return format_key, players, False
+            all_empty = all_empty and empty
+        return None, [], all_empty
+    
+    async def _search_formats_parallel(self, search_formats: List[Tuple[str, str]]):
+        """Fire every name format at once, keep the first that finds players and cancel the rest"""
+        pending = {
+            asyncio.ensure_future(self._search_name_format(search_term)): format_key
+            for format_key, search_term in search_formats
+        }
+        all_empty = True
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    format_key = pending.pop(task)
+                    players, empty = task.result()
+                    if players:
+                        return format_key, players, False
+                    all_empty = all_empty and empty
+            return None, [], all_empty
+        finally:
+            for task in pending:
+                task.cancel()
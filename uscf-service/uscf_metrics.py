@@ -0,0 +1,207 @@
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache work up to the upstream timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labels: str, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+    
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels"""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+    
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    
+    def __init__(self, name: str, help_text: str, callback, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+    
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+    
+    def gauge(self, name: str, help_text: str, callback, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, callback, labelnames))
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+class RequestTrace:
+    """
+    Time one service request spent in each lookup phase
+    
+    Filled in by LookupMetrics while REQUEST_TRACE holds it, including from the
+    threads of a parallel name search, hence the lock.
+    """
+    
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.upstream_requests = 0
+        self.html_chars = 0
+        self._lock = threading.Lock()
+    
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+    
+    def add_upstream(self, html_chars: int):
+        with self._lock:
+            self.upstream_requests += 1
+            self.html_chars += html_chars
+    
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'phases_ms': {phase: round(seconds * 1000, 2) for phase, seconds in self.phases.items()},
+                'upstream_requests': self.upstream_requests,
+                'upstream_html_chars': self.html_chars,
+            }
+
+# Trace of the request being handled in this thread or task, if it is being traced
+REQUEST_TRACE: ContextVar[Optional[RequestTrace]] = ContextVar('uscf_request_trace', default=None)
+
+class LookupMetrics:
+    """
+    Hooks called by USCFLookup at each phase of a lookup
+    
+    USCFLookup only calls these when a LookupMetrics is attached, so an
+    uninstrumented lookup pays nothing beyond an attribute check.
+    """
+    
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.queue_wait = self.registry.histogram(
+            'uscf_queue_wait_seconds', 'Time spent waiting for an upstream request slot', ('kind', 'outcome'))
+        self.upstream_latency = self.registry.histogram(
+            'uscf_upstream_request_seconds', 'Latency of requests to uschess.org', ('kind', 'outcome'))
+        self.parse_time = self.registry.histogram(
+            'uscf_parse_seconds', 'Time spent parsing player-search pages', ('kind',))
+        self.blocked = self.registry.counter(
+            'uscf_blocked_responses_total', 'Responses blocked by Cloudflare protection')
+        self.lookups = self.registry.counter(
+            'uscf_lookups_total', 'Lookups by where they were answered from', ('kind', 'source'))
+        self.rejected = self.registry.counter(
+            'uscf_circuit_rejections_total', 'Upstream requests refused while the circuit breaker was open',
+            ('kind',))
+    
+    def on_queue_wait(self, kind: str, seconds: float, granted: bool):
+        self.queue_wait.observe(seconds, kind, 'granted' if granted else 'dropped')
+        trace = REQUEST_TRACE.get()
+        if trace is not None:
+            trace.add('queue_wait', seconds)
+    
+    def on_upstream(self, kind: str, seconds: float, ok: bool, html_chars: int = 0):
+        self.upstream_latency.observe(seconds, kind, 'ok' if ok else 'error')
+        trace = REQUEST_TRACE.get()
+        if trace is not None:
+            trace.add('upstream', seconds)
+            trace.add_upstream(html_chars)
+    
+    def on_parse(self, kind: str, seconds: float):
+        self.parse_time.observe(seconds, kind)
+        trace = REQUEST_TRACE.get()
+        if trace is not None:
+            trace.add('parse', seconds)
+    
+    def on_blocked(self):
+        self.blocked.inc()
+    
+    def on_lookup(self, kind: str, source: str):
+        self.lookups.inc(kind, source)
+    
+    def on_rejected(self, kind: str):
+        self.rejected.inc(kind)
@@ -0,0 +1,154 @@
+"""
+On-demand diagnostics for a running service
+
+SamplingProfiler samples every thread's Python stack at a fixed interval for a
+few seconds and aggregates the samples as folded stacks - one
+"thread;outer;...;inner count" line per distinct stack - which flamegraph.pl,
+speedscope and inferno read directly. Sampling is wall-clock, so a thread
+waiting on uschess.org shows up in the socket read it is blocked in, next to
+the time spent parsing.
+
+SlowRequestLog keeps the slowest recent requests with the per-phase timings
+LookupMetrics recorded in their RequestTrace.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from uscf_metrics import RequestTrace
+
+# Frames from files under here are the service's own; stacks without any are idle threads
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_THREAD_NUMBER_RE = re.compile(r'[-_\d]+$')
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread in this process for a fixed period
+    
+    Only one profile runs at a time. Under gunicorn each worker is a separate
+    process, so a profile covers the worker that received the request.
+    """
+    
+    # Upper bound on a single profile, so a typo can't tie up a worker thread for hours
+    MAX_SECONDS = 60
+    MIN_INTERVAL = 0.001
+    
+    def __init__(self, service_dir: str = SERVICE_DIR):
+        self.service_dir = service_dir
+        self._lock = threading.Lock()
+        self._labels = {}
+    
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+    
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+    
+    def _stack(self, frame, all_threads: bool) -> Optional[List[str]]:
+        """Frame labels from outermost to innermost, or None for a thread outside the service"""
+        labels = []
+        own_code = all_threads
+        while frame is not None:
+            code = frame.f_code
+            labels.append(self._label(code))
+            own_code = own_code or code.co_filename.startswith(self.service_dir)
+            frame = frame.f_back
+        if not own_code:
+            return None
+        labels.reverse()
+        return labels
+    
+    def profile(self, seconds: float, interval: float = 0.005, all_threads: bool = False) -> Counter:
+        """
+        Sample every other thread's stack until seconds have passed
+        
+        Args:
+            seconds: How long to sample, capped at MAX_SECONDS
+            interval: Seconds between samples
+            all_threads: Include threads that never enter service code (idle workers, gunicorn's loop)
+            
+        Returns:
+            Counter of folded stack -> samples
+            
+        Raises:
+            RuntimeError: If another profile is already running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            seconds = min(max(0.0, seconds), self.MAX_SECONDS)
+            interval = max(self.MIN_INTERVAL, interval)
+            me = threading.get_ident()
+            samples = Counter()
+            names: Dict[int, str] = {}
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = self._stack(frame, all_threads)
+                    if stack is None:
+                        continue
+                    name = names.get(ident)
+                    if name is None:
+                        names.update((thread.ident, _THREAD_NUMBER_RE.sub('', thread.name) or 'thread')
+                                     for thread in threading.enumerate())
+                        name = names.get(ident, 'thread')
+                    samples[';'.join([name, *stack])] += 1
+                time.sleep(interval)
+            return samples
+        finally:
+            self._labels.clear()
+            self._lock.release()
+
+def folded(samples: Counter) -> str:
+    """Render profile samples as folded stacks, most frequent first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+class SlowRequestLog:
+    """
+    The slowest recent requests, in bounded memory
+    
+    Requests slower than the threshold go into a ring buffer of at most
+    capacity entries, so the oldest slow request is dropped once it is full.
+    Disabled (and free) when capacity is 0.
+    """
+    
+    def __init__(self, capacity: int = 0, threshold_seconds: float = 0.5):
+        self.capacity = max(0, capacity)
+        self.threshold = threshold_seconds
+        self._entries = deque(maxlen=self.capacity)
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+    
+    def record(self, route: str, status: int, seconds: float, trace: Optional[RequestTrace] = None):
+        if not self.enabled or seconds < self.threshold:
+            return
+        entry = {
+            'at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'route': route,
+            'status': status,
+            'ms': round(seconds * 1000, 1),
+        }
+        if trace is not None:
+            entry.update(trace.to_dict())
+        with self._lock:
+            self._entries.append(entry)
+    
+    def entries(self) -> List[dict]:
+        """Recorded requests, slowest first"""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda entry: entry['ms'], reverse=True)
@@ -1,17 +1,495 @@
-from flask import Flask, request, jsonify
+import time
+
+# Startup is timed from here, before the heavier imports below; see /ready
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from uscf_lookup import USCFLookup
+from werkzeug.datastructures import MIMEAccept
+from uscf_lookup import (
+    USCFLookup, PlayerCache, CircuitBreaker, ResponseCache, RequestScheduler, Admission, REQUEST_ADMISSION,
+    PRIORITIES, PRIORITY_INTERACTIVE, PRIORITY_ROSTER, PRIORITY_BACKGROUND, SHED_QUEUE_FULL, SHED_DEADLINE
+)
+from uscf_metrics import LookupMetrics, RequestTrace, REQUEST_TRACE
+from uscf_profiler import SamplingProfiler, SlowRequestLog, folded
+from player_store import PlayerStore, DEFAULT_PLAYER_DATA, filter_players, normalize_name_tokens, player_to_row, split_name
+from player_export import export_players, LAST_NAME_FIELD, FIRST_NAME_FIELD
+from player_refresh import RefreshJob
+from roster_verify import parse_roster_csv, parse_roster_json, verify_roster, FLAGS
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple
+import hashlib
+import hmac
+import itertools
+import json
 import logging
+import math
 import os
+import re
+import tempfile
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
 
 app = Flask(__name__)
 CORS(app)
-uscf_lookup = USCFLookup(rate_limit_seconds=1.0)
+player_cache = PlayerCache(
+    ttl_seconds=float(os.environ.get('USCF_CACHE_TTL', 86400)),
+    negative_ttl_seconds=float(os.environ.get('USCF_CACHE_NEGATIVE_TTL', 3600)),
+    max_entries=int(os.environ.get('USCF_CACHE_MAX_ENTRIES', 10000)),
+    db_path=os.environ.get('USCF_CACHE_PATH'),
+    stale_seconds=float(os.environ.get('USCF_CACHE_STALE_SECONDS', 7 * 86400))
+)
+metrics = LookupMetrics()
+# Filled in by _warm_up; a .snap file from player_snapshot.py is memory-mapped,
+# so it loads almost instantly and workers share one copy of the dataset
+player_store = PlayerStore()
+PLAYER_DATA = os.environ.get('USCF_PLAYER_DATA', DEFAULT_PLAYER_DATA)
+# Fast start: load the store and prepare the upstream connection in the background,
+# so a cold container starts serving as soon as its modules are imported
+FAST_START = os.environ.get('USCF_FAST_START', '').lower() in ('1', 'true', 'yes')
+# How long a lookup arriving during a fast start waits for the store before going upstream
+STARTUP_WAIT_SECONDS = float(os.environ.get('USCF_STARTUP_WAIT', 10))
+# Per priority class, how many requests may wait for an upstream slot before more are
+# turned away with a 429 (USCF_MAX_QUEUED_INTERACTIVE, ...), and the seconds a request
+# has before upstream calls it can no longer finish are dropped (USCF_DEADLINE_ROSTER, ...)
+MAX_QUEUED = {
+    priority: int(os.environ.get(f'USCF_MAX_QUEUED_{priority.upper()}', RequestScheduler.MAX_QUEUED[priority]))
+    for priority in PRIORITIES
+}
+REQUEST_DEADLINES = {
+    priority: float(os.environ.get(f'USCF_DEADLINE_{priority.upper()}', default))
+    for priority, default in ((PRIORITY_INTERACTIVE, 10), (PRIORITY_ROSTER, 60), (PRIORITY_BACKGROUND, 300))
+}
+uscf_lookup = USCFLookup(
+    rate_limit_seconds=float(os.environ.get('USCF_RATE_LIMIT_SECONDS', 1.0)),
+    cache=player_cache,
+    store=player_store,
+    burst=int(os.environ.get('USCF_RATE_LIMIT_BURST', 1)),
+    queue_timeout=float(os.environ.get('USCF_QUEUE_TIMEOUT', 30)),
+    # Needs USCF_RATE_LIMIT_BURST above 1 (every name format still takes its own slot); ignored otherwise
+    parallel_name_search=os.environ.get('USCF_PARALLEL_NAME_SEARCH', '').lower() in ('1', 'true', 'yes'),
+    metrics=metrics,
+    base_url=os.environ.get('USCF_BASE_URL', 'http://www.uschess.org/datapage/player-search.php'),
+    shared_throttle_path=os.environ.get('USCF_SHARED_THROTTLE_PATH'),
+    max_queued=MAX_QUEUED,
+    response_cache=ResponseCache(
+        fresh_seconds=float(os.environ.get('USCF_RESPONSE_CACHE_SECONDS', 300)),
+        max_bytes=int(float(os.environ.get('USCF_RESPONSE_CACHE_MAX_MB', 32)) * 1024 * 1024)
+    ),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('USCF_BREAKER_FAILURES', 5)),
+        base_backoff=float(os.environ.get('USCF_BREAKER_BACKOFF', 5)),
+        max_backoff=float(os.environ.get('USCF_BREAKER_MAX_BACKOFF', 300))
+    )
+)
+
+# Background refresh keeps the local store current; enabled by giving it somewhere to keep its progress
+refresh_job = None
+if os.environ.get('USCF_REFRESH_DB'):
+    refresh_job = RefreshJob(
+        uscf_lookup,
+        os.environ['USCF_REFRESH_DB'],
+        interval=float(os.environ.get('USCF_REFRESH_INTERVAL', 10)),
+        max_age_seconds=float(os.environ.get('USCF_REFRESH_MAX_AGE', 86400)),
+        expiring_days=int(os.environ.get('USCF_REFRESH_EXPIRING_DAYS', 30))
+    )
+
+# Seconds each startup step took, reported by /ready and /metrics
+startup_seconds = {}
+store_loaded = threading.Event()
+service_ready = threading.Event()
+# Set by _warm_up when USCF_PLAYER_DATA names a dataset that gave no players (missing
+# mount, unreadable file); /ready then stays 503 rather than sending every lookup upstream
+player_data_error = None
+
+def _timed_startup_step(name: str, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        logging.error(f"Startup step {name} failed: {e}")
+    startup_seconds[name] = time.perf_counter() - started
+
+def _start_refresh():
+    refresh_job.load_into_store()
+    refresh_job.seed()
+    refresh_job.start()
+
+def _warm_up():
+    """Load the player store and start the refresh job, then (in fast start) warm the upstream connection"""
+    global player_data_error
+    _timed_startup_step('player_store', lambda: player_store.load_path(PLAYER_DATA))
+    if PLAYER_DATA and not len(player_store):
+        player_data_error = (f"No players loaded from USCF_PLAYER_DATA={PLAYER_DATA}; mount the dataset "
+                             f"there, or set USCF_PLAYER_DATA= to look every player up on uschess.org")
+        logging.error(player_data_error)
+    store_loaded.set()
+    if refresh_job is not None:
+        _timed_startup_step('refresh', _start_refresh)
+    if FAST_START:
+        _timed_startup_step('upstream', uscf_lookup.warm_up)
+    startup_seconds['ready'] = time.perf_counter() - STARTUP_STARTED
+    service_ready.set()
+    logging.info(f"Ready {startup_seconds['ready']:.3f}s after startup "
+                 f"({', '.join(f'{step} {seconds:.3f}s' for step, seconds in startup_seconds.items())})")
+
+request_time = metrics.registry.histogram(
+    'uscf_http_request_seconds', 'Time to handle each service route', ('route', 'status'))
+metrics.registry.gauge(
+    'uscf_cache_events', 'Player cache counters and size',
+    lambda: {(key,): value for key, value in player_cache.stats().items() if key != 'persistent'},
+    ('event',))
+metrics.registry.gauge(
+    'uscf_response_cache_events', 'Upstream response cache counters and size',
+    lambda: {(key,): value for key, value in uscf_lookup.responses.stats().items()},
+    ('event',))
+metrics.registry.gauge(
+    'uscf_scheduler_queued', 'Requests waiting for an upstream slot',
+    lambda: {(priority,): queued for priority, queued in uscf_lookup.scheduler.stats()['queued'].items()},
+    ('priority',))
+metrics.registry.gauge(
+    'uscf_scheduler_shed', 'Upstream requests turned away or dropped instead of queued',
+    lambda: {tuple(key.split(':')): count for key, count in uscf_lookup.scheduler.stats()['shed'].items()},
+    ('priority', 'reason'))
+metrics.registry.gauge('uscf_local_players', 'Players in the local store', lambda: len(player_store))
+metrics.registry.gauge(
+    'uscf_startup_seconds', 'Seconds each startup step took; "ready" is the total',
+    lambda: {(step,): seconds for step, seconds in startup_seconds.items()},
+    ('step',))
+metrics.registry.gauge(
+    'uscf_circuit_open', 'Whether the upstream circuit breaker is open (1) or not (0)',
+    lambda: 1 if uscf_lookup.breaker.state == CircuitBreaker.OPEN else 0)
+
+# Admin diagnostics (/admin/...) answer 404 unless a token is set, then require it as a Bearer token
+ADMIN_TOKEN = os.environ.get('USCF_ADMIN_TOKEN')
+profiler = SamplingProfiler()
+# Off by default; USCF_SLOW_REQUESTS=50 keeps the 50 most recent requests slower than USCF_SLOW_REQUEST_MS
+slow_requests = SlowRequestLog(
+    capacity=int(os.environ.get('USCF_SLOW_REQUESTS', 0)),
+    threshold_seconds=float(os.environ.get('USCF_SLOW_REQUEST_MS', 500)) / 1000
+)
+
+# SQLite exports of the player store for sql.js (/players/snapshot.db), shared by the
+# workers and rebuilt on request once the latest is USCF_EXPORT_MAX_AGE seconds old
+EXPORT_DIR = os.environ.get('USCF_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'uscf-players-export'))
+EXPORT_MAX_AGE = float(os.environ.get('USCF_EXPORT_MAX_AGE', 3600))
+# Each export is named for its syncedAt, so the header sent with a file always matches
+# its contents even while another worker is writing a newer one
+EXPORT_NAME_RE = re.compile(r'^players-(\d+\.\d+)\.db$')
+# A client with more changes than this to catch up on downloads the export again instead
+MAX_CHANGES = int(os.environ.get('USCF_MAX_CHANGES', 5000))
+export_lock = threading.Lock()
+
+# Upper bound on IDs accepted by a single /uscf-lookup-batch call
+MAX_BATCH_SIZE = int(os.environ.get('USCF_MAX_BATCH_SIZE', 200))
+# Upper bound on rows accepted by a single /roster-verify call
+MAX_ROSTER_SIZE = int(os.environ.get('USCF_MAX_ROSTER_SIZE', 1000))
+
+# How long clients and proxies may reuse a lookup response without revalidating it
+HTTP_MAX_AGE = int(os.environ.get('USCF_HTTP_MAX_AGE', 300))
+# Encoded player bodies kept in memory; see _encoded_player
+ENCODED_PLAYERS = int(os.environ.get('USCF_ENCODED_PLAYERS', 10000))
+
+def _player_to_dict(player):
+    return {
+        'uscf_id': player.uscf_id,
+        'name': player.name,
+        'rating_regular': player.rating_regular,
+        'rating_quick': player.rating_quick,
+        'state': player.state,
+        'expiration_date': player.expiration_date
+    }
+
+def _encode_json(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class EncodedJSON(NamedTuple):
+    """A JSON response body encoded once, with the strong ETag of its bytes"""
+    body: bytes
+    etag: str
+
+def _encoded_body(body: bytes) -> EncodedJSON:
+    return EncodedJSON(body, hashlib.blake2b(body, digest_size=12).hexdigest())
+
+@lru_cache(maxsize=ENCODED_PLAYERS)
+def _encoded_player(player) -> EncodedJSON:
+    """
+    A player's JSON body and ETag, encoded on first use
+    
+    Keyed by the immutable USCFPlayer itself, so repeat lookups of a cached or
+    local record reuse its bytes, and an updated record simply gets new ones.
+    """
+    return _encoded_body(_encode_json(_player_to_dict(player)))
+
+def _encoded_players(players) -> EncodedJSON:
+    """A JSON array of players, spliced together from their encoded bodies"""
+    return _encoded_body(b'[' + b','.join(_encoded_player(player).body for player in players) + b']')
+
+def _encoded_response(encoded: EncodedJSON):
+    """
+    Serve an encoded body with its ETag and Cache-Control
+    
+    A GET whose If-None-Match matches the ETag gets a 304 with no body.
+    """
+    response = Response(encoded.body, mimetype='application/json')
+    response.set_etag(encoded.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = HTTP_MAX_AGE
+    return response.make_conditional(request)
+
+def _request_data():
+    """Fields of a lookup: the JSON body of a POST, or the query string of a GET"""
+    if request.method == 'GET':
+        return request.args
+    return request.get_json(silent=True) or {}
+
+def _name_filters(data):
+    """
+    Read the optional state, min_rating, max_rating and limit fields of a name lookup
+    
+    Returns:
+        (filter_players keyword arguments, limit or None)
+    
+    Raises:
+        ValueError: If a rating or the limit is not a number
+    """
+    def number(field):
+        value = data.get(field)
+        return int(value) if value not in (None, '') else None
+    
+    criteria = {'state': data.get('state'), 'min_rating': number('min_rating'), 'max_rating': number('max_rating')}
+    return criteria, number('limit')
+
+NAME_FILTERS_ERROR = 'min_rating, max_rating and limit must be numbers'
+
+def _filter_name_results(players, criteria, limit):
+    """Apply a name lookup's filters (from _name_filters) and limit to players, lazily"""
+    players = filter_players(players, **criteria)
+    return itertools.islice(players, limit) if limit is not None else players
+
+# Streaming formats a client can ask for through the Accept header
+STREAM_MIMETYPES = {'application/x-ndjson': 'ndjson', 'text/event-stream': 'sse'}
+
+def _negotiate_stream_format(accept: MIMEAccept, default=None):
+    """Streaming format preferred by an Accept header, or default (None means a plain JSON response)"""
+    best = accept.best_match(['application/json', *STREAM_MIMETYPES])
+    return STREAM_MIMETYPES.get(best, default)
+
+def _stream_format(default=None):
+    """Streaming format requested through this request's Accept header, or default"""
+    return _negotiate_stream_format(request.accept_mimetypes, default)
+
+# Stop proxies such as nginx from buffering streamed responses
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+# Lets server-sent event clients tell a finished stream from a dropped connection
+STREAM_END_EVENT = 'event: end\ndata: {}\n\n'
+
+def _encode_stream_item(item, stream_format) -> str:
+    """One streamed item, encoded like a plain JSON response body"""
+    encoded = _encode_json(item).decode('utf-8')
+    if stream_format == 'sse':
+        return f"data: {encoded}\n\n"
+    return encoded + '\n'
+
+def _encode_stream_error(error, stream_format) -> str:
+    """A streamed {"error": ...} record; server-sent events send it as an "error" event"""
+    if stream_format == 'sse':
+        return f"event: error\n{_encode_stream_item(error, stream_format)}"
+    return _encode_stream_item(error, stream_format)
+
+def _stream_response(items, stream_format, route_name):
+    """
+    Stream JSON items as NDJSON lines or server-sent events as they're produced
+    
+    The first item is produced before the status is sent, so a stream that
+    would be empty because its lookups were shed or skipped uschess.org gets
+    the same 429/503 as a plain JSON response. Once the status has been sent,
+    an error, or lookups going unanswered partway, end the stream with an
+    {"error": ...} record instead.
+    """
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        if _upstream_unavailable():
+            return _unavailable_response()
+        if _request_shed():
+            return _shed_response(_request_shed())
+    else:
+        items = itertools.chain([first], items)
+    
+    # The body is produced after the view returns and teardown has released the
+    # request's admission, so carry it into the generator
+    admission = REQUEST_ADMISSION.get()
+    
+    def generate():
+        token = REQUEST_ADMISSION.set(admission)
+        try:
+            for item in items:
+                yield _encode_stream_item(item, stream_format)
+            unanswered = _unanswered_error()
+            if unanswered is not None:
+                yield _encode_stream_error(unanswered, stream_format)
+        except Exception as e:
+            logging.error(f"Error in {route_name}: {e}")
+            yield _encode_stream_error({'error': 'Internal server error'}, stream_format)
+        finally:
+            REQUEST_ADMISSION.reset(token)
+        if stream_format == 'sse':
+            yield STREAM_END_EVENT
+    
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=STREAM_HEADERS)
+
+UNAVAILABLE_ERROR = 'USCF lookups are temporarily unavailable'
+
+def _upstream_unavailable() -> bool:
+    """
+    Whether an empty answer may just mean uschess.org wasn't asked
+    
+    True only when one of the current request's lookups skipped uschess.org
+    because the circuit was open, or got no answer from it; an empty answer
+    from the local store or a cached "not found" stays a 404.
+    """
+    admission = REQUEST_ADMISSION.get()
+    return admission is not None and admission.unavailable
+
+# Priority class of each route that may go upstream; see _admission
+ROUTE_PRIORITIES = {
+    'lookup_player': PRIORITY_INTERACTIVE,
+    'lookup_players_by_name': PRIORITY_INTERACTIVE,
+    'stream_players_by_name': PRIORITY_INTERACTIVE,
+    'lookup_players_batch': PRIORITY_ROSTER,
+    'verify_roster_endpoint': PRIORITY_ROSTER,
+}
+
+SHED_ERRORS = {
+    SHED_QUEUE_FULL: 'Too many USCF lookups are waiting; try again shortly',
+    SHED_DEADLINE: 'USCF lookups are too busy to answer in time; try again shortly',
+}
+
+def _admission(endpoint, priority=None, deadline=None):
+    """
+    Admission for a request to endpoint, or None for routes that never go upstream
+    
+    Clients may lower a request's priority with the X-USCF-Priority header (e.g.
+    a nightly script sending "background") but not raise it, and may shorten its
+    deadline with X-USCF-Deadline, in seconds.
+    """
+    route_priority = ROUTE_PRIORITIES.get(endpoint)
+    if route_priority is None:
+        return None
+    if priority in PRIORITIES and PRIORITIES.index(priority) > PRIORITIES.index(route_priority):
+        route_priority = priority
+    
+    timeout = REQUEST_DEADLINES[route_priority]
+    try:
+        timeout = min(timeout, max(0.0, float(deadline))) if deadline else timeout
+    except ValueError:
+        pass
+    return Admission(route_priority, timeout)
+
+def _request_shed():
+    """The current request's Admission if any of its upstream calls were turned away or dropped"""
+    admission = REQUEST_ADMISSION.get()
+    return admission if admission is not None and admission.shed else None
+
+def _shed_status(admission) -> int:
+    # A full queue means too many requests (429); a missed deadline means the service is too slow (503)
+    return 429 if admission.shed == SHED_QUEUE_FULL else 503
+
+def _retry_after() -> str:
+    admission = _request_shed()
+    seconds = admission.retry_after if admission is not None else uscf_lookup.breaker.retry_after()
+    return str(max(1, int(seconds + 0.5)))
+
+def _shed_response(admission):
+    response = jsonify({'error': SHED_ERRORS[admission.shed]})
+    response.status_code = _shed_status(admission)
+    response.headers['Retry-After'] = _retry_after()
+    return response
+
+def _unavailable_response():
+    response = jsonify({'error': UNAVAILABLE_ERROR})
+    response.status_code = 503
+    response.headers['Retry-After'] = _retry_after()
+    return response
+
+def _unanswered_error():
+    """{"error": ..., "retry_after": ...} when the current request's lookups were shed or skipped uschess.org, else None"""
+    admission = _request_shed()
+    if admission is not None:
+        return {'error': SHED_ERRORS[admission.shed], 'retry_after': int(_retry_after())}
+    if _upstream_unavailable():
+        return {'error': UNAVAILABLE_ERROR, 'retry_after': int(_retry_after())}
+    return None
+
+def _reset_unanswered():
+    """Clear the current request's shed and unavailable marks before its next lookup"""
+    admission = REQUEST_ADMISSION.get()
+    if admission is not None:
+        admission.shed = None
+        admission.unavailable = False
+
+def _track_player(player):
+    """Keep players looked up through the service current once they've been seen"""
+    if refresh_job is not None and player is not None:
+        refresh_job.track(player.uscf_id)
+
+# Admin diagnostics, never traced themselves
+ADMIN_ENDPOINTS = {'profile_endpoint', 'slow_requests_endpoint'}
+# Routes that answer without the player store, so they never wait for it during a fast start
+STARTUP_EXEMPT_ENDPOINTS = {'health_check', 'readiness_check', 'metrics_endpoint', *ADMIN_ENDPOINTS}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Admitted on arrival, so time spent waiting for the store below counts against the deadline
+    admission = _admission(request.endpoint, request.headers.get('X-USCF-Priority'),
+                           request.headers.get('X-USCF-Deadline'))
+    if admission is not None:
+        g.admission_token = REQUEST_ADMISSION.set(admission)
+    if slow_requests.enabled and request.endpoint not in ADMIN_ENDPOINTS:
+        g.trace_token = REQUEST_TRACE.set(RequestTrace())
+    # A lookup that arrives while the store is loading would otherwise go to uschess.org
+    if not store_loaded.is_set() and request.endpoint not in STARTUP_EXEMPT_ENDPOINTS:
+        store_loaded.wait(STARTUP_WAIT_SECONDS)
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Streamed responses are timed up to the first byte, not until the stream ends
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - started
+        request_time.observe(elapsed, route, str(response.status_code))
+        if 'trace_token' in g:
+            slow_requests.record(route, response.status_code, elapsed, REQUEST_TRACE.get())
+    return response
+
+@app.teardown_request
+def release_request_context(error=None):
+    for var, name in ((REQUEST_ADMISSION, 'admission_token'), (REQUEST_TRACE, 'trace_token')):
+        token = g.pop(name, None)
+        if token is not None:
+            var.reset(token)
 
-@app.route('/uscf-lookup', methods=['POST'])
+@app.route('/uscf-lookup', methods=['GET', 'POST'])
 def lookup_player():
+    """
+    Look up a player by USCF ID: POST {"uscf_id": ...} or GET ?uscf_id=...
+    
+    A found player comes back with an ETag and Cache-Control, and a GET with a
+    matching If-None-Match gets a 304.
+    """
     try:
-        data = request.get_json()
+        data = _request_data()
         uscf_id = data.get('uscf_id')
         
         if not uscf_id:
@@ -20,56 +498,419 @@ def lookup_player():
         player = uscf_lookup.lookup_by_id(uscf_id)
         
         if not player:
+            if _upstream_unavailable():
+                return _unavailable_response()
+            if _request_shed():
+                return _shed_response(_request_shed())
             return jsonify({'error': 'Player not found'}), 404
         
-        player_data = {
-            'uscf_id': player.uscf_id,
-            'name': player.name,
-            'rating_regular': player.rating_regular,
-            'rating_quick': player.rating_quick,
-            'state': player.state,
-            'expiration_date': player.expiration_date
-        }
-        
-        return jsonify(player_data)
+        _track_player(player)
+        return _encoded_response(_encoded_player(player))
         
     except Exception as e:
         logging.error(f"Error in lookup_player: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/uscf-lookup-name', methods=['POST'])
+@app.route('/uscf-lookup-name', methods=['GET', 'POST'])
 def lookup_players_by_name():
+    """
+    Search for players by name, from a JSON body or (GET) the query string.
+    
+    Returns a JSON array by default, with an ETag and Cache-Control like
+    /uscf-lookup. Clients that send Accept: application/x-ndjson or
+    text/event-stream get each player as soon as it is parsed instead.
+    """
     try:
-        data = request.get_json()
+        data = _request_data()
         first_name = data.get('first_name')
         last_name = data.get('last_name')
         
         if not first_name and not last_name:
             return jsonify({'error': 'At least a first or last name is required'}), 400
         
-        players = uscf_lookup.lookup_by_name(first_name, last_name)
+        # Checked before the lookup so a bad filter doesn't spend an upstream request
+        try:
+            criteria, limit = _name_filters(data)
+        except ValueError:
+            return jsonify({'error': NAME_FILTERS_ERROR}), 400
+        
+        stream_format = _stream_format()
+        if stream_format:
+            players = _filter_name_results(uscf_lookup.iter_by_name(first_name, last_name), criteria, limit)
+        else:
+            players = _filter_name_results(uscf_lookup.lookup_by_name(first_name, last_name), criteria, limit)
+        
+        if stream_format:
+            return _stream_response((_player_to_dict(player) for player in players),
+                                    stream_format, 'lookup_players_by_name')
         
-        players_data = []
-        for player in players:
-            players_data.append({
-                'uscf_id': player.uscf_id,
-                'name': player.name,
-                'rating_regular': player.rating_regular,
-                'rating_quick': player.rating_quick,
-                'state': player.state,
-                'expiration_date': player.expiration_date
-            })
+        players = list(players)
         
-        return jsonify(players_data)
+        if not players and _upstream_unavailable():
+            return _unavailable_response()
+        if not players and _request_shed():
+            return _shed_response(_request_shed())
+        
+        return _encoded_response(_encoded_players(players))
         
     except Exception as e:
         logging.error(f"Error in lookup_players_by_name: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/uscf-lookup-batch', methods=['POST'])
+def lookup_players_batch():
+    """
+    Resolve a whole roster of USCF IDs in one call.
+    
+    Results are streamed back as newline-delimited JSON (or server-sent events
+    with Accept: text/event-stream), one item per unique ID, so the caller can
+    show progress while the remaining IDs are still resolving.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        uscf_ids = data.get('uscf_ids')
+        
+        if not isinstance(uscf_ids, list) or not uscf_ids:
+            return jsonify({'error': 'A non-empty list of USCF IDs is required'}), 400
+        
+        if len(uscf_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} USCF IDs may be looked up per request'}), 400
+        
+        def generate():
+            for uscf_id, player in uscf_lookup.lookup_many(uscf_ids):
+                if player:
+                    _track_player(player)
+                    yield {'uscf_id': uscf_id, 'found': True, 'player': _player_to_dict(player)}
+                else:
+                    yield {'uscf_id': uscf_id, 'found': False, **(_unanswered_error() or {'error': 'Player not found'})}
+                # Judge each ID by its own lookup; later IDs may still resolve locally or get a slot
+                _reset_unanswered()
+        
+        return _stream_response(generate(), _stream_format(default='ndjson'), 'lookup_players_batch')
+        
+    except Exception as e:
+        logging.error(f"Error in lookup_players_batch: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def _roster_options(data):
+    """
+    Read the as_of, rating_tolerance and fetch options of a roster check from data or the query string
+    
+    Raises:
+        ValueError: If as_of is not an ISO date or rating_tolerance is not a number
+    """
+    def option(field):
+        value = data.get(field)
+        return request.args.get(field) if value in (None, '') else value
+    
+    as_of = option('as_of')
+    fetch = option('fetch')
+    try:
+        return {
+            'as_of': date.fromisoformat(str(as_of)) if as_of else None,
+            'rating_tolerance': int(option('rating_tolerance') or 0),
+            'fetch': fetch in (None, '') or str(fetch).lower() not in ('0', 'false', 'no')
+        }
+    except ValueError:
+        raise ValueError('as_of must be a YYYY-MM-DD date and rating_tolerance a number')
+
+@app.route('/roster-verify', methods=['POST'])
+def verify_roster_endpoint():
+    """
+    Check a whole roster against USCF member records in one call.
+    
+    Accepts JSON - {"players": [...], "as_of": "2025-03-01"} or a bare list of
+    players - or CSV (Content-Type: text/csv, options in the query string).
+    Each player needs a USCF ID and may give a first and last name (or one name
+    field) and a claimed rating. Rows come back in order with the member record
+    and any of the flags unknown_id, expired, rating_mismatch, name_mismatch
+    and unverified.
+    
+    Members in the local store or cache are checked without going to
+    uschess.org; only the remaining IDs are fetched, each once.
+    """
+    try:
+        try:
+            if request.mimetype in ('text/csv', 'application/csv'):
+                data = {}
+                rows = parse_roster_csv(request.get_data(as_text=True))
+            else:
+                data = request.get_json(silent=True)
+                if isinstance(data, list):
+                    data = {'players': data}
+                if not isinstance(data, dict) or not isinstance(data.get('players'), list):
+                    return jsonify({'error': 'A roster list of players or a CSV body is required'}), 400
+                rows = parse_roster_json(data['players'])
+            options = _roster_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not rows:
+            return jsonify({'error': 'The roster is empty'}), 400
+        if len(rows) > MAX_ROSTER_SIZE:
+            return jsonify({'error': f'At most {MAX_ROSTER_SIZE} players may be verified per request'}), 400
+        
+        # Rows whose own lookups were shed or unanswered come back unverified rather than unknown
+        results = verify_roster(uscf_lookup, rows, **options)
+        
+        summary = {flag: 0 for flag in FLAGS}
+        for result in results:
+            for flag in result['flags']:
+                summary[flag] += 1
+            _track_player(result['player'])
+            if result['player'] is not None:
+                result['player'] = _player_to_dict(result['player'])
+        summary['rows'] = len(results)
+        summary['ok'] = sum(1 for result in results if not result['flags'])
+        
+        return jsonify({
+            'as_of': (options['as_of'] or date.today()).isoformat(),
+            'summary': summary,
+            'rows': results
+        })
+        
+    except Exception as e:
+        logging.error(f"Error in verify_roster: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/refresh-queue', methods=['POST'])
+def prioritize_refresh():
+    """
+    Refresh the given players ahead of the regular background pass,
+    e.g. everyone registered for an upcoming event.
+    """
+    if refresh_job is None:
+        return jsonify({'error': 'Background refresh is not enabled'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    uscf_ids = data.get('uscf_ids')
+    if not isinstance(uscf_ids, list) or not uscf_ids:
+        return jsonify({'error': 'A non-empty list of USCF IDs is required'}), 400
+    
+    return jsonify({'queued': refresh_job.prioritize(uscf_ids)})
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'})
+    return jsonify({
+        'status': 'healthy',
+        'cache': player_cache.stats(),
+        'response_cache': uscf_lookup.responses.stats(),
+        'scheduler': uscf_lookup.scheduler.stats(),
+        'coalesced_lookups': uscf_lookup.inflight.shared,
+        'local_players': len(player_store),
+        'upstream': uscf_lookup.breaker.stats(),
+        'refresh': refresh_job.stats() if refresh_job is not None else None,
+        'startup_seconds': {step: round(seconds, 4) for step, seconds in startup_seconds.items()}
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness, as opposed to /health's liveness: 503 until the player store is
+    loaded and startup warm-up has finished, then 200. Both report how long
+    each startup step took. Stays 503, with an error, when the configured
+    player dataset could not be loaded.
+    """
+    ready = service_ready.is_set() and player_data_error is None
+    body = {
+        'ready': ready,
+        'fast_start': FAST_START,
+        'local_players': len(player_store),
+        'startup_seconds': {step: round(seconds, 4) for step, seconds in startup_seconds.items()}
+    }
+    if player_data_error is not None:
+        body['error'] = player_data_error
+    response = jsonify(body)
+    if not ready:
+        response.status_code = 503
+        if player_data_error is None:
+            response.headers['Retry-After'] = '1'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def _admin_refusal():
+    """Error response unless the request carries the admin token, else None"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f'Bearer {ADMIN_TOKEN}'.encode()):
+        return jsonify({'error': 'Admin token required'}), 401
+    return None
+
+@app.route('/admin/profile', methods=['GET'])
+def profile_endpoint():
+    """
+    Sample this worker's threads for a while and return the folded stacks.
+    
+    ?seconds= sets how long to sample (default 10, at most 60), ?interval_ms=
+    the time between samples (default 5) and ?all_threads=1 keeps threads
+    that never entered service code. The text/plain response feeds straight
+    into flamegraph.pl or speedscope. Under gunicorn only the worker that
+    received the request is sampled.
+    """
+    refusal = _admin_refusal()
+    if refusal is not None:
+        return refusal
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    all_threads = request.args.get('all_threads', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        samples = profiler.profile(seconds, interval, all_threads)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    response = Response(folded(samples), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(sum(samples.values()))
+    return response
+
+@app.route('/admin/slow-requests', methods=['GET'])
+def slow_requests_endpoint():
+    """
+    The slowest recent requests with the time each spent queued, upstream and
+    parsing, and how much HTML uschess.org sent. Enable with USCF_SLOW_REQUESTS.
+    """
+    refusal = _admin_refusal()
+    if refusal is not None:
+        return refusal
+    
+    return jsonify({
+        'enabled': slow_requests.enabled,
+        'capacity': slow_requests.capacity,
+        'threshold_ms': slow_requests.threshold * 1000,
+        'requests': slow_requests.entries()
+    })
+
+def _exports():
+    """(syncedAt, path) of every export in EXPORT_DIR, newest first"""
+    exports = []
+    for name in os.listdir(EXPORT_DIR) if os.path.isdir(EXPORT_DIR) else ():
+        match = EXPORT_NAME_RE.match(name)
+        if match:
+            exports.append((float(match.group(1)), os.path.join(EXPORT_DIR, name)))
+    return sorted(exports, reverse=True)
+
+def _current_export():
+    """
+    The (syncedAt, path) of an up-to-date player export, writing a new one if needed
+    
+    The latest export is kept while it is younger than EXPORT_MAX_AGE, or
+    nothing has changed since it was taken - as long as this worker can serve
+    /players/changes from its syncedAt, so one left by a previous run (or a
+    worker with an older dataset) isn't handed out only to be answered with 410.
+    """
+    with export_lock:
+        exports = _exports()
+        if exports:
+            synced_at, path = exports[0]
+            changes = player_store.changes(synced_at)
+            if changes == [] or (changes is not None and time.time() - synced_at < EXPORT_MAX_AGE):
+                return synced_at, path
+        
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        synced_at = round(time.time(), 6)
+        path = os.path.join(EXPORT_DIR, f'players-{synced_at:.6f}.db')
+        written = export_players(player_store.players(), path, synced_at)
+        logging.info(f"Exported {written} players to {path}")
+        # The previous export may still be downloading; anything older can go
+        for _, old_path in _exports()[2:]:
+            try:
+                os.unlink(old_path)
+            except OSError:
+                pass
+        return synced_at, path
+
+@app.route('/players/snapshot.db', methods=['GET'])
+def player_export_endpoint():
+    """
+    The player store as a compact, indexed SQLite file for sql.js.
+    
+    See player_export.py for the schema. The X-Players-Synced-At header (also
+    meta.syncedAt in the file) is the since to pass to /players/changes.
+    Supports If-None-Match, so an unchanged export costs a 304.
+    """
+    try:
+        if not len(player_store):
+            return jsonify({'error': 'Player data is not loaded'}), 503
+        synced_at, path = _current_export()
+        response = send_file(path, mimetype='application/vnd.sqlite3', conditional=True,
+                             etag=True, max_age=HTTP_MAX_AGE, download_name='players.db')
+        response.headers['X-Players-Synced-At'] = f'{synced_at:.6f}'
+        return response
+        
+    except Exception as e:
+        logging.error(f"Error in player_export: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def _player_change(player):
+    """A changed player as a players row of the export, with its name_tokens rows"""
+    last, first, _ = split_name(player.name)
+    return {
+        **player_to_row(player),
+        'nameTokens': [[token, field]
+                       for field, value in ((LAST_NAME_FIELD, last), (FIRST_NAME_FIELD, first))
+                       for token in sorted(set(normalize_name_tokens(value)))]
+    }
+
+@app.route('/players/changes', methods=['GET'])
+def player_changes_endpoint():
+    """
+    Players added or changed since ?since=, to bring a downloaded export up to date.
+    
+    since is the export's syncedAt, then the until of the previous response.
+    Each player is a row for the export's players table plus the [token, field]
+    pairs that replace its name_tokens rows. A 410 with "resync": true means
+    this worker can't tell what changed that long ago, or too much has; the
+    client should download /players/snapshot.db again.
+    
+    The change log is kept by each worker for its own store, from when it
+    loaded its dataset: a since from before then always gets the 410, even if
+    another worker could have answered. Exports are only handed out while the
+    serving worker's log covers their syncedAt (see _current_export).
+    """
+    try:
+        since = float(request.args.get('since', ''))
+    except ValueError:
+        since = math.nan
+    # nan and inf would otherwise compare as "nothing changed"
+    if not math.isfinite(since):
+        return jsonify({'error': 'since must be a syncedAt or until value'}), 400
+    
+    try:
+        # Taken before reading the changes, so a change made meanwhile is sent again rather than missed
+        until = time.time()
+        changes = player_store.changes(since)
+        if changes is None or len(changes) > MAX_CHANGES:
+            return jsonify({'error': 'Too far behind; download /players/snapshot.db again', 'resync': True}), 410
+        
+        body = _encode_json({
+            'since': since,
+            'until': until,
+            'players': [_player_change(player) for _, player in changes]
+        })
+        return Response(body, mimetype='application/json', headers={'Cache-Control': 'no-cache'})
+        
+    except Exception as e:
+        logging.error(f"Error in player_changes: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+startup_seconds['import'] = time.perf_counter() - STARTUP_STARTED
+if FAST_START:
+    threading.Thread(target=_warm_up, name='uscf-warm-up', daemon=True).start()
+else:
+    _warm_up()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    if os.environ.get('USCF_SERVICE_MODE') == 'asgi':
+        import uvicorn
+        uvicorn.run('uscf_asgi:app', host='0.0.0.0', port=port)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=False)